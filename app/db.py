@@ -1,6 +1,15 @@
 import os
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+logger = logging.getLogger(__name__)
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
@@ -10,8 +19,78 @@ if not SQLALCHEMY_DATABASE_URL:
         "Set it to your Neon PostgreSQL connection string."
     )
 
+# Waits longer than this are logged — a slow checkout means the pool is exhausted
+POOL_SLOW_WAIT_MS = float(os.getenv("DB_POOL_SLOW_WAIT_MS", "500"))
+
+
+# -----------------------------
+# POOL INSTRUMENTATION
+# -----------------------------
+class PoolStats:
+    """Process-wide counters for connection checkouts (read by /admin/db-pool)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.slow_waits = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def record_checkout(self, wait_ms: float, overflowed: bool):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+            if wait_ms >= POOL_SLOW_WAIT_MS:
+                self.slow_waits += 1
+            if overflowed:
+                self.overflow_events += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "wait_ms_avg": round(self.wait_ms_total / self.checkouts, 2) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_ms_max, 2),
+                "slow_waits": self.slow_waits,
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited and when it overflowed."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        overflow_before = self._overflow
+        try:
+            entry = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.record_timeout()
+            logger.error(f"[DB POOL] Checkout timed out — {self.status()}")
+            raise
+
+        wait_ms = (time.perf_counter() - start) * 1000
+        overflowed = self._overflow > overflow_before and self._overflow > 0
+        pool_stats.record_checkout(wait_ms, overflowed)
+        if wait_ms >= POOL_SLOW_WAIT_MS:
+            logger.warning(f"[DB POOL] Waited {wait_ms:.0f} ms for a connection — {self.status()}")
+        return entry
+
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
     pool_pre_ping=True,   # test connection before use — recovers from SSL drops
     pool_recycle=300,     # recycle connections every 5 min (Neon closes idle after ~5 min)
     pool_size=5,
@@ -23,9 +102,36 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def get_pool_status() -> dict:
+    """Current pool occupancy plus cumulative checkout stats."""
+    pool = engine.pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        **pool_stats.snapshot(),
+    }
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+@contextmanager
+def db_session():
+    """
+    Short-lived session for one DB phase.
+    Use this instead of get_db() in request handlers that await slow
+    providers, so the pooled connection is returned before the await.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
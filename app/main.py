@@ -1,14 +1,25 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+import os
+
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
-from .db import Base, engine
-from app import models  # noqa: F401 — ensures models are registered before create_all
+from app.startup import startup_profile
 from app.routers import bots, chat, auth, admin
+from app.services.chat_log_writer import chat_log_writer
+from app.services.latency_sketch import latency_sketches
+from app.services.status_bus import status_bus
+from app.services.warm_state import warm_state
+from app.services.recrawl import recrawl_scheduler
+from app.services.knowledge_bases import sweep_orphaned_builds
+from app.services.vector_store import close_client
+from app.services.metrics import registry as metrics_registry
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,13 +27,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Schema changes are a deploy step (`python -m app.migrate create-schema`);
+# set this for local dev to have the app create missing tables on boot.
+AUTO_CREATE_SCHEMA = os.getenv("AUTO_CREATE_SCHEMA", "false").lower() == "true"
+# Compare Qdrant collections with the bots table once the app is up (logs only)
+CHECK_COLLECTIONS_ON_STARTUP = os.getenv("CHECK_COLLECTIONS_ON_STARTUP", "true").lower() == "true"
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    logger.info("Creating database tables if not exist...")
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database setup complete.")
+    if AUTO_CREATE_SCHEMA:
+        from app.migrate import create_schema
+
+        with startup_profile.step("create_schema"):
+            create_schema()
+    # Before the port opens, so the first visitors hit warm caches
+    with startup_profile.step("warm_state_restore"):
+        warm_state.restore()
+    with startup_profile.step("chat_log_writer"):
+        chat_log_writer.start()
+    with startup_profile.step("latency_sketches"):
+        latency_sketches.start()
+    with startup_profile.step("status_bus"):
+        status_bus.start()
+    warm_state.start()
+    recrawl_scheduler.start()    # no-op unless RECRAWL_ENABLED
+    # Knowledge-base versions left "building" by a killed process
+    app.state.kb_sweep = asyncio.create_task(sweep_orphaned_builds())
+    if CHECK_COLLECTIONS_ON_STARTUP:
+        from app.migrate import log_collection_mismatches
+
+        # Background: opening Qdrant (and loading embedded storage) must not delay the port
+        app.state.collections_check = asyncio.create_task(log_collection_mismatches())
+    startup_profile.mark_ready()
     yield
+    status_bus.stop()
+    app.state.kb_sweep.cancel()
+    if CHECK_COLLECTIONS_ON_STARTUP:
+        app.state.collections_check.cancel()
+    await recrawl_scheduler.stop()
+    # Drain queued chat logs / unflushed sketches before the process exits
+    await chat_log_writer.stop()
+    await latency_sketches.stop()
+    await warm_state.stop()
+    await close_client()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -43,7 +91,23 @@ app.include_router(chat.router, prefix="/api/chat", tags=["Chat"])
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(admin.router, tags=["Admin"])
 
+startup_profile.mark_imported()
+
 
 @app.get("/")
 def health_check():
     return {"status": "ok"}
+
+
+# Optional bearer token for the Prometheus scrape endpoint
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics(authorization: str | None = Header(default=None)):
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4",
+    )
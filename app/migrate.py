@@ -0,0 +1,299 @@
+"""
+One-off data migrations.
+
+Usage:
+    python -m app.migrate create-schema
+    python -m app.migrate add-columns
+    python -m app.migrate compact-sources [--dry-run] [--batch-size 500]
+    python -m app.migrate rebuild-rollups [--days N]
+    python -m app.migrate check-collections [--delete-orphans]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import sys
+
+from sqlalchemy import func, inspect, text
+
+from app.db import Base, db_session
+from app import models
+from app.services.source_refs import dump_source_refs, load_source_refs
+from app.services.analytics_rollup import rebuild_rollups
+from app.services.vector_store import (
+    QdrantStorageLocked, delete_collection, get_client, get_collection_name, list_bot_ids,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------
+# create-schema: run on deploy, not at app startup
+# -----------------------------------------------------
+def create_schema() -> list[str]:
+    """Create missing tables, then add missing nullable columns. Returns the columns added."""
+    from app.db import engine
+
+    Base.metadata.create_all(bind=engine)
+    return add_missing_columns(engine)
+
+
+# -----------------------------------------------------
+# add-columns: create_all() never alters existing tables
+# -----------------------------------------------------
+def add_missing_columns(engine) -> list[str]:
+    """
+    ALTER TABLE ... ADD COLUMN for nullable columns that exist on a model
+    but not yet in the database. Returns the columns that were added.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                if not column.nullable:
+                    logger.warning(f"[MIGRATE] Skipping NOT NULL column {table.name}.{column.name} — add it manually")
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                added.append(f"{table.name}.{column.name}")
+                logger.info(f"[MIGRATE] Added column {table.name}.{column.name} ({col_type})")
+    return added
+
+
+# -----------------------------------------------------
+# compact-sources: full chunk text -> point references
+# -----------------------------------------------------
+def _text_key(page_url: str | None, text: str) -> str:
+    return hashlib.sha1(f"{page_url}\x00{text}".encode()).hexdigest()
+
+
+async def _load_point_index(bot_id: str) -> dict[str, tuple[str, int | None]]:
+    """Map (page_url, text) -> (point id, chunk_index) for every point of a bot."""
+    index = {}
+    client = get_client()
+    collection_name = get_collection_name(bot_id)
+    if not await client.collection_exists(collection_name):
+        return index
+
+    offset = None
+    while True:
+        points, offset = await client.scroll(
+            collection_name=collection_name,
+            limit=256,
+            offset=offset,
+            with_payload=["text", "page_url", "chunk_index"],
+            with_vectors=False,
+        )
+        for p in points:
+            key = _text_key(p.payload.get("page_url"), p.payload.get("text", ""))
+            index[key] = (str(p.id), p.payload.get("chunk_index"))
+        if offset is None:
+            return index
+
+
+def _compact_refs(legacy: list[dict], point_index: dict) -> tuple[list[dict], int]:
+    """Convert legacy {"text", "page_url"} entries. Unmatched entries keep their text."""
+    refs, matched = [], 0
+    for src in legacy:
+        if "text" not in src:
+            refs.append(src)
+            continue
+        hit = point_index.get(_text_key(src.get("page_url"), src["text"]))
+        if hit:
+            point_id, chunk_index = hit
+            ref = {"id": point_id, "page_url": src.get("page_url")}
+            if chunk_index is not None:
+                ref["chunk_index"] = chunk_index
+            refs.append(ref)
+            matched += 1
+        else:
+            # Chunk no longer in Qdrant (bot refreshed / deleted) — keep the
+            # text rather than lose what the bot actually answered from
+            refs.append(src)
+    return refs, matched
+
+
+def _bot_collection_keys(db):
+    """(bots.id, bot_id, shared knowledge base collection key or None) for every bot."""
+    return (
+        db.query(models.Bot.id, models.Bot.bot_id, models.KnowledgeBase.collection_key)
+        .outerjoin(models.KnowledgeBase, models.KnowledgeBase.id == models.Bot.kb_id)
+        .all()
+    )
+
+
+async def compact_sources(dry_run: bool = False, batch_size: int = 500) -> dict:
+    report = {
+        "rows_scanned": 0,
+        "rows_rewritten": 0,
+        "refs_matched": 0,
+        "refs_unmatched": 0,
+        "bytes_before": 0,
+        "bytes_after": 0,
+    }
+
+    with db_session() as db:
+        # bots.id -> key of the collection its chunks live in
+        bots = {
+            bot_pk: collection_key or bot_id
+            for bot_pk, bot_id, collection_key in _bot_collection_keys(db)
+        }
+        total_rows = db.query(func.count(models.ChatLog.id)).scalar() or 0
+
+    point_indexes: dict[int, dict] = {}
+    last_id = 0
+    while True:
+        with db_session() as db:
+            logs = (
+                db.query(models.ChatLog)
+                .filter(
+                    models.ChatLog.id > last_id,
+                    models.ChatLog.retrieved_sources.isnot(None),
+                )
+                .order_by(models.ChatLog.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not logs:
+                break
+
+            for log in logs:
+                last_id = log.id
+                report["rows_scanned"] += 1
+                raw = log.retrieved_sources
+                report["bytes_before"] += len(raw.encode())
+
+                legacy = load_source_refs(raw)
+                if not any("text" in src for src in legacy) or log.bot_id not in bots:
+                    report["bytes_after"] += len(raw.encode())
+                    continue
+
+                if log.bot_id not in point_indexes:
+                    point_indexes[log.bot_id] = await _load_point_index(bots[log.bot_id])
+
+                refs, matched = _compact_refs(legacy, point_indexes[log.bot_id])
+                report["refs_matched"] += matched
+                report["refs_unmatched"] += sum(1 for r in refs if "text" in r)
+
+                compact = dump_source_refs(refs)
+                report["bytes_after"] += len(compact.encode())
+                if compact != raw:
+                    report["rows_rewritten"] += 1
+                    log.retrieved_sources = compact
+
+            if dry_run:
+                db.rollback()
+            else:
+                db.commit()
+
+        logger.info(f"[MIGRATE] compact-sources: {report['rows_scanned']}/{total_rows} rows scanned")
+
+    saved = report["bytes_before"] - report["bytes_after"]
+    report["bytes_saved"] = saved
+    report["savings_pct"] = round(100 * saved / report["bytes_before"], 1) if report["bytes_before"] else 0.0
+    report["dry_run"] = dry_run
+    return report
+
+
+# -----------------------------------------------------
+# check-collections: Qdrant collections vs the bots table
+# -----------------------------------------------------
+async def check_collections(delete_orphans: bool = False) -> dict:
+    """
+    Ready bots without a collection answer "knowledge base not found";
+    collections without a bot row or live knowledge base are leftovers of
+    deleted bots (or of a QDRANT_PATH shared with another database).
+    """
+    with db_session() as db:
+        status = dict(db.query(models.Bot.bot_id, models.Bot.status).all())
+        keys = {bot_id: collection_key or bot_id for _, bot_id, collection_key in _bot_collection_keys(db)}
+        live_kbs = {
+            key for (key,) in db.query(models.KnowledgeBase.collection_key)
+            .filter(models.KnowledgeBase.status.in_(("building", "ready")))
+            .all()
+        }
+    collections = set(await list_bot_ids())
+
+    report = {
+        "bots": len(status),
+        "knowledge_bases": len(live_kbs),
+        "collections": len(collections),
+        "missing": sorted(b for b, s in status.items() if s == "ready" and keys[b] not in collections),
+        "orphans": sorted(collections - set(keys.values()) - live_kbs),
+    }
+    if delete_orphans:
+        for bot_id in report["orphans"]:
+            await delete_collection(bot_id)
+    report["orphans_deleted"] = delete_orphans
+    return report
+
+
+async def log_collection_mismatches():
+    """Startup check: warn (don't fail) when Qdrant and the bots table disagree."""
+    try:
+        report = await check_collections()
+    except Exception:
+        logger.exception("[QDRANT] Could not compare collections with the bots table")
+        return
+    if report["missing"]:
+        logger.warning(f"[QDRANT] {len(report['missing'])} ready bots have no collection: {report['missing'][:20]}")
+    if report["orphans"]:
+        logger.warning(
+            f"[QDRANT] {len(report['orphans'])} collections have no bot "
+            f"(python -m app.migrate check-collections --delete-orphans): {report['orphans'][:20]}"
+        )
+    logger.info(f"[QDRANT] {report['collections']} collections checked against {report['bots']} bots")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    parser = argparse.ArgumentParser(prog="python -m app.migrate")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("create-schema", help="Create missing tables and columns (run before starting the app)")
+    sub.add_parser("add-columns", help="Add nullable columns that models define but the database lacks")
+
+    p = sub.add_parser("compact-sources", help="Replace full chunk text in chat_logs.retrieved_sources with point references")
+    p.add_argument("--dry-run", action="store_true", help="Only print the storage-savings report")
+    p.add_argument("--batch-size", type=int, default=500)
+
+    p = sub.add_parser("rebuild-rollups", help="Backfill / repair the daily analytics rollup tables from raw tables")
+    p.add_argument("--days", type=int, default=None, help="Only rebuild the last N days (default: everything)")
+
+    p = sub.add_parser("check-collections", help="Compare Qdrant collections with the bots table")
+    p.add_argument("--delete-orphans", action="store_true", help="Delete collections that have no bot row")
+
+    args = parser.parse_args()
+
+    if args.command == "create-schema":
+        print(json.dumps(create_schema(), indent=2))
+    elif args.command == "add-columns":
+        from app.db import engine
+        print(json.dumps(add_missing_columns(engine), indent=2))
+    elif args.command == "rebuild-rollups":
+        with db_session() as db:
+            report = rebuild_rollups(db, days=args.days)
+        print(json.dumps(report, indent=2))
+    else:
+        # Qdrant commands
+        try:
+            if args.command == "compact-sources":
+                report = asyncio.run(compact_sources(dry_run=args.dry_run, batch_size=args.batch_size))
+            else:
+                report = asyncio.run(check_collections(delete_orphans=args.delete_orphans))
+        except QdrantStorageLocked as e:
+            sys.exit(f"error: {e}")
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
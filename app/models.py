@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, BigInteger, Float, String, ForeignKey, DateTime, Date, Boolean, LargeBinary, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .db import Base
@@ -54,8 +54,99 @@ class Bot(Base):
     text_color = Column(String, nullable=True, default="#111827")
     logo_url = Column(String, nullable=True)
     show_branding = Column(Boolean, default=True)
+    # Shared knowledge base this bot answers from (NULL: legacy bot_<bot_id> collection)
+    kb_id = Column(Integer, ForeignKey("knowledge_bases.id", ondelete="SET NULL"), nullable=True, index=True)
 
     owner = relationship("User", back_populates="bots")
+    kb = relationship("KnowledgeBase")
+
+    @property
+    def collection_key(self) -> str:
+        """What vector_store functions take as bot_id for this bot's chunks."""
+        return self.kb.collection_key if self.kb is not None else self.bot_id
+
+
+# -----------------------------
+# KNOWLEDGEBASE MODEL
+# One crawled + embedded version of a website in its own Qdrant collection.
+# Bots for the same normalised URL share the newest fresh version; its
+# reference count is the number of bots pointing at it.
+# -----------------------------
+class KnowledgeBase(Base):
+    __tablename__ = "knowledge_bases"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url_key = Column(String, index=True, nullable=False)          # normalised website URL
+    collection_key = Column(String, unique=True, nullable=False)  # collection is bot_<collection_key>
+    status = Column(String, default="building")                   # building / ready / failed / retired
+
+    points = Column(Integer, default=0)
+    build_seconds = Column(Float, nullable=True)
+    reuses = Column(Integer, default=0)      # bots attached without a build of their own
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    built_at = Column(DateTime, nullable=True)
+# -----------------------------
+# CRAWLEDPAGE MODEL
+# One indexed page of a collection (shared knowledge base or legacy bot)
+# with what the recrawl scheduler needs to revisit it cheaply.
+# -----------------------------
+class CrawledPage(Base):
+    __tablename__ = "crawled_pages"
+    __table_args__ = (UniqueConstraint("collection_key", "url", name="uq_crawled_pages_collection_url"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    collection_key = Column(String, index=True, nullable=False)
+    url = Column(String, nullable=False)
+
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    content_hash = Column(String, nullable=True)     # sha1 of the extracted text; NULL until first revisit
+
+    checks = Column(Integer, default=0)
+    changes = Column(Integer, default=0)
+    interval_s = Column(Float, nullable=True)        # adapts to how often the page changes
+    last_checked_at = Column(DateTime, nullable=True)
+    last_changed_at = Column(DateTime, nullable=True)
+    next_check_at = Column(DateTime, index=True, nullable=True)
+
+
+# -----------------------------
+# BUILDJOB MODEL
+# One row per run_pipeline execution (create / refresh). Counters are
+# updated while the build runs; per-stage seconds stay after it finishes
+# so slow sites / stages can be found across the fleet.
+# -----------------------------
+class BuildJob(Base):
+    __tablename__ = "build_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    bot_id = Column(Integer, ForeignKey("bots.id", ondelete="CASCADE"), index=True, nullable=False)
+    kind = Column(String, default="create")            # create / refresh
+    status = Column(String, default="running")         # running / ready / failed
+    stage = Column(String, nullable=True)              # crawling / embedding / saving
+    error_message = Column(String, nullable=True)
+
+    pages_total = Column(Integer, default=0)
+    pages_fetched = Column(Integer, default=0)
+    pages_processed = Column(Integer, default=0)
+    bytes_fetched = Column(BigInteger, default=0)
+    chunks_produced = Column(Integer, default=0)
+    chunks_embedded = Column(Integer, default=0)
+    embeddings_reused = Column(Integer, default=0)   # served by the chunk embedding store, no API call
+    points_upserted = Column(Integer, default=0)
+
+    crawl_seconds = Column(Float, nullable=True)
+    embed_seconds = Column(Float, nullable=True)
+    chunk_seconds = Column(Float, nullable=True)     # clean + chunk share of embed_seconds
+    save_seconds = Column(Float, nullable=True)
+    total_seconds = Column(Float, nullable=True)
+
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    bot = relationship("Bot")
 # -----------------------------
 # CHATSESSION MODEL
 # -----------------------------
@@ -91,7 +182,66 @@ class ChatLog(Base):
     retrieved_sources = Column(String, nullable=True)  # JSON string of sources
 
     response_time_ms = Column(Integer, nullable=True)  # how long LLM took
+    stage_timings = Column(String, nullable=True)      # JSON {stage: ms} — bot_lookup, embed, generate, ...
 
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    bot = relationship("Bot")
\ No newline at end of file
+    bot = relationship("Bot")
+
+
+# -----------------------------
+# ANALYTICS ROLLUPS
+# Maintained incrementally by the chat log writer / signup paths
+# (see services/analytics_rollup.py) so the admin dashboard never
+# scans chat_logs. bot_id is deliberately not a FK: history survives
+# bot deletion, like it did when analytics read chat_logs directly.
+# -----------------------------
+class BotDailyStat(Base):
+    __tablename__ = "bot_daily_stats"
+
+    day = Column(Date, primary_key=True)
+    bot_id = Column(Integer, primary_key=True)
+
+    messages = Column(Integer, nullable=False, default=0)
+    unique_sessions = Column(Integer, nullable=False, default=0)
+    latency_sum_ms = Column(BigInteger, nullable=False, default=0)
+    latency_count = Column(Integer, nullable=False, default=0)
+
+
+class DailySession(Base):
+    """One row per (day, bot, session) — only used to count unique sessions incrementally."""
+    __tablename__ = "daily_sessions"
+
+    day = Column(Date, primary_key=True)
+    bot_id = Column(Integer, primary_key=True)
+    session_id = Column(String, primary_key=True)
+
+
+class DailySignupStat(Base):
+    __tablename__ = "daily_signup_stats"
+
+    day = Column(Date, primary_key=True)
+    new_users = Column(Integer, nullable=False, default=0)
+    new_bots = Column(Integer, nullable=False, default=0)
+
+
+# -----------------------------
+# LATENCY SKETCHES
+# One mergeable quantile sketch per (time window, bot, provider, stage,
+# worker process) — see services/latency_sketch.py
+# -----------------------------
+class LatencySketchRow(Base):
+    __tablename__ = "latency_sketches"
+    __table_args__ = (
+        UniqueConstraint("window_start", "bot_id", "provider", "stage", "source", name="uq_latency_sketch_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    window_start = Column(DateTime, nullable=False, index=True)
+    bot_id = Column(Integer, nullable=False, default=0)        # 0 = not bot-specific
+    provider = Column(String, nullable=False, default="")      # "" = no LLM provider involved
+    stage = Column(String, nullable=False)
+    source = Column(String, nullable=False)                     # host:pid that owns the row
+
+    count = Column(Integer, nullable=False, default=0)
+    sketch = Column(LargeBinary, nullable=False)
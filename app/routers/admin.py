@@ -2,24 +2,35 @@ import logging
 from typing import List
 from datetime import datetime, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, cast, Date
+from sqlalchemy import func
 
-from app.db import get_db
+from app.db import get_db, db_session, get_pool_status
 from app import models, schemas
 from app.routers.auth import get_current_user
-from app.services.vector_store import delete_collection
+from app.services.principal_cache import Principal, principal_cache
+from app.services.bot_config_cache import bot_config_cache
+from app.services.status_bus import status_bus
+from app.services import knowledge_bases
+from app.services.chat_log_writer import chat_log_writer
+from app.services.swr_cache import SWRCache
+from app.services.latency_sketch import query_latency
+from app.services.build_progress import job_summary
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+ANALYTICS_FRESH_TTL_S = 60
+ANALYTICS_STALE_TTL_S = 600
+analytics_cache = SWRCache(fresh_ttl=ANALYTICS_FRESH_TTL_S, stale_ttl=ANALYTICS_STALE_TTL_S)
+
 
 # ---------------------------------------------------
 # Helper: ensure caller is SUPER ADMIN
 # ---------------------------------------------------
-def ensure_super_admin(current_user: models.User):
+def ensure_super_admin(current_user: Principal):
     if current_user.role != "super_admin":
         raise HTTPException(status_code=403, detail="Admin access only")
 
@@ -30,7 +41,7 @@ def ensure_super_admin(current_user: models.User):
 @router.get("/users", response_model=List[schemas.AdminUserSummary])
 def list_users(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """
     Admin: see all users + how many bots each has.
@@ -70,7 +81,7 @@ def update_user(
     user_id: int,
     payload: schemas.AdminUserUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     ensure_super_admin(current_user)
 
@@ -88,6 +99,7 @@ def update_user(
         user.bot_limit = payload.bot_limit
 
     db.commit()
+    principal_cache.invalidate(user_id)
     return {"detail": f"User {user_id} updated"}
 
 
@@ -99,7 +111,7 @@ def update_user(
 def list_bots(
     owner_id: int | None = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """
     Admin: see all bots in the system.
@@ -138,7 +150,7 @@ def list_bots(
 @router.get("/stats", response_model=schemas.SaaSStats)
 def get_saas_stats(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """
     Admin: high-level stats for the whole platform.
@@ -163,11 +175,98 @@ def get_saas_stats(
 # ---------------------------------------------------
 # 4) ANALYTICS (ADMIN ONLY)
 # ---------------------------------------------------
+def _compute_analytics(days: int) -> dict:
+    """
+    Build the analytics payload from the daily rollup tables only
+    (bot_daily_stats / daily_signup_stats) — never from chat_logs, so the
+    cost depends on days × active bots, not on total message volume.
+    """
+    since_day = (datetime.utcnow() - timedelta(days=days)).date()
+
+    with db_session() as db:
+        # Messages, unique sessions and latency per day
+        per_day_raw = (
+            db.query(
+                models.BotDailyStat.day.label("date"),
+                func.sum(models.BotDailyStat.messages).label("messages"),
+                func.sum(models.BotDailyStat.unique_sessions).label("sessions"),
+            )
+            .filter(models.BotDailyStat.day >= since_day)
+            .group_by(models.BotDailyStat.day)
+            .order_by(models.BotDailyStat.day)
+            .all()
+        )
+        messages_per_day = [
+            {"date": str(row.date), "count": int(row.messages or 0)}
+            for row in per_day_raw
+        ]
+        # Sessions are per bot (IP + bot_id), so per-bot counts add up exactly
+        unique_sessions_per_day = [
+            {"date": str(row.date), "count": int(row.sessions or 0)}
+            for row in per_day_raw
+        ]
+
+        # New users / bots per day
+        signups_raw = (
+            db.query(models.DailySignupStat)
+            .filter(models.DailySignupStat.day >= since_day)
+            .order_by(models.DailySignupStat.day)
+            .all()
+        )
+        users_per_day = [
+            {"date": str(row.day), "count": row.new_users}
+            for row in signups_raw
+            if row.new_users
+        ]
+        bots_per_day = [
+            {"date": str(row.day), "count": row.new_bots}
+            for row in signups_raw
+            if row.new_bots
+        ]
+
+        # Top 5 bots by message count
+        top_bots_raw = (
+            db.query(models.Bot)
+            .order_by(models.Bot.message_count.desc())
+            .limit(5)
+            .all()
+        )
+        top_bots = [
+            {
+                "bot_id": b.bot_id,
+                "website_url": b.website_url,
+                "message_count": b.message_count or 0,
+                "owner_email": b.owner.email if b.owner else None,
+                "last_used_at": b.last_used_at.isoformat() if b.last_used_at else None,
+            }
+            for b in top_bots_raw
+        ]
+
+        # Average response time
+        latency_sum, latency_count = (
+            db.query(
+                func.sum(models.BotDailyStat.latency_sum_ms),
+                func.sum(models.BotDailyStat.latency_count),
+            )
+            .filter(models.BotDailyStat.day >= since_day)
+            .one()
+        )
+
+    return {
+        "messages_per_day": messages_per_day,
+        "users_per_day": users_per_day,
+        "bots_per_day": bots_per_day,
+        "top_bots": top_bots,
+        "avg_response_time_ms": round(latency_sum / latency_count) if latency_count else 0,
+        "unique_sessions_per_day": unique_sessions_per_day,
+    }
+
+
 @router.get("/analytics")
 def get_analytics(
+    response: Response,
     days: int = 30,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """
     Admin: detailed analytics for the past N days.
@@ -178,108 +277,144 @@ def get_analytics(
     - top_bots (by message count)
     - avg_response_time_ms
     - unique_sessions_per_day
+
+    Served stale-while-revalidate from an in-process cache.
     """
     ensure_super_admin(current_user)
- 
-    since = datetime.utcnow() - timedelta(days=days)
- 
-    # Messages per day
-    messages_per_day_raw = (
-        db.query(
-            cast(models.ChatLog.created_at, Date).label("date"),
-            func.count(models.ChatLog.id).label("count"),
-        )
-        .filter(models.ChatLog.created_at >= since)
-        .group_by(cast(models.ChatLog.created_at, Date))
-        .order_by(cast(models.ChatLog.created_at, Date))
-        .all()
-    )
-    messages_per_day = [
-        {"date": str(row.date), "count": row.count}
-        for row in messages_per_day_raw
-    ]
- 
-    # New users per day
-    users_per_day_raw = (
-        db.query(
-            cast(models.User.created_at, Date).label("date"),
-            func.count(models.User.id).label("count"),
-        )
-        .filter(models.User.created_at >= since)
-        .group_by(cast(models.User.created_at, Date))
-        .order_by(cast(models.User.created_at, Date))
-        .all()
-    )
-    users_per_day = [
-        {"date": str(row.date), "count": row.count}
-        for row in users_per_day_raw
-    ]
- 
-    # New bots per day
-    bots_per_day_raw = (
-        db.query(
-            cast(models.Bot.created_at, Date).label("date"),
-            func.count(models.Bot.id).label("count"),
-        )
-        .filter(models.Bot.created_at >= since)
-        .group_by(cast(models.Bot.created_at, Date))
-        .order_by(cast(models.Bot.created_at, Date))
-        .all()
-    )
-    bots_per_day = [
-        {"date": str(row.date), "count": row.count}
-        for row in bots_per_day_raw
-    ]
- 
-    # Top 5 bots by message count
-    top_bots_raw = (
-        db.query(models.Bot)
-        .order_by(models.Bot.message_count.desc())
-        .limit(5)
-        .all()
+
+    response.headers["Cache-Control"] = (
+        f"private, max-age={ANALYTICS_FRESH_TTL_S}, "
+        f"stale-while-revalidate={ANALYTICS_STALE_TTL_S - ANALYTICS_FRESH_TTL_S}"
     )
-    top_bots = [
-        {
-            "bot_id": b.bot_id,
-            "website_url": b.website_url,
-            "message_count": b.message_count or 0,
-            "owner_email": b.owner.email if b.owner else None,
-            "last_used_at": b.last_used_at.isoformat() if b.last_used_at else None,
-        }
-        for b in top_bots_raw
-    ]
- 
-    # Average response time
-    avg_response_time = (
-        db.query(func.avg(models.ChatLog.response_time_ms))
-        .filter(models.ChatLog.created_at >= since)
-        .scalar()
+    return analytics_cache.get(days, lambda: _compute_analytics(days))
+
+
+# ---------------------------------------------------
+# 4a) LATENCY PERCENTILES (ADMIN ONLY)
+# ---------------------------------------------------
+LATENCY_GROUP_FIELDS = {"stage", "provider", "bot_id"}
+
+
+@router.get("/latency")
+def get_latency(
+    hours: int = 24,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    bot_id: str | None = None,
+    stage: str | None = None,
+    provider: str | None = None,
+    group_by: str = "stage,provider",
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Admin: p50 / p90 / p99 latency from the stored quantile sketches.
+    Window is [since, until) or the last `hours` hours.
+    group_by: comma-separated subset of stage, provider, bot_id.
+    """
+    ensure_super_admin(current_user)
+
+    groups = tuple(g.strip() for g in group_by.split(",") if g.strip())
+    if not set(groups) <= LATENCY_GROUP_FIELDS:
+        raise HTTPException(status_code=400, detail=f"group_by must be a subset of {sorted(LATENCY_GROUP_FIELDS)}")
+
+    bot_pk = None
+    if bot_id:
+        bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
+        if not bot:
+            raise HTTPException(status_code=404, detail="Bot not found")
+        bot_pk = bot.id
+
+    return query_latency(
+        db,
+        since=since or datetime.utcnow() - timedelta(hours=hours),
+        until=until,
+        bot_id=bot_pk,
+        stage=stage,
+        provider=provider,
+        group_by=groups,
     )
- 
-    # Unique sessions per day
-    unique_sessions_per_day_raw = (
-        db.query(
-            cast(models.ChatLog.created_at, Date).label("date"),
-            func.count(func.distinct(models.ChatLog.session_id)).label("count"),
+
+
+# ---------------------------------------------------
+# 4b) DB CONNECTION POOL (ADMIN ONLY)
+# ---------------------------------------------------
+@router.get("/db-pool")
+def get_db_pool(
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Admin: connection pool occupancy + checkout wait / overflow counters,
+    plus the write-behind chat log queue.
+    """
+    ensure_super_admin(current_user)
+    return {**get_pool_status(), "chat_log_writer": chat_log_writer.stats()}
+
+
+# ---------------------------------------------------
+# 4c) SLOWEST BUILDS (ADMIN ONLY)
+# ---------------------------------------------------
+BUILD_SORT_COLUMNS = {
+    "total": models.BuildJob.total_seconds,
+    "crawling": models.BuildJob.crawl_seconds,
+    "embedding": models.BuildJob.embed_seconds,
+    "saving": models.BuildJob.save_seconds,
+}
+
+
+@router.get("/builds")
+def get_slowest_builds(
+    hours: int = 24 * 7,
+    sort_by: str = "total",
+    status: str | None = None,
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Admin: slowest finished ingestion builds, by total time or by one stage
+    (crawling / embedding / saving), with their throughput counters.
+    """
+    ensure_super_admin(current_user)
+
+    column = BUILD_SORT_COLUMNS.get(sort_by)
+    if column is None:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of {sorted(BUILD_SORT_COLUMNS)}")
+
+    q = (
+        db.query(models.BuildJob, models.Bot.bot_id, models.Bot.website_url)
+        .join(models.Bot, models.Bot.id == models.BuildJob.bot_id)
+        .filter(
+            models.BuildJob.finished_at.isnot(None),
+            models.BuildJob.started_at >= datetime.utcnow() - timedelta(hours=hours),
+            column.isnot(None),
         )
-        .filter(models.ChatLog.created_at >= since)
-        .group_by(cast(models.ChatLog.created_at, Date))
-        .order_by(cast(models.ChatLog.created_at, Date))
-        .all()
     )
-    unique_sessions_per_day = [
-        {"date": str(row.date), "count": row.count}
-        for row in unique_sessions_per_day_raw
+    if status:
+        q = q.filter(models.BuildJob.status == status)
+
+    rows = q.order_by(column.desc()).limit(min(limit, 200)).all()
+    return [
+        {"bot_id": bot_id, "website_url": website_url, **job_summary(job)}
+        for job, bot_id, website_url in rows
     ]
- 
-    return {
-        "messages_per_day": messages_per_day,
-        "users_per_day": users_per_day,
-        "bots_per_day": bots_per_day,
-        "top_bots": top_bots,
-        "avg_response_time_ms": round(avg_response_time) if avg_response_time else 0,
-        "unique_sessions_per_day": unique_sessions_per_day,
-    }
+
+
+# ---------------------------------------------------
+# 4d) SHARED KNOWLEDGE BASES (ADMIN ONLY)
+# ---------------------------------------------------
+@router.get("/knowledge-bases")
+def get_knowledge_base_savings(
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Admin: storage and build time saved by bots sharing a knowledge base,
+    plus the most shared sites.
+    """
+    ensure_super_admin(current_user)
+    return knowledge_bases.savings_report(db, limit=min(limit, 200))
 
 
 # ---------------------------------------------------
@@ -289,7 +424,7 @@ def get_analytics(
 async def admin_delete_bot(
     bot_id: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """
     Admin: delete any bot + its Chroma index.
@@ -300,11 +435,14 @@ async def admin_delete_bot(
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
 
-    # delete vector store folder
-    await delete_collection(bot_id)
-
+    kb_id = bot.kb_id
     db.delete(bot)
+    status_bus.notify_invalidate(db, bot_id)
     db.commit()
+    bot_config_cache.invalidate(bot_id)
+
+    # Its collection, or its reference to a shared knowledge base
+    await knowledge_bases.release_storage(bot_id, kb_id)
 
     return {"detail": f"Bot {bot_id} deleted"}
 
@@ -316,7 +454,7 @@ async def admin_delete_bot(
 async def admin_delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """
     Admin: delete a user (and their bots via cascade).
@@ -327,12 +465,18 @@ async def admin_delete_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Optionally: delete each bot's Chroma
-    for bot in user.bots:
-        await delete_collection(bot.bot_id)
+    storage = [(bot.bot_id, bot.kb_id) for bot in user.bots]
 
     db.delete(user)
+    for bot_id, _ in storage:
+        status_bus.notify_invalidate(db, bot_id)
     db.commit()
+    principal_cache.invalidate(user_id)
+
+    # Collections (or shared knowledge-base references) once the bot rows are gone
+    for bot_id, kb_id in storage:
+        bot_config_cache.invalidate(bot_id)
+        await knowledge_bases.release_storage(bot_id, kb_id)
 
     return {"detail": f"User {user_id} deleted (and their bots)"}
 
@@ -345,7 +489,7 @@ def set_user_bot_limit(
     user_id: int,
     bot_limit: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     ensure_super_admin(current_user)
 
@@ -355,5 +499,6 @@ def set_user_bot_limit(
 
     user.bot_limit = bot_limit
     db.commit()
+    principal_cache.invalidate(user_id)
 
     return {"detail": f"Bot limit for user {user_id} set to {bot_limit}"}
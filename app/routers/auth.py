@@ -8,8 +8,10 @@ from sqlalchemy.orm import Session
 
 from fastapi.security import APIKeyHeader
 
-from app.db import get_db
+from app.db import get_db, db_session
 from app import models, schemas
+from app.services.analytics_rollup import record_signup
+from app.services.principal_cache import Principal, principal_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -55,8 +57,11 @@ def create_access_token(data: dict):
 # ====================================
 def get_current_user(
     token: str = Depends(auth_header),
-    db: Session = Depends(get_db)
-):
+) -> Principal:
+    """
+    Verify the JWT on every request; the user lookup behind it is served
+    from principal_cache, so most authenticated requests never touch the DB.
+    """
     if not token:
         raise HTTPException(status_code=401, detail="Missing Authorization header")
 
@@ -69,12 +74,18 @@ def get_current_user(
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    principal = principal_cache.get(user_id)
+    if principal:
+        return principal
 
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
+    with db_session() as db:
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        principal = Principal.from_user(user)
 
-    return user
+    principal_cache.put(principal)
+    return principal
 
 
 # ====================================
@@ -94,6 +105,7 @@ def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
     )
 
     db.add(new_user)
+    record_signup(db, users=1)
     db.commit()
     db.refresh(new_user)
 
@@ -125,7 +137,7 @@ def set_user_role(
     user_id: int,
     new_role: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     # Ensure only the SUPER ADMIN can do this
     if current_user.role != "super_admin":
@@ -140,6 +152,7 @@ def set_user_role(
     user.role = new_role
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate(user.id)
 
     return {
         "message": "Role updated successfully",
@@ -1,110 +1,235 @@
+import os
+import json
 import logging
 import uuid
+from datetime import datetime, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from fastapi import BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from fastapi import File, UploadFile
 from app.services.cloudinary_upload import upload_logo
 
-from app.db import get_db
+from app.db import get_db, db_session
 from app import models, schemas
 
-from app.services.crawler_apify import crawl_website
+from app.services.crawler import CRAWLER, crawl_website
 from app.services.text_processing import process_text_to_chunks
-from app.services.embeddings import embed_text
-from app.services.vector_store import add_chunks_to_qdrant, delete_collection
+from app.services.chunk_embedding_store import embed_chunks
+from app.services.vector_store import add_chunks_to_qdrant, chunk_metadatas
+from app.services import knowledge_bases, recrawl
+from app.services.source_refs import load_source_refs, resolve_sources
+from app.services.analytics_rollup import record_signup
+from app.services.latency_sketch import query_latency
+from app.services.build_progress import BuildProgress, load_status
+from app.services.status_bus import status_bus, TERMINAL_STATUSES
 from app.routers.auth import get_current_user  # 👈 use this for auth
+from app.services.principal_cache import Principal
+from app.services.bot_config_cache import bot_config_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Pages crawled per bot build
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "10"))
+
 # -------------------------------------------------------------
 # 🔧 BACKGROUND PIPELINE FUNCTION
 # -------------------------------------------------------------
-async def run_pipeline(bot_id: str, website_url: str, bot_db_id: int):
-    db = next(get_db())
+async def run_pipeline(
+    bot_id: str, website_url: str, bot_db_id: int, kind: str = "create", collection_key: str | None = None,
+) -> bool:
+    """
+    Crawl → chunk → embed → upsert for one bot, into collection_key's
+    collection (default: the bot's own). Returns True when the bot is READY.
+    Progress, throughput counters and per-stage timings are recorded in a
+    BuildJob row; no DB session is held across the crawl / embedding awaits.
+    """
+    import numpy as np   # not at import time: cold starts are mostly chats
+
+    progress = BuildProgress(bot_db_id, kind=kind)
     try:
-        bot = db.query(models.Bot).filter(models.Bot.id == bot_db_id).first()
-        logger.info(f"[PIPELINE] Starting for bot {bot_id}")
+        await progress.begin()
+        logger.info(f"[PIPELINE] Starting {kind} for bot {bot_id} (job {progress.job_id})")
 
         # 1️⃣ CRAWL
-        bot.status = "crawling"
-        bot.error_message = None
-        db.commit()
-        page_texts = crawl_website(website_url, max_pages=10)
+        await progress.set_stage("crawling")
+        page_texts = await run_in_threadpool(crawl_website, website_url, max_pages=CRAWL_MAX_PAGES)
         if not page_texts:
             raise Exception("No pages found. The website may be empty, behind a login, or blocked the crawler.")
+        await progress.set(
+            pages_total=len(page_texts),
+            pages_fetched=len(page_texts),
+            bytes_fetched=sum(len(t.encode()) for t in page_texts.values()),
+        )
         logger.info(f"[PIPELINE] Crawled {len(page_texts)} pages.")
 
         # 2️⃣ CHUNK + EMBED
-        bot.status = "embedding"
-        db.commit()
+        await progress.set_stage("embedding")
 
         all_chunks = []
-        all_embeddings = []
+        all_embeddings = []     # one float32 matrix per page, stacked once before saving
         all_metadatas = []
 
         for page_url, text in page_texts.items():
             logger.info(f"[PIPELINE] Processing page: {page_url}")
-            chunks = process_text_to_chunks(text)
+            with progress.measure("chunking"):
+                chunks = process_text_to_chunks(text)
             if not chunks:
                 logger.warning(f"[PIPELINE] No chunks for page: {page_url}")
+                await progress.add(pages_processed=1)
                 continue
-            embeddings = await embed_text(chunks)
-            for c, e in zip(chunks, embeddings):
-                chunk_index = len(all_chunks)
-                all_chunks.append(c)
-                all_embeddings.append(e)
-                all_metadatas.append({
-                    "bot_id": bot_id,
-                    "page_url": page_url,
-                    "chunk_index": chunk_index,
-                })
+            # Chunks embedded by any earlier build on this host come from the store
+            embeddings, reused = await embed_chunks(chunks)
+            all_embeddings.append(embeddings)
+            all_metadatas.extend(chunk_metadatas(bot_id, page_url, len(chunks), len(all_chunks)))
+            all_chunks.extend(chunks)
+            await progress.add(pages_processed=1, chunks_produced=len(chunks), chunks_embedded=len(embeddings), embeddings_reused=reused)
 
         if not all_chunks:
             raise Exception("No content could be extracted from the website. Try a different URL.")
 
         # 3️⃣ SAVE TO QDRANT
-        bot.status = "saving"
-        db.commit()
+        await progress.set_stage("saving")
         logger.info(f"[PIPELINE] Saving {len(all_chunks)} chunks for bot {bot_id}")
-        await add_chunks_to_qdrant(bot_id, all_chunks, all_embeddings, all_metadatas)
+        await add_chunks_to_qdrant(
+            collection_key or bot_id, all_chunks, np.concatenate(all_embeddings), all_metadatas,
+            on_progress=lambda n: progress.add(points_upserted=n),
+        )
+        await progress.set(points_upserted=len(all_chunks))
+        # What the recrawl scheduler revisits (HTTP-crawled text hashes match its own extraction)
+        await run_in_threadpool(recrawl.record_pages, collection_key or bot_id, page_texts, CRAWLER == "http")
 
         # 4️⃣ MARK READY
-        bot.status = "ready"
-        db.commit()
+        await progress.finish("ready")
         logger.info(f"[PIPELINE] Bot {bot_id} is READY!")
+        return True
 
     except Exception as e:
         logger.exception(f"[PIPELINE] Failed for bot {bot_id}: {e}")
-        bot = db.query(models.Bot).filter(models.Bot.id == bot_db_id).first()
-        if bot:
-            bot.status = "failed"
-            bot.error_message = str(e)
-            db.commit()
+        try:
+            await progress.finish("failed", str(e))
+        except Exception:
+            logger.exception(f"[PIPELINE] Could not mark bot {bot_id} as failed")
+        return False
     finally:
-        db.close()
- 
+        # Cancelled builds (shutdown) stop beating, so the version is swept as orphaned
+        progress.stop_heartbeat()
+
+
+async def build_knowledge_base(
+    kb_id: int, collection_key: str, bot_id: str, website_url: str, bot_db_id: int, kind: str = "create",
+) -> bool:
+    """run_pipeline into a knowledge-base version, then settle the bots waiting on it."""
+    ok = await run_pipeline(bot_id, website_url, bot_db_id, kind=kind, collection_key=collection_key)
+    await knowledge_bases.finish_build(kb_id, bot_db_id, ok)
+    return ok
+
  # -------------------------------------------------------------
-# 📊 BOT STATUS ENDPOINT (for frontend polling)
+# 📊 BOT STATUS ENDPOINTS (snapshot, long-poll, SSE stream)
 # -------------------------------------------------------------
+STATUS_HEARTBEAT_S = 15
+STATUS_LONG_POLL_MAX_S = 30
+
+
 @router.get("/{bot_id}/status")
 def get_bot_status(
     bot_id: str,
     db: Session = Depends(get_db),
 ):
-    bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
-    if not bot:
+    status = load_status(db, bot_id)
+    if status is None:
         raise HTTPException(status_code=404, detail="Bot not found")
-    return {"status": bot.status, "bot_id": bot.bot_id, "error_message": bot.error_message}
+    return status
+
+
+def _load_status_snapshot(bot_id: str) -> dict | None:
+    with db_session() as db:
+        status = load_status(db, bot_id)
+        return jsonable_encoder(status) if status is not None else None
+
+
+async def _current_status(bot_id: str) -> tuple[int, dict]:
+    """Latest pushed state, or one DB read to seed the bus for this bot."""
+    state = status_bus.current(bot_id)
+    if state is None:
+        snapshot = await run_in_threadpool(_load_status_snapshot, bot_id)
+        if snapshot is None:
+            raise HTTPException(status_code=404, detail="Bot not found")
+        state = status_bus.seed(bot_id, snapshot)
+    return state
+
+
+@router.get("/{bot_id}/status/wait")
+async def wait_bot_status(
+    bot_id: str,
+    since: int = -1,
+    timeout: float = 25,
+):
+    """
+    Long-poll: returns as soon as the status is newer than `since`
+    (the `version` from the previous response), or the unchanged
+    status after `timeout` seconds.
+    """
+    version, payload = await _current_status(bot_id)
+    if version <= since:
+        state = await status_bus.wait(bot_id, since, min(timeout, STATUS_LONG_POLL_MAX_S))
+        if state:
+            version, payload = state
+    return {"version": version, **payload}
+
+
+@router.get("/{bot_id}/status/stream")
+async def stream_bot_status(
+    bot_id: str,
+    request: Request,
+    last_event_id: str | None = Header(default=None),
+):
+    """
+    Server-Sent Events: one `status` event per change, closed once the
+    bot is ready / failed. Reconnects resume from Last-Event-ID.
+    """
+    version, payload = await _current_status(bot_id)
+    since = int(last_event_id) if last_event_id and last_event_id.isdigit() else -1
+
+    async def events():
+        nonlocal version, payload
+        sent = since
+        status_bus.subscribers += 1
+        try:
+            while True:
+                terminal = payload.get("status") in TERMINAL_STATUSES
+                if version > sent or terminal:
+                    yield f"event: status\nid: {version}\ndata: {json.dumps(payload)}\n\n"
+                    sent = version
+                    if terminal:
+                        return
+                state = await status_bus.wait(bot_id, sent, STATUS_HEARTBEAT_S)
+                if state:
+                    version, payload = state
+                    continue
+                if await request.is_disconnected():
+                    return
+                yield ": ping\n\n"
+        finally:
+            status_bus.subscribers -= 1
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.post("/create", response_model=schemas.BotCreateResponse)
 async def create_bot(
     payload: schemas.BotCreateRequest,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     website_url = str(payload.website_url)
     logger.info(f"User {current_user.id} ({current_user.email}) requested bot for: {website_url}")
@@ -150,14 +275,22 @@ async def create_bot(
             detail=f"You have reached your bot limit ({bot_limit}). Upgrade to create more bots."
         )
  
-    # Create new bot in DB
+    # Create new bot in DB, on a fresh shared version of the site if one exists
     bot_id = str(uuid.uuid4())
-    logger.info(f"Creating new bot with bot_id={bot_id}")
+    kb = knowledge_bases.find_shared(db, website_url)
+    shared = kb is not None
+    if shared:
+        kb.reuses = (kb.reuses or 0) + 1
+        logger.info(f"Creating new bot with bot_id={bot_id} on shared knowledge base {kb.id} ({kb.status})")
+    else:
+        kb = knowledge_bases.new_version(db, website_url)
+        logger.info(f"Creating new bot with bot_id={bot_id} (knowledge base {kb.id})")
  
     new_bot = models.Bot(
     bot_id=bot_id,
     website_url=website_url,
-    status="processing",
+    status="ready" if kb.status == "ready" else "processing",
+    kb_id=kb.id,
     vector_index_path=f"app/data/chroma/bots/{bot_id}",
     user_id=current_user.id,
     bot_name=payload.bot_name,
@@ -171,6 +304,7 @@ async def create_bot(
  
     try:
         db.add(new_bot)
+        record_signup(db, bots=1)
         db.commit()
         db.refresh(new_bot)
     except Exception:
@@ -178,20 +312,27 @@ async def create_bot(
         logger.exception("Failed to save bot in DB.")
         raise HTTPException(status_code=500, detail="Failed to create bot")
  
-    # 🚀 Run pipeline in background — return immediately
-    background_tasks.add_task(run_pipeline, bot_id, website_url, new_bot.id)
+    if shared:
+        # The shared build may have finished before this bot was committed
+        knowledge_bases.settle_attached(db, new_bot)
+
+    # 🚀 Run pipeline in background — return immediately (shared versions are built already or in flight)
+    if not shared:
+        background_tasks.add_task(
+            build_knowledge_base, kb.id, kb.collection_key, bot_id, website_url, new_bot.id
+        )
  
     return schemas.BotCreateResponse(
         bot_id=bot_id,
         chat_url=f"/chat/{bot_id}",
-        status="processing",
+        status=new_bot.status,
     )
 
 @router.post("/{bot_id}/refresh", response_model=schemas.BotCreateResponse)
 async def refresh_bot(
     bot_id: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),  # 👈 must be logged in
+    current_user: Principal = Depends(get_current_user),  # 👈 must be logged in
 ):
     """
     Rebuild an existing bot.
@@ -221,73 +362,48 @@ async def refresh_bot(
         )
 
     website_url = bot.website_url
+    bot_db_id = bot.id
+    old_kb_id = bot.kb_id
     logger.info(f"Rebuilding bot for website: {website_url}")
 
-    # Set status to processing
+    # 3️⃣ Copy-on-refresh: this bot moves to a new version; other bots on
+    # the old one keep it, and new bots for the site will share this one
+    kb = knowledge_bases.new_version(db, website_url)
+    kb_id, collection_key = kb.id, kb.collection_key
+    bot.kb_id = kb_id
     bot.status = "processing"
+    status_bus.notify_invalidate(db, bot_id)
     db.commit()
-    db.refresh(bot)
-
-    try:
-        # 3️⃣ Clear existing Qdrant collection
-        delete_collection(bot_id)
-
-        # 4️⃣ Crawl website again
-        page_texts = crawl_website(website_url, max_pages=10)
-        if not page_texts:
-            raise Exception("No pages found or all pages were empty during refresh.")
-
-        logger.info(f"Re-crawled {len(page_texts)} pages for bot {bot_id}")
-
-        all_chunks = []
-        all_embeddings = []
-        all_metadatas = []
-
-        for page_url, text in page_texts.items():
-            logger.info(f"[REFRESH] Processing page: {page_url}")
-
-            chunks = process_text_to_chunks(text)
-            if not chunks:
-                logger.warning(f"[REFRESH] No chunks created for page: {page_url}")
-                continue
-
-            embeddings = await embed_text(chunks)
-
-            for c, e in zip(chunks, embeddings):
-                chunk_index = len(all_chunks)
-                all_chunks.append(c)
-                all_embeddings.append(e)
-                all_metadatas.append(
-                    {
-                        "bot_id": bot_id,
-                        "page_url": page_url,
-                        "chunk_index": chunk_index,
-                    }
-                )
-
-        if not all_chunks:
-            raise Exception("No chunks created during refresh for this website.")
-
-        await add_chunks_to_qdrant(bot_id, all_chunks, all_embeddings, all_metadatas)
-
-        bot.status = "ready"
-        db.commit()
-        db.refresh(bot)
+    bot_config_cache.invalidate(bot_id)
+    db.close()  # the rebuild below records its own progress in short sessions
 
-        logger.info(f"Bot {bot_id} successfully refreshed and READY.")
+    # 4️⃣ Crawl → embed → save (same pipeline as create, tracked as a refresh job)
+    ok = await build_knowledge_base(kb_id, collection_key, bot_id, website_url, bot_db_id, kind="refresh")
 
-    except Exception as e:
-        logger.exception("Refresh pipeline failed. Marking bot as FAILED.")
-        bot.status = "failed"
-        db.commit()
-        db.refresh(bot)
-        raise HTTPException(status_code=500, detail=f"Bot refresh failed: {str(e)}")
-
-    chat_url = f"/chat/{bot.bot_id}"
+    # 5️⃣ Drop this bot's reference to what it answered from before
+    try:
+        await knowledge_bases.release_storage(bot_id, old_kb_id)
+    except Exception:
+        logger.warning(f"Could not release previous knowledge base of bot {bot_id}")
+
+    # The request session was closed above; the bot may be gone by now
+    with db_session() as fresh:
+        bot = fresh.query(models.Bot).filter(models.Bot.id == bot_db_id).first()
+        status, error_message = (bot.status, bot.error_message) if bot else (None, None)
+    if bot is None:
+        logger.warning(f"Bot {bot_id} was deleted during its refresh")
+        raise HTTPException(status_code=404, detail="Bot was deleted during the refresh")
+    if not ok:
+        logger.error("Refresh pipeline failed. Bot marked as FAILED.")
+        raise HTTPException(status_code=500, detail=f"Bot refresh failed: {error_message}")
+
+    logger.info(f"Bot {bot_id} successfully refreshed and READY.")
+
+    chat_url = f"/chat/{bot_id}"
     return schemas.BotCreateResponse(
-        bot_id=bot.bot_id,
+        bot_id=bot_id,
         chat_url=chat_url,
-        status=bot.status,
+        status=status,
     )
 
 
@@ -295,7 +411,7 @@ async def refresh_bot(
 def get_bot_metrics(
     bot_id: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """
     Return basic metrics for a single bot:
@@ -328,10 +444,127 @@ def get_bot_metrics(
         last_used_at=bot.last_used_at,
     )
 
+@router.get("/{bot_id}/latency")
+def get_bot_latency(
+    bot_id: str,
+    hours: int = 24,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Return p50 / p90 / p99 response latency per stage for one bot
+    (owner or super_admin). Window is [since, until) or the last `hours` hours.
+    """
+    bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot not found")
+    if current_user.role != "super_admin" and bot.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not allowed to view this bot")
+
+    return query_latency(
+        db,
+        since=since or datetime.utcnow() - timedelta(hours=hours),
+        until=until,
+        bot_id=bot.id,
+    )
+
+
+@router.get("/{bot_id}/conversations")
+def list_conversations(
+    bot_id: str,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Return the most recent chat sessions for a bot (owner or super_admin).
+    """
+    bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot not found")
+    if current_user.role != "super_admin" and bot.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not allowed to view this bot")
+
+    rows = (
+        db.query(
+            models.ChatLog.session_id,
+            func.count(models.ChatLog.id).label("message_count"),
+            func.max(models.ChatLog.created_at).label("last_message_at"),
+        )
+        .filter(models.ChatLog.bot_id == bot.id)
+        .group_by(models.ChatLog.session_id)
+        .order_by(func.max(models.ChatLog.created_at).desc())
+        .limit(min(limit, 200))
+        .all()
+    )
+    return [
+        {
+            "session_id": r.session_id,
+            "message_count": r.message_count,
+            "last_message_at": r.last_message_at,
+        }
+        for r in rows
+    ]
+
+
+@router.get(
+    "/{bot_id}/conversations/{session_id}",
+    response_model=list[schemas.ConversationMessage],
+)
+async def get_conversation(
+    bot_id: str,
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Return one chat session with its sources.
+    ChatLog only stores point references, so source text is fetched
+    from Qdrant here, in a single lookup for the whole conversation.
+    """
+    bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot not found")
+    if current_user.role != "super_admin" and bot.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not allowed to view this bot")
+
+    logs = (
+        db.query(models.ChatLog)
+        .filter(
+            models.ChatLog.bot_id == bot.id,
+            models.ChatLog.session_id == session_id,
+        )
+        .order_by(models.ChatLog.created_at)
+        .all()
+    )
+    collection_key = bot.collection_key
+    db.close()  # release the connection before the Qdrant lookup
+
+    refs_per_log = [load_source_refs(log.retrieved_sources) for log in logs]
+    resolved = await resolve_sources(collection_key, [r for refs in refs_per_log for r in refs])
+
+    out: list[schemas.ConversationMessage] = []
+    offset = 0
+    for log, refs in zip(logs, refs_per_log):
+        sources = resolved[offset:offset + len(refs)]
+        offset += len(refs)
+        out.append(
+            schemas.ConversationMessage(
+                user_message=log.user_message,
+                bot_response=log.bot_response,
+                created_at=log.created_at,
+                response_time_ms=log.response_time_ms,
+                sources=[schemas.ConversationSource(**src) for src in sources],
+            )
+        )
+    return out
+
 @router.get("/my", response_model=list[schemas.BotSummary])
 def list_my_bots(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """
     Return all bots created by the logged-in user.
@@ -367,7 +600,7 @@ def list_my_bots(
 @router.post("/upload-logo")
 async def upload_bot_logo(
     file: UploadFile = File(...),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     contents = await file.read()
     filename = f"user_{current_user.id}_{file.filename}"
@@ -378,7 +611,7 @@ async def upload_bot_logo(
 async def delete_bot(
     bot_id: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
     if not bot:
@@ -386,13 +619,17 @@ async def delete_bot(
     if bot.user_id != current_user.id and current_user.role != "super_admin":
         raise HTTPException(status_code=403, detail="Not allowed to delete this bot")
 
-    try:
-        delete_collection(bot_id)
-    except Exception:
-        logger.warning(f"Could not delete Qdrant collection for bot {bot_id}")
-
+    kb_id = bot.kb_id
     db.delete(bot)
+    status_bus.notify_invalidate(db, bot_id)
     db.commit()
+    bot_config_cache.invalidate(bot_id)
+
+    # Shared versions are only deleted once their last bot is gone
+    try:
+        await knowledge_bases.release_storage(bot_id, kb_id)
+    except Exception:
+        logger.warning(f"Could not release Qdrant storage for bot {bot_id}")
     return {"detail": f"Bot {bot_id} deleted"}
 
 
@@ -401,7 +638,7 @@ def update_bot_customization(
     bot_id: str,
     payload: schemas.BotUpdateRequest,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
     if not bot:
@@ -437,14 +674,4 @@ def get_bot_public_details(
         "text_color": bot.text_color or "#111827",
         "logo_url": bot.logo_url,
         "show_branding": bot.show_branding if bot.show_branding is not None else True,
-    }
-
-@router.get("/{bot_id}/status")
-def get_bot_status(
-    bot_id: str,
-    db: Session = Depends(get_db),
-):
-    bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
-    if not bot:
-        raise HTTPException(status_code=404, detail="Bot not found")
-    return {"status": bot.status, "bot_id": bot.bot_id, "error_message": bot.error_message}
\ No newline at end of file
+    }
\ No newline at end of file
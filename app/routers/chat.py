@@ -1,71 +1,143 @@
+import os
 import logging
-import time
 import json
-from datetime import datetime
 from fastapi import Request
 import hashlib
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from qdrant_client.http.exceptions import UnexpectedResponse
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 
-from app.db import get_db
+from app.db import db_session
 from app import models, schemas
 
 from app.services.embeddings import embed_text
+from app.services.embedding_cache import query_embedding_cache
+from app.services.bot_config_cache import bot_config_cache
 from app.services.rag import build_rag_prompt
 from app.services.ai_client import generate_answer
-from app.services.vector_store import retrieve_chunks
+from app.services.vector_store import retrieve_chunks, CollectionNotFound
 from app.services.ai_client import AIQuotaError
+from app.services.chat_log_writer import chat_log_writer, ChatLogRecord
+from app.services.source_refs import build_source_refs, dump_source_refs
+from app.services.metrics import StageTimer, observe_chat
+from app.startup import startup_profile
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+# -------------------------------------------------------------
+# DB PHASE
+# Opens its own short session in the threadpool, so no pooled
+# connection is held while we await HF / Qdrant / the LLM.
+# The log write happens later, off the request path (chat_log_writer).
+# -------------------------------------------------------------
+def _load_bot_for_chat(bot_id: str, session_id: str, timer: StageTimer) -> tuple[int, str, int]:
+    """
+    Validate the bot and return (bot primary key, collection key to retrieve
+    from, messages already sent in this session).
+    """
+    with db_session() as db:
+        # Ready bots are cached, so a warm bot costs one query (the quota count)
+        with timer.stage("bot_lookup"):
+            cached = bot_config_cache.get(bot_id)
+            if cached is None:
+                row = (
+                    db.query(models.Bot.id, models.Bot.status, models.KnowledgeBase.collection_key)
+                    .outerjoin(models.KnowledgeBase, models.KnowledgeBase.id == models.Bot.kb_id)
+                    .filter(models.Bot.bot_id == bot_id)
+                    .first()
+                )
+                if not row:
+                    raise HTTPException(status_code=404, detail="Bot not found")
+                if row.status != "ready":
+                    raise HTTPException(status_code=400, detail=f"Bot status is {row.status}")
+                cached = (row.id, row.collection_key or bot_id)
+                bot_config_cache.put(bot_id, *cached)
+            bot_pk, collection_key = cached
+
+        # Count messages from this session
+        with timer.stage("quota_check"):
+            message_count = (
+                db.query(models.ChatLog)
+                .filter(
+                    models.ChatLog.bot_id == bot_pk,
+                    models.ChatLog.session_id == session_id
+                )
+                .count()
+            )
+        return bot_pk, collection_key, message_count
+
+
+# Metric `outcome` label per HTTP status — a small fixed set
+OUTCOME_BY_STATUS = {400: "rejected", 404: "not_found", 429: "rate_limited"}
+
+# Chunks scoring below this (cosine) are not relevant enough to answer from;
+# if none clear it the bot says so without calling the LLM. "" disables.
+_threshold = os.getenv("CHAT_SCORE_THRESHOLD", "0.2")
+CHAT_SCORE_THRESHOLD = float(_threshold) if _threshold else None
+NO_MATCH_ANSWER = (
+    "I don't know — I couldn't find anything about that on this website. "
+    "Try rephrasing your question or asking about something else."
+)
+
+
 @router.post("/{bot_id}", response_model=schemas.ChatResponse)
 async def chat_with_bot(
     bot_id: str,
     payload: schemas.ChatRequest,
     request: Request,
-    db: Session = Depends(get_db),
 ):
     """
     Full RAG flow:
-    1. Validate bot
+    1. Validate bot + session quota (short DB phase)
     2. Embed query
-    3. Fetch relevant chunks from Chroma
+    3. Fetch relevant chunks from Qdrant
     4. Build RAG prompt
-    5. Send prompt to Gemini
+    5. Send prompt to the LLM (skipped when no chunk clears CHAT_SCORE_THRESHOLD)
     6. Return answer + retrieved chunks + page URLs
-    7. 🔹 Update metrics & store ChatLog
+    7. 🔹 Queue ChatLog + metrics for write-behind persistence
+
+    Every stage is timed; timings go to ChatLog.stage_timings, the
+    /metrics histograms and the latency sketches.
     """
+    timer = StageTimer()
+    trace = {"bot_pk": None, "provider": None, "provider_attempts": [], "outcome": "ok"}
+    outcome = "error"
+    try:
+        response = await _chat(bot_id, payload, request, timer, trace)
+        outcome = trace["outcome"]
+        return response
+    except HTTPException as e:
+        outcome = OUTCOME_BY_STATUS.get(e.status_code, "error")
+        raise
+    finally:
+        observe_chat(
+            timer, outcome, bot_id=bot_id, bot_pk=trace["bot_pk"], provider=trace["provider"],
+            provider_attempts=trace["provider_attempts"],
+        )
+        startup_profile.record_first_chat(outcome)
 
-    start_time = time.time()
+
+async def _chat(
+    bot_id: str,
+    payload: schemas.ChatRequest,
+    request: Request,
+    timer: StageTimer,
+    trace: dict,
+) -> schemas.ChatResponse:
     logger.info(f"Chat request received for bot {bot_id}: {payload.message}")
 
-    # 1️⃣ Load bot
-    bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
-    if not bot:
-        raise HTTPException(status_code=404, detail="Bot not found")
-    if bot.status != "ready":
-        raise HTTPException(status_code=400, detail=f"Bot status is {bot.status}")
-    
-     # ✅ NEW: Check question limit per session
+    # 1️⃣ Load bot + check question limit per session
     # Create session ID from IP + bot_id
-    
     client_ip = request.client.host
     session_id = hashlib.md5(f"{client_ip}_{bot_id}".encode()).hexdigest()
-    
-    # Count messages from this session
-    message_count = (
-        db.query(models.ChatLog)
-        .filter(
-            models.ChatLog.bot_id == bot.id,
-            models.ChatLog.session_id == session_id
-        )
-        .count()
-    )
-    
+
+    bot_pk, collection_key, message_count = await run_in_threadpool(_load_bot_for_chat, bot_id, session_id, timer)
+    trace["bot_pk"] = bot_pk
+    # Include answers from this session that are still queued for writing
+    message_count += chat_log_writer.pending_for(bot_pk, session_id)
+
     if message_count >= 5:
         logger.warning(
             f"Session {session_id} has reached question limit ({message_count}/10) for bot {bot_id}"
@@ -81,40 +153,47 @@ async def chat_with_bot(
     if not user_input:
         raise HTTPException(status_code=400, detail="Message cannot be empty")
 
-    # 3️⃣ Embed user question
-    embeddings = await embed_text([user_input])
-    query_vec = embeddings[0]
+    # 3️⃣ Embed user question (repeat questions come from the shared cache)
+    with timer.stage("embed"):
+        query_vec = query_embedding_cache.get(user_input)
+        if query_vec is None:
+            query_vec = (await embed_text([user_input]))[0]
+            query_embedding_cache.put(user_input, query_vec)
 
     # 4️⃣ Retrieve top chunks + metadata from Qdrant
     try:
-        chunks, metadatas = await retrieve_chunks(bot_id, query_vec, top_k=3)
-    except UnexpectedResponse as e:
-        if "404" in str(e):
-            raise HTTPException(
-                status_code=404,
-                detail="This bot's knowledge base was not found. Please delete and recreate the bot.",
+        with timer.stage("retrieve"):
+            chunks, metadatas = await retrieve_chunks(
+                collection_key, query_vec, top_k=3, score_threshold=CHAT_SCORE_THRESHOLD
             )
-        raise
-
-    if not chunks:
-        logger.warning(f"No chunks retrieved from Qdrant for bot {bot_id}")
+    except CollectionNotFound:
         raise HTTPException(
-            status_code=500, detail="No chunks retrieved from vector database"
+            status_code=404,
+            detail="This bot's knowledge base was not found. Please delete and recreate the bot.",
         )
 
-    logger.info(f"Retrieved {len(chunks)} chunks for RAG context.")
+    if chunks:
+        logger.info(f"Retrieved {len(chunks)} chunks for RAG context.")
 
-    # 5️⃣ Build RAG prompt (returns system + user separately)
-    system_prompt, user_message = build_rag_prompt(chunks, user_input)
+        # 5️⃣ Build RAG prompt (returns system + user separately)
+        with timer.stage("prompt_build"):
+            system_prompt, user_message = build_rag_prompt(chunks, user_input)
 
-    # 6️⃣ Generate final answer
-    try:
-        answer = await generate_answer(system_prompt, user_message)
-    except AIQuotaError:
-        raise HTTPException(
-            status_code=429,
-            detail="AI service is temporarily unavailable. Please try again later.",
-    )
+        # 6️⃣ Generate final answer
+        try:
+            with timer.stage("generate"):
+                answer, provider = await generate_answer(system_prompt, user_message, trace["provider_attempts"])
+        except AIQuotaError:
+            raise HTTPException(
+                status_code=429,
+                detail="AI service is temporarily unavailable. Please try again later.",
+        )
+        trace["provider"] = provider
+    else:
+        # Nothing relevant enough — answer honestly without spending an LLM call
+        logger.info(f"No chunks above score {CHAT_SCORE_THRESHOLD} for bot {bot_id}")
+        answer = NO_MATCH_ANSWER
+        trace["outcome"] = "no_match"
 
     # 7️⃣ Shape source_chunks for response
     source_chunks: list[schemas.SourceChunk] = []
@@ -123,43 +202,40 @@ async def chat_with_bot(
             schemas.SourceChunk(
                 text=text,
                 page_url=meta.get("page_url") if meta else None,
+                score=meta.get("score") if meta else None,
             )
         )
 
-    # 8️⃣ 🔹 METRICS + LOGGING BLOCK (this is the new part)
+    # 8️⃣ 🔹 METRICS + LOGGING BLOCK
+    # Queued only — the batch INSERT and the atomic bot counter UPDATE
+    # happen in the background, so the response never waits on Postgres.
+    # "log_write" is therefore the enqueue cost; the batch write itself is
+    # exported as chatlog_flush_duration_seconds.
     try:
-        now = datetime.utcnow()
-        duration_ms = int((time.time() - start_time) * 1000)
-
-        # Update bot-level metrics
-        bot.message_count = (bot.message_count or 0) + 1
-        bot.last_used_at = now
-
-        # Store message log (per Q/A)
-        log_entry = models.ChatLog(
-            session_id=session_id,  # we will add real sessions later
-            bot_id=bot.id,
-            user_message=payload.message,
-            bot_response=answer,
-            retrieved_sources=json.dumps(
-                [sc.model_dump() for sc in source_chunks]
-            ),
-            response_time_ms=duration_ms,
-        )
-
-        db.add(log_entry)
-        db.commit()
-        db.refresh(bot)
+        with timer.stage("log_write"):
+            duration_ms = int(timer.total_ms())
+            chat_log_writer.submit(
+                ChatLogRecord(
+                    bot_id=bot_pk,
+                    session_id=session_id,  # we will add real sessions later
+                    user_message=payload.message,
+                    bot_response=answer,
+                    # Compact point references — text is rehydrated from Qdrant on view
+                    retrieved_sources=dump_source_refs(build_source_refs(metadatas)),
+                    response_time_ms=duration_ms,
+                    stage_timings=json.dumps(timer.as_dict(), separators=(",", ":")),
+                )
+            )
 
         logger.info(
-            f"[METRICS] bot_id={bot.id} messages={bot.message_count}, "
-            f"session={session_id}, session_messages={message_count + 1}/3, "
-            f"response_time_ms={duration_ms}"
+            f"[METRICS] bot_id={bot_pk} session={session_id}, "
+            f"session_messages={message_count + 1}/3, "
+            f"response_time_ms={duration_ms}, stages={timer.as_dict()}"
         )
 
     except Exception:
         # Don't break the chat if metrics fail
-        logger.exception("Failed to update metrics / ChatLog")
+        logger.exception("Failed to queue metrics / ChatLog")
 
     # 9️⃣ Return chatbot reply + context
     return schemas.ChatResponse(
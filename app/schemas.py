@@ -40,12 +40,30 @@ class ChatRequest(BaseModel):
 class SourceChunk(BaseModel):
     text: str
     page_url: str | None = None
+    score: float | None = None
 
 class ChatResponse(BaseModel):
     answer: str
     source_chunks: list[SourceChunk]
 
 
+# -----------------------------
+# CONVERSATION VIEW (owner / admin)
+# -----------------------------
+class ConversationSource(BaseModel):
+    text: str | None = None        # rehydrated from Qdrant; None if the chunk is gone
+    page_url: str | None = None
+    score: float | None = None
+
+
+class ConversationMessage(BaseModel):
+    user_message: str
+    bot_response: str
+    created_at: datetime
+    response_time_ms: int | None = None
+    sources: list[ConversationSource]
+
+
 # -----------------------------
 # USER SCHEMAS
 # -----------------------------
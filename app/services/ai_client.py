@@ -1,5 +1,7 @@
 import os
 import logging
+import threading
+import time
 import httpx
 
 logger = logging.getLogger(__name__)
@@ -17,6 +19,62 @@ SITE_NAME = os.getenv("SITE_NAME", "CustomBot")
 OPENROUTER_MODEL = "nvidia/nemotron-3-super-120b-a12b:free"
 GROQ_MODEL = "llama-3.1-8b-instant"
 
+# Overridable so benchmarks can point at local stand-ins
+OPENROUTER_API_BASE = os.getenv("OPENROUTER_API_BASE", "https://openrouter.ai/api/v1")
+GROQ_API_BASE = os.getenv("GROQ_API_BASE", "https://api.groq.com/openai/v1")
+
+# After an OpenRouter 429, go straight to Groq for this long instead of
+# paying for another rate-limited round trip on every chat
+PROVIDER_COOLDOWN_S = float(os.getenv("PROVIDER_COOLDOWN_S", "30"))
+
+
+class ProviderHealth:
+    """
+    Per-provider outcome counters and the wall-clock time of the last 429.
+    Wall-clock (not monotonic) so a warm-state snapshot stays meaningful
+    in the next process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats: dict[str, dict] = {}
+
+    def _entry(self, provider: str) -> dict:
+        return self.stats.setdefault(
+            provider, {"ok": 0, "rate_limited": 0, "errors": 0, "timeouts": 0, "last_rate_limited_at": None}
+        )
+
+    def record(self, provider: str, outcome: str):
+        with self._lock:
+            entry = self._entry(provider)
+            entry[outcome] += 1
+            if outcome == "rate_limited":
+                entry["last_rate_limited_at"] = time.time()
+
+    def cooling_down(self, provider: str) -> bool:
+        with self._lock:
+            last = self.stats.get(provider, {}).get("last_rate_limited_at")
+        return last is not None and time.time() - last < PROVIDER_COOLDOWN_S
+
+    # ---------- warm-state snapshot ----------
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(entry) for name, entry in self.stats.items()}
+
+    def restore(self, stats: dict) -> int:
+        with self._lock:
+            for name, saved in stats.items():
+                entry = self._entry(name)
+                for key in ("ok", "rate_limited", "errors", "timeouts"):
+                    entry[key] += int(saved.get(key, 0))
+                last = saved.get("last_rate_limited_at")
+                if last and (entry["last_rate_limited_at"] or 0) < last:
+                    entry["last_rate_limited_at"] = last
+        return len(stats)
+
+
+provider_health = ProviderHealth()
+
 
 async def _call_openrouter(system_prompt: str, user_message: str) -> str:
     headers = {
@@ -34,7 +92,7 @@ async def _call_openrouter(system_prompt: str, user_message: str) -> str:
     }
     async with httpx.AsyncClient() as client:
         response = await client.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
+            url=f"{OPENROUTER_API_BASE}/chat/completions",
             headers=headers,
             json=payload,
             timeout=60,
@@ -58,7 +116,7 @@ async def _call_groq(system_prompt: str, user_message: str) -> str:
     }
     async with httpx.AsyncClient() as client:
         response = await client.post(
-            url="https://api.groq.com/openai/v1/chat/completions",
+            url=f"{GROQ_API_BASE}/chat/completions",
             headers=headers,
             json=payload,
             timeout=60,
@@ -68,28 +126,55 @@ async def _call_groq(system_prompt: str, user_message: str) -> str:
     return result["choices"][0]["message"]["content"]
 
 
-async def generate_answer(system_prompt: str, user_message: str) -> str:
-    # Try OpenRouter first
-    if OPENROUTER_API_KEY:
+async def _timed(attempts: list | None, provider: str, call):
+    """Await `call`, appending (provider, ms) to `attempts` whether it answers or fails."""
+    t0 = time.perf_counter()
+    try:
+        return await call
+    finally:
+        if attempts is not None:
+            attempts.append((provider, round((time.perf_counter() - t0) * 1000, 2)))
+
+
+async def generate_answer(
+    system_prompt: str, user_message: str, attempts: list | None = None,
+) -> tuple[str, str]:
+    """
+    Returns (answer, provider) — provider is "openrouter" or "groq". Each
+    provider call made is appended to `attempts` as (provider, ms), so an
+    OpenRouter timeout before a Groq answer is timed as OpenRouter's.
+    """
+    # Try OpenRouter first, unless it rate limited us moments ago and Groq can take over
+    skip_openrouter = GROQ_API_KEY and provider_health.cooling_down("openrouter")
+    if OPENROUTER_API_KEY and not skip_openrouter:
         try:
-            return await _call_openrouter(system_prompt, user_message)
+            answer = await _timed(attempts, "openrouter", _call_openrouter(system_prompt, user_message))
+            provider_health.record("openrouter", "ok")
+            return answer, "openrouter"
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 429:
+                provider_health.record("openrouter", "rate_limited")
                 logger.warning("OpenRouter rate limited — falling back to Groq")
             else:
+                provider_health.record("openrouter", "errors")
                 logger.error(f"OpenRouter error {e.response.status_code}: {e.response.text}")
                 raise Exception(f"AI service error: {e.response.status_code}")
         except httpx.ReadTimeout:
+            provider_health.record("openrouter", "timeouts")
             logger.warning("OpenRouter timed out — falling back to Groq")
 
     # Fallback: Groq
     if GROQ_API_KEY:
         try:
             logger.info("Using Groq fallback (llama-3.1-8b-instant)")
-            return await _call_groq(system_prompt, user_message)
+            answer = await _timed(attempts, "groq", _call_groq(system_prompt, user_message))
+            provider_health.record("groq", "ok")
+            return answer, "groq"
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 429:
+                provider_health.record("groq", "rate_limited")
                 raise AIQuotaError("Both OpenRouter and Groq are rate limited")
+            provider_health.record("groq", "errors")
             logger.error(f"Groq error {e.response.status_code}: {e.response.text}")
             raise Exception(f"Groq fallback error: {e.response.status_code}")
 
@@ -0,0 +1,184 @@
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+# Days of (day, bot, session) rows kept for unique-session dedupe
+DAILY_SESSION_RETENTION_DAYS = 3
+
+
+# -----------------------------------------------------
+# DIALECT-SPECIFIC UPSERT (PostgreSQL in prod, SQLite locally)
+# -----------------------------------------------------
+def _dialect_insert(db: Session):
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Analytics rollups do not support the {name} dialect")
+    return insert
+
+
+def _upsert_add(db: Session, model, keys: list[str], rows: list[dict]):
+    """INSERT rows, or add their counters onto the existing row with the same keys."""
+    if not rows:
+        return
+    insert = _dialect_insert(db)
+    stmt = insert(model)
+    counters = [c for c in rows[0] if c not in keys]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={c: getattr(model, c) + getattr(stmt.excluded, c) for c in counters},
+    )
+    db.execute(stmt, rows)
+
+
+# -----------------------------------------------------
+# INCREMENTAL MAINTENANCE
+# -----------------------------------------------------
+def _aggregate(records: Iterable, stats: dict, sessions: set) -> None:
+    for r in records:
+        day = r.created_at.date()
+        row = stats.setdefault(
+            (day, r.bot_id),
+            {"messages": 0, "unique_sessions": 0, "latency_sum_ms": 0, "latency_count": 0},
+        )
+        row["messages"] += 1
+        if r.response_time_ms is not None:
+            row["latency_sum_ms"] += r.response_time_ms
+            row["latency_count"] += 1
+        sessions.add((day, r.bot_id, r.session_id))
+
+
+def _write(db: Session, stats: dict, sessions: set, batch_size: int = 5000) -> None:
+    if not stats:
+        return
+
+    # Sessions seen for the first time that day — ON CONFLICT DO NOTHING +
+    # RETURNING gives exactly the rows this call created, even with several workers.
+    insert = _dialect_insert(db)
+    session_rows = [{"day": d, "bot_id": b, "session_id": s} for d, b, s in sessions]
+    for i in range(0, len(session_rows), batch_size):
+        new_sessions = db.execute(
+            insert(models.DailySession)
+            .on_conflict_do_nothing()
+            .returning(models.DailySession.day, models.DailySession.bot_id),
+            session_rows[i:i + batch_size],
+        ).all()
+        for day, bot_id in new_sessions:
+            stats[(day, bot_id)]["unique_sessions"] += 1
+
+    _upsert_add(
+        db,
+        models.BotDailyStat,
+        ["day", "bot_id"],
+        [{"day": d, "bot_id": b, **counters} for (d, b), counters in stats.items()],
+    )
+
+
+def apply_chat_logs(db: Session, records: Iterable) -> None:
+    """
+    Fold a batch of chat log records (anything with bot_id, session_id,
+    created_at, response_time_ms) into bot_daily_stats / daily_sessions.
+    Runs inside the caller's transaction, so rollups commit with the logs.
+    """
+    stats: dict[tuple[date, int], dict] = {}
+    sessions: set[tuple[date, int, str]] = set()
+    _aggregate(records, stats, sessions)
+    _write(db, stats, sessions)
+
+
+def record_signup(db: Session, created_at: datetime | None = None, users: int = 0, bots: int = 0) -> None:
+    """Count a new user / bot in daily_signup_stats (caller commits)."""
+    day = (created_at or datetime.utcnow()).date()
+    _upsert_add(
+        db,
+        models.DailySignupStat,
+        ["day"],
+        [{"day": day, "new_users": users, "new_bots": bots}],
+    )
+
+
+# -----------------------------------------------------
+# COMPACTOR / BACKFILL
+# -----------------------------------------------------
+def rebuild_rollups(db: Session, days: int | None = None, batch_size: int = 5000) -> dict:
+    """
+    Recompute rollups from the raw tables for the last `days` days
+    (everything when None). Used to backfill existing data and as a periodic
+    compactor to repair drift (e.g. a dropped write-behind batch).
+    Streams rows instead of GROUP BY cast(...) so it works on SQLite too.
+    """
+    since_day = (datetime.utcnow() - timedelta(days=days)).date() if days else None
+    since = datetime.combine(since_day, datetime.min.time()) if since_day else None
+
+    for model in (models.BotDailyStat, models.DailySession, models.DailySignupStat):
+        stmt = delete(model)
+        if since_day:
+            stmt = stmt.where(model.day >= since_day)
+        db.execute(stmt)
+
+    # chat_logs → bot_daily_stats + daily_sessions
+    q = select(
+        models.ChatLog.bot_id,
+        models.ChatLog.session_id,
+        models.ChatLog.created_at,
+        models.ChatLog.response_time_ms,
+    )
+    if since:
+        q = q.where(models.ChatLog.created_at >= since)
+
+    # Aggregate the whole window in memory first, so we never write on the
+    # connection while it is still streaming chat_logs
+    stats: dict[tuple[date, int], dict] = {}
+    sessions: set[tuple[date, int, str]] = set()
+    scanned = 0
+    for row in db.execute(q.execution_options(yield_per=batch_size)):
+        _aggregate((row,), stats, sessions)
+        scanned += 1
+    _write(db, stats, sessions, batch_size)
+
+    # users / bots → daily_signup_stats
+    signups: dict[date, dict] = defaultdict(lambda: {"new_users": 0, "new_bots": 0})
+    for model, field in ((models.User, "new_users"), (models.Bot, "new_bots")):
+        q = select(model.created_at).where(model.created_at.isnot(None))
+        if since:
+            q = q.where(model.created_at >= since)
+        for (created_at,) in db.execute(q):
+            signups[created_at.date()][field] += 1
+    _upsert_add(
+        db,
+        models.DailySignupStat,
+        ["day"],
+        [{"day": d, **counts} for d, counts in signups.items()],
+    )
+
+    pruned = prune_daily_sessions(db)
+    db.commit()
+    report = {
+        "since": str(since_day) if since_day else None,
+        "chat_logs_scanned": scanned,
+        "signup_days": len(signups),
+        "daily_sessions_pruned": pruned,
+    }
+    logger.info(f"[ROLLUP] Rebuilt rollups: {report}")
+    return report
+
+
+def prune_daily_sessions(db: Session, keep_days: int = DAILY_SESSION_RETENTION_DAYS) -> int:
+    """
+    daily_sessions is only needed to dedupe sessions for days that can still
+    receive chat logs; older rows are already counted in bot_daily_stats.
+    """
+    cutoff = (datetime.utcnow() - timedelta(days=keep_days)).date()
+    result = db.execute(delete(models.DailySession).where(models.DailySession.day < cutoff))
+    return result.rowcount or 0
@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Upper bound on staleness when an invalidation is missed (no Postgres NOTIFY,
+# or a worker's LISTEN connection was down at the time)
+BOT_CONFIG_TTL_S = float(os.getenv("BOT_CONFIG_TTL_S", "60"))
+BOT_CONFIG_CACHE_SIZE = int(os.getenv("BOT_CONFIG_CACHE_SIZE", "2000"))
+
+
+class BotConfigCache:
+    """
+    Bounded LRU of ready bots for the chat path: public bot_id -> (bots.id,
+    collection key — the shared knowledge base's, or bot_id for legacy bots).
+    Only bots with status "ready" are cached, each for BOT_CONFIG_TTL_S.
+    Routes that delete or rebuild a bot call invalidate(bot_id) so this
+    worker stops answering for it immediately, and queue
+    status_bus.notify_invalidate() with the change so the other workers do too.
+    """
+
+    def __init__(self, ttl: float = BOT_CONFIG_TTL_S, max_entries: int = BOT_CONFIG_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, int, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, bot_id: str) -> tuple[int, str] | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(bot_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(bot_id)
+                self.hits += 1
+                return entry[1], entry[2]
+            if entry:
+                del self._entries[bot_id]
+            self.misses += 1
+            return None
+
+    def put(self, bot_id: str, bot_pk: int, collection_key: str | None = None):
+        with self._lock:
+            self._entries[bot_id] = (time.monotonic() + self.ttl, bot_pk, collection_key or bot_id)
+            self._entries.move_to_end(bot_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, bot_id: str | None = None):
+        with self._lock:
+            if bot_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(bot_id, None)
+
+    def hot_bot_ids(self) -> list[str]:
+        """Cached bot ids, most recently used last (expired ones included — they were still hot)."""
+        with self._lock:
+            return list(self._entries)
+
+
+bot_config_cache = BotConfigCache()
@@ -0,0 +1,268 @@
+import os
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+from app.db import db_session
+from app import models
+from app.services.status_bus import status_bus
+
+logger = logging.getLogger(__name__)
+
+# Counter updates are persisted at most this often (stage changes always are)
+PROGRESS_WRITE_INTERVAL_S = 1.0
+
+# A running build touches its BuildJob this often, even while a long crawl
+# reports nothing; knowledge_bases treats a build without one as orphaned
+BUILD_HEARTBEAT_S = float(os.getenv("BUILD_HEARTBEAT_S", "30"))
+
+# bot.status value -> BuildJob column holding that stage's duration
+STAGE_COLUMNS = {
+    "crawling": "crawl_seconds",
+    "embedding": "embed_seconds",
+    "saving": "save_seconds",
+}
+
+# Work measured inside a stage (reported separately, not part of the ETA maths)
+SUBSTAGE_COLUMNS = {
+    "chunking": "chunk_seconds",
+}
+
+COUNTERS = (
+    "pages_total",
+    "pages_fetched",
+    "pages_processed",
+    "bytes_fetched",
+    "chunks_produced",
+    "chunks_embedded",
+    "embeddings_reused",
+    "points_upserted",
+)
+
+
+class BuildProgress:
+    """
+    Tracks one run_pipeline execution in a BuildJob row.
+
+    Counters live in memory and are written in a short session at most once
+    per PROGRESS_WRITE_INTERVAL_S; stage transitions also update bot.status
+    (which the dashboard / status endpoint already understand).
+    """
+
+    def __init__(self, bot_db_id: int, kind: str = "create"):
+        self.bot_db_id = bot_db_id
+        self.kind = kind
+        self.job_id: int | None = None
+        self.stage: str | None = None
+        self.counters = {c: 0 for c in COUNTERS}
+        self.stage_seconds: dict[str, float] = {}
+        self.substage_seconds: dict[str, float] = {}
+        self.started = time.monotonic()
+        self._stage_started = self.started
+        self._last_write = 0.0
+        self._heartbeat: asyncio.Task | None = None
+
+    # -------------------------------------------------
+    # PIPELINE HOOKS
+    # -------------------------------------------------
+    async def begin(self):
+        self.job_id = await asyncio.to_thread(self._create_job)
+        self._heartbeat = asyncio.create_task(self._beat())
+
+    def stop_heartbeat(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+    async def set_stage(self, stage: str):
+        self._close_stage()
+        self.stage = stage
+        await self._write(bot_status=stage)
+
+    async def add(self, **increments: int):
+        for name, n in increments.items():
+            self.counters[name] += n
+        if time.monotonic() - self._last_write >= PROGRESS_WRITE_INTERVAL_S:
+            await self._write()
+
+    async def set(self, **values: int):
+        self.counters.update(values)
+        await self._write()
+
+    @contextmanager
+    def measure(self, substage: str):
+        """Accumulate time spent in a substage (e.g. chunking inside embedding)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.substage_seconds[substage] = self.substage_seconds.get(substage, 0.0) + time.perf_counter() - t0
+
+    async def finish(self, status: str, error_message: str | None = None):
+        self.stop_heartbeat()
+        self._close_stage()
+        await self._write(bot_status=status, job_status=status, error_message=error_message, finished=True)
+        logger.info(
+            f"[PIPELINE] Build {self.job_id} {status} in {self.elapsed():.1f}s — "
+            f"stages={self.stage_seconds} counters={self.counters}"
+        )
+
+    # -------------------------------------------------
+    # DERIVED VALUES
+    # -------------------------------------------------
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def _close_stage(self):
+        now = time.monotonic()
+        if self.stage in STAGE_COLUMNS:
+            self.stage_seconds[self.stage] = round(
+                self.stage_seconds.get(self.stage, 0.0) + now - self._stage_started, 3
+            )
+        self._stage_started = now
+
+    # -------------------------------------------------
+    # PERSISTENCE
+    # -------------------------------------------------
+    def _create_job(self) -> int:
+        with db_session() as db:
+            job = models.BuildJob(bot_id=self.bot_db_id, kind=self.kind, status="running")
+            db.add(job)
+            db.commit()
+            return job.id
+
+    async def _beat(self):
+        while True:
+            await asyncio.sleep(BUILD_HEARTBEAT_S)
+            try:
+                await asyncio.to_thread(self._touch)
+            except Exception as e:
+                logger.warning(f"[PIPELINE] Heartbeat for build {self.job_id} failed: {e}")
+
+    def _touch(self):
+        with db_session() as db:
+            db.query(models.BuildJob).filter(models.BuildJob.id == self.job_id).update(
+                {"updated_at": datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+
+    async def _write(self, bot_status=None, job_status=None, error_message=None, finished=False):
+        self._last_write = time.monotonic()
+        await asyncio.to_thread(self._write_sync, bot_status, job_status, error_message, finished)
+
+    def _write_sync(self, bot_status, job_status, error_message, finished):
+        now = datetime.utcnow()
+        with db_session() as db:
+            bot = db.get(models.Bot, self.bot_db_id)
+            if bot and bot_status:
+                bot.status = bot_status
+                bot.error_message = error_message
+
+            job = db.get(models.BuildJob, self.job_id) if self.job_id else None
+            if job:
+                job.stage = self.stage
+                for name, value in self.counters.items():
+                    setattr(job, name, value)
+                for stage, seconds in self.stage_seconds.items():
+                    setattr(job, STAGE_COLUMNS[stage], seconds)
+                for substage, seconds in self.substage_seconds.items():
+                    setattr(job, SUBSTAGE_COLUMNS[substage], round(seconds, 3))
+                job.updated_at = now
+                if job_status:
+                    job.status = job_status
+                    job.error_message = error_message
+                if finished:
+                    job.finished_at = now
+                    job.total_seconds = round(self.elapsed(), 3)
+
+            # Push to /status/stream subscribers (NOTIFY rides on this commit)
+            published = None
+            if bot:
+                version = status_bus.next_version(bot.bot_id)
+                payload = jsonable_encoder(status_payload(bot, job))
+                status_bus.notify(db, bot.bot_id, version, payload)
+                published = (bot.bot_id, version, payload)
+            db.commit()
+        if published:
+            status_bus.publish(*published)
+
+
+# -----------------------------------------------------
+# READ SIDE (status endpoint / status stream)
+# -----------------------------------------------------
+def estimate_eta_seconds(job: models.BuildJob) -> float | None:
+    """
+    Rough remaining time for a running build, from the throughput of the
+    current stage. None while crawling (Apify gives no per-page progress).
+    """
+    if job.status != "running" or not job.stage:
+        return None
+    elapsed = (datetime.utcnow() - job.started_at).total_seconds()
+    stage_elapsed = elapsed - sum(
+        getattr(job, col) or 0.0 for col in STAGE_COLUMNS.values()
+    )
+
+    if job.stage == "embedding" and job.pages_processed and job.pages_total:
+        rate = stage_elapsed / job.pages_processed
+        return round(rate * (job.pages_total - job.pages_processed), 1)
+    if job.stage == "saving" and job.points_upserted and job.chunks_embedded:
+        rate = stage_elapsed / job.points_upserted
+        return round(rate * (job.chunks_embedded - job.points_upserted), 1)
+    return None
+
+
+def job_summary(job: models.BuildJob | None) -> dict | None:
+    if job is None:
+        return None
+    now = job.finished_at or datetime.utcnow()
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "stage": job.stage,
+        **{c: getattr(job, c) or 0 for c in COUNTERS},
+        "stage_seconds": {
+            stage: getattr(job, col)
+            for stage, col in {**STAGE_COLUMNS, **SUBSTAGE_COLUMNS}.items()
+            if getattr(job, col) is not None
+        },
+        "embed_store_hit_rate": (
+            round(job.embeddings_reused / job.chunks_embedded, 3)
+            if job.chunks_embedded and job.embeddings_reused is not None else None
+        ),
+        "upsert_points_per_s": (
+            round(job.points_upserted / job.save_seconds, 1)
+            if job.points_upserted and job.save_seconds else None
+        ),
+        "elapsed_seconds": round((now - job.started_at).total_seconds(), 1),
+        "eta_seconds": estimate_eta_seconds(job),
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def status_payload(bot: models.Bot, job: models.BuildJob | None) -> dict:
+    return {
+        "status": bot.status,
+        "bot_id": bot.bot_id,
+        "error_message": bot.error_message,
+        "progress": job_summary(job),
+    }
+
+
+def load_status(db, bot_id: str) -> dict | None:
+    """Current status + latest build for a bot (None if the bot doesn't exist)."""
+    bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
+    if not bot:
+        return None
+    job = (
+        db.query(models.BuildJob)
+        .filter(models.BuildJob.bot_id == bot.id)
+        .order_by(models.BuildJob.id.desc())
+        .first()
+    )
+    return status_payload(bot, job)
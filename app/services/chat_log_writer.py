@@ -0,0 +1,235 @@
+import os
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import insert, update, func
+
+from app.db import db_session
+from app import models
+from app.services.analytics_rollup import apply_chat_logs, prune_daily_sessions
+from app.services.metrics import chatlog_flush_seconds
+
+logger = logging.getLogger(__name__)
+
+CHATLOG_BATCH_SIZE = int(os.getenv("CHATLOG_BATCH_SIZE", "100"))
+CHATLOG_FLUSH_INTERVAL_S = float(os.getenv("CHATLOG_FLUSH_INTERVAL_S", "1.0"))
+CHATLOG_MAX_QUEUE = int(os.getenv("CHATLOG_MAX_QUEUE", "10000"))
+CHATLOG_FLUSH_RETRIES = 3
+# daily_sessions rows past their dedupe window are deleted this often
+DAILY_SESSIONS_PRUNE_INTERVAL_S = 24 * 3600
+
+_STOP = object()
+
+
+@dataclass
+class ChatLogRecord:
+    bot_id: int                      # Bot primary key
+    session_id: str
+    user_message: str
+    bot_response: str
+    retrieved_sources: str | None = None
+    response_time_ms: int | None = None
+    stage_timings: str | None = None  # JSON {stage: ms}
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+class ChatLogWriter:
+    """
+    Write-behind persistence for ChatLog rows.
+
+    Chat handlers call submit() and return immediately; a background task
+    flushes the queue as one multi-row INSERT plus one atomic
+    `message_count = message_count + n` UPDATE per bot (and the daily
+    analytics rollups, whose daily_sessions dedupe rows it prunes once a
+    day), whenever
+    CHATLOG_BATCH_SIZE records are queued or CHATLOG_FLUSH_INTERVAL_S has
+    passed since the first queued record.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = CHATLOG_BATCH_SIZE,
+        flush_interval: float = CHATLOG_FLUSH_INTERVAL_S,
+        max_queue: int = CHATLOG_MAX_QUEUE,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        # (bot pk, session_id) -> records queued but not yet committed,
+        # so the per-session quota check still sees them
+        self._pending: dict[tuple[int, str], int] = defaultdict(int)
+        self.flushed = 0
+        self.dropped = 0
+        self.failed_batches = 0
+        self._next_prune = 0.0      # first flush after start prunes
+
+    # -------------------------------------------------
+    # LIFECYCLE
+    # -------------------------------------------------
+    def start(self):
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(), name="chat-log-writer")
+        logger.info(
+            f"[CHATLOG] Writer started (batch_size={self.batch_size}, "
+            f"flush_interval={self.flush_interval}s)"
+        )
+
+    async def stop(self):
+        """Stop the background task after it has flushed everything still queued."""
+        if self._task is None:
+            return
+        # Sentinel goes to the back of the FIFO, so every record ahead of it is written
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        logger.info(f"[CHATLOG] Writer stopped — {self.stats()}")
+
+    # -------------------------------------------------
+    # PRODUCER SIDE
+    # -------------------------------------------------
+    def submit(self, record: ChatLogRecord):
+        """Queue a record without waiting. Never raises into the chat path."""
+        if self._queue is None:
+            logger.error("[CHATLOG] Writer not started — dropping chat log")
+            self.dropped += 1
+            return
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error(f"[CHATLOG] Queue full ({self.max_queue}) — dropping chat log for bot {record.bot_id}")
+            return
+        self._pending[(record.bot_id, record.session_id)] += 1
+
+    def pending_for(self, bot_pk: int, session_id: str) -> int:
+        return self._pending.get((bot_pk, session_id), 0)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failed_batches": self.failed_batches,
+        }
+
+    # -------------------------------------------------
+    # CONSUMER SIDE
+    # -------------------------------------------------
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if time.monotonic() >= self._next_prune:
+                self._next_prune = time.monotonic() + DAILY_SESSIONS_PRUNE_INTERVAL_S
+                await self._prune()
+            if stopping:
+                return
+
+    async def _flush(self, batch: List[ChatLogRecord]):
+        for attempt in range(1, CHATLOG_FLUSH_RETRIES + 1):
+            start = time.perf_counter()
+            try:
+                orphaned = await asyncio.to_thread(self._write_batch, batch)
+                chatlog_flush_seconds.observe(time.perf_counter() - start, "ok")
+                self.flushed += len(batch) - orphaned
+                self.dropped += orphaned
+                break
+            except Exception:
+                chatlog_flush_seconds.observe(time.perf_counter() - start, "error")
+                logger.exception(
+                    f"[CHATLOG] Flush of {len(batch)} records failed "
+                    f"(attempt {attempt}/{CHATLOG_FLUSH_RETRIES})"
+                )
+                if attempt == CHATLOG_FLUSH_RETRIES:
+                    self.failed_batches += 1
+                    self.dropped += len(batch)
+                else:
+                    await asyncio.sleep(0.5 * attempt)
+
+        for r in batch:
+            key = (r.bot_id, r.session_id)
+            self._pending[key] -= 1
+            if self._pending[key] <= 0:
+                del self._pending[key]
+
+    async def _prune(self):
+        try:
+            pruned = await asyncio.to_thread(self._prune_sync)
+        except Exception:
+            logger.exception("[CHATLOG] Pruning daily_sessions failed")
+            return
+        if pruned:
+            logger.info(f"[CHATLOG] Pruned {pruned} daily_sessions rows")
+
+    def _prune_sync(self) -> int:
+        with db_session() as db:
+            pruned = prune_daily_sessions(db)
+            db.commit()
+        return pruned
+
+    def _write_batch(self, batch: List[ChatLogRecord]) -> int:
+        """Write the batch; returns how many records were skipped because their bot was deleted."""
+        with db_session() as db:
+            # Logs of a bot deleted while they were queued would fail the whole
+            # batch's FK check; FOR SHARE holds off deletes of the rest until commit
+            bot_pks = {r.bot_id for r in batch}
+            existing = {
+                pk for (pk,) in db.query(models.Bot.id)
+                .filter(models.Bot.id.in_(bot_pks))
+                .with_for_update(read=True)
+            }
+            rows = [r for r in batch if r.bot_id in existing]
+            orphaned = len(batch) - len(rows)
+            if orphaned:
+                logger.warning(f"[CHATLOG] Skipping {orphaned} records of deleted bots {sorted(bot_pks - existing)}")
+            if not rows:
+                return orphaned
+
+            # Aggregate bot counters so each bot gets one atomic UPDATE per batch
+            per_bot: dict[int, tuple[int, datetime]] = {}
+            for r in rows:
+                n, last = per_bot.get(r.bot_id, (0, r.created_at))
+                per_bot[r.bot_id] = (n + 1, max(last, r.created_at))
+
+            db.execute(insert(models.ChatLog), [asdict(r) for r in rows])
+            for bot_pk, (n, last_used_at) in per_bot.items():
+                db.execute(
+                    update(models.Bot)
+                    .where(models.Bot.id == bot_pk)
+                    .values(
+                        message_count=func.coalesce(models.Bot.message_count, 0) + n,
+                        last_used_at=last_used_at,
+                    )
+                )
+            # Daily rollups for the admin dashboard, in the same transaction
+            apply_chat_logs(db, rows)
+            db.commit()
+        return orphaned
+
+chat_log_writer = ChatLogWriter()
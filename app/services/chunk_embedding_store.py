@@ -0,0 +1,263 @@
+"""
+Content-addressed store of chunk embeddings, shared by every bot build on
+the host.
+
+Refreshes, rebuilds and other users' bots for the same site keep producing
+the same chunk text, so each vector is kept under sha1(model, normalised
+text) and run_pipeline only calls embed_text for text it has never seen.
+
+Layout under EMBED_STORE_DIR:
+
+    index.sqlite     key -> (segment, row)
+    seg-000001.f32   float32[rows][dim], append-only
+
+Segments are memory-mapped for reads. A hit in an older segment is
+re-appended to the newest one, so old segments only hold entries nobody
+has asked for since; once the files pass EMBED_STORE_MAX_MB the oldest
+segment is dropped whole — LRU eviction without rewriting anything.
+"""
+import os
+import asyncio
+import fcntl
+import hashlib
+import logging
+import mmap
+import sqlite3
+import threading
+from typing import TYPE_CHECKING, List, Tuple
+
+from app.services.embedding_cache import normalize_query
+from app.services.embeddings import HF_MODEL, embed_text
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBED_STORE_DIR = os.getenv("EMBED_STORE_DIR", "app/data/embedding_store")   # "" disables the store
+EMBED_STORE_MAX_MB = float(os.getenv("EMBED_STORE_MAX_MB", "512"))
+# Eviction granularity: the oldest segment is dropped whole
+EMBED_STORE_SEGMENT_MB = float(os.getenv("EMBED_STORE_SEGMENT_MB", "32"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (key BLOB PRIMARY KEY, segment INTEGER NOT NULL, row INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS entries_segment ON entries (segment);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+_SQL_BATCH = 500    # keys per IN (...) lookup, under SQLite's variable limit
+
+
+def chunk_key(text: str, model: str = HF_MODEL) -> bytes:
+    return hashlib.sha1(f"{model}\0{normalize_query(text)}".encode()).digest()
+
+
+class ChunkEmbeddingStore:
+    def __init__(
+        self,
+        path: str = EMBED_STORE_DIR,
+        max_bytes: float = EMBED_STORE_MAX_MB * 2**20,
+        segment_bytes: float = EMBED_STORE_SEGMENT_MB * 2**20,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self._db: sqlite3.Connection | None = None
+        self._dim: int | None = None
+        self._maps: dict[int, mmap.mmap] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    @property
+    def bytes_used(self) -> int:
+        if not self.enabled or not os.path.isdir(self.path):
+            return 0
+        return sum(size for _, size in self._segments())
+
+    # ---------- read ----------
+    def get_many(self, texts: List[str]) -> List["np.ndarray | None"]:
+        """One float32 vector per text, None where the text was never embedded."""
+        keys = [chunk_key(t) for t in texts]
+        with self._lock:
+            db = self._connect()
+            found: dict[bytes, tuple[int, int]] = {}
+            unique = list(set(keys))
+            for start in range(0, len(unique), _SQL_BATCH):
+                batch = unique[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                for key, segment, row in db.execute(
+                    f"SELECT key, segment, row FROM entries WHERE key IN ({placeholders})", batch
+                ):
+                    found[key] = (segment, row)
+
+            segments = self._segments()
+            newest = segments[-1][0] if segments else None
+            results, promote = [], {}
+            for key in keys:
+                location = found.get(key)
+                vector = self._read(*location) if location else None
+                results.append(vector)
+                if vector is None:
+                    self.misses += 1
+                    continue
+                self.hits += 1
+                if location[0] != newest:
+                    promote[key] = vector
+
+        if promote:
+            import numpy as np
+            self._append(list(promote), np.stack(list(promote.values())))
+        return results
+
+    def _read(self, segment: int, row: int) -> "np.ndarray | None":
+        import numpy as np
+
+        row_bytes = self._dim * 4
+        end = (row + 1) * row_bytes
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < end:
+            # Not mapped yet, or appended to since (possibly by another worker)
+            try:
+                with open(self._segment_path(segment), "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                return None      # evicted by another worker
+            self._maps[segment] = mapped
+            if len(mapped) < end:
+                return None
+        return np.frombuffer(mapped, dtype=np.float32, count=self._dim, offset=row * row_bytes).copy()
+
+    # ---------- write ----------
+    def put_many(self, texts: List[str], vectors: "np.ndarray"):
+        import numpy as np
+
+        self._append([chunk_key(t) for t in texts], np.asarray(vectors, dtype=np.float32))
+
+    def _append(self, keys: List[bytes], vectors: "np.ndarray"):
+        if not keys:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        # The file lock serialises appends and evictions across workers on the host
+        with self._lock, open(os.path.join(self.path, "store.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            db = self._connect()
+            dim = vectors.shape[1]
+            if self._dim is None:
+                db.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('dim', ?)", (str(dim),))
+                db.commit()
+                self._dim = int(db.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()[0])
+            if dim != self._dim:
+                logger.warning(f"[EMBED STORE] Skipping {dim}-d vectors, store holds {self._dim}-d")
+                return
+
+            row_bytes = dim * 4
+            rows_per_segment = max(1, int(self.segment_bytes // row_bytes))
+            segments = self._segments()
+            segment = segments[-1][0] if segments else 1
+            rows, written = [], 0
+            while written < len(keys):
+                path = self._segment_path(segment)
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                first_row = size // row_bytes
+                if size % row_bytes:
+                    # A crash mid-write left a partial row that was never indexed
+                    os.truncate(path, first_row * row_bytes)
+                n = min(rows_per_segment - first_row, len(keys) - written)
+                if n <= 0:
+                    segment += 1
+                    continue
+                with open(path, "ab") as f:
+                    f.write(vectors[written:written + n].tobytes())
+                rows.extend((keys[written + i], segment, first_row + i) for i in range(n))
+                written += n
+
+            db.executemany("INSERT OR REPLACE INTO entries (key, segment, row) VALUES (?, ?, ?)", rows)
+            db.commit()
+            self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection):
+        segments = self._segments()
+        total = sum(size for _, size in segments)
+        while total > self.max_bytes and len(segments) > 1:
+            segment, size = segments.pop(0)
+            db.execute("DELETE FROM entries WHERE segment = ?", (segment,))
+            db.commit()
+            # Mappings other workers hold stay valid until they drop them
+            os.remove(self._segment_path(segment))
+            self._maps.pop(segment, None)
+            total -= size
+            self.evictions += 1
+            logger.info(f"[EMBED STORE] Evicted segment {segment} ({size / 2**20:.1f} MB)")
+
+    # ---------- files ----------
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(self.path, exist_ok=True)
+            db = sqlite3.connect(os.path.join(self.path, "index.sqlite"), timeout=30, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            row = db.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+            self._dim = int(row[0]) if row else None
+            self._db = db
+        return self._db
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.path, f"seg-{segment:06d}.f32")
+
+    def _segments(self) -> List[Tuple[int, int]]:
+        """(segment, bytes), oldest first."""
+        segments = []
+        for name in os.listdir(self.path):
+            if name.startswith("seg-") and name.endswith(".f32"):
+                try:
+                    segments.append((int(name[4:-4]), os.path.getsize(os.path.join(self.path, name))))
+                except (ValueError, OSError):
+                    continue
+        return sorted(segments)
+
+
+chunk_embedding_store = ChunkEmbeddingStore()
+
+
+async def embed_chunks(texts: List[str]) -> Tuple["np.ndarray", int]:
+    """
+    embed_text through the store: (float32 matrix, rows reused). Only texts
+    the store has never seen are sent to the embedding API, once each.
+    """
+    import numpy as np
+
+    if not chunk_embedding_store.enabled or not texts:
+        return await embed_text(texts), 0
+    try:
+        cached = await asyncio.to_thread(chunk_embedding_store.get_many, texts)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"[EMBED STORE] Lookup failed, embedding everything: {e}")
+        return await embed_text(texts), 0
+
+    # Identical chunks in one batch (repeated boilerplate) are embedded once
+    missing: dict[str, List[int]] = {}
+    for i, (text, vector) in enumerate(zip(texts, cached)):
+        if vector is None:
+            missing.setdefault(normalize_query(text), []).append(i)
+    fresh_texts = [texts[indices[0]] for indices in missing.values()]
+    fresh = await embed_text(fresh_texts) if fresh_texts else None
+
+    dim = fresh.shape[1] if fresh is not None else len(next(v for v in cached if v is not None))
+    embeddings = np.empty((len(texts), dim), dtype=np.float32)
+    for i, vector in enumerate(cached):
+        if vector is not None:
+            embeddings[i] = vector
+    for row, indices in enumerate(missing.values()):
+        embeddings[indices] = fresh[row]
+
+    if fresh_texts:
+        try:
+            await asyncio.to_thread(chunk_embedding_store.put_many, fresh_texts, fresh)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"[EMBED STORE] Could not save {len(fresh_texts)} embeddings: {e}")
+    return embeddings, len(texts) - len(fresh_texts)
@@ -1,19 +1,34 @@
-import cloudinary
-import cloudinary.uploader
 import os
+import threading
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def _cloudinary():
+    """Import + configure the SDK on first upload (keeps it out of app startup)."""
+    global _configured
+    import cloudinary
+    import cloudinary.uploader
+
+    if not _configured:
+        with _configure_lock:
+            if not _configured:
+                cloudinary.config(
+                    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+                    api_key=os.getenv("CLOUDINARY_API_KEY"),
+                    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
+                )
+                _configured = True
+    return cloudinary
 
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-)
 
 def upload_logo(file_bytes: bytes, filename: str) -> str:
-    result = cloudinary.uploader.upload(
+    result = _cloudinary().uploader.upload(
         file_bytes,
         folder="bot_logos",
         public_id=filename,
         overwrite=True,
         resource_type="image",
     )
-    return result["secure_url"]
\ No newline at end of file
+    return result["secure_url"]
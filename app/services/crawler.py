@@ -0,0 +1,10 @@
+import os
+
+# "apify" (default, renders JS via the Website Content Crawler actor) or
+# "http" (plain HTML fetch — local / synthetic sites, benchmarks)
+CRAWLER = os.getenv("CRAWLER", "apify").lower()
+
+if CRAWLER == "http":
+    from app.services.crawler_http import crawl_website  # noqa: F401
+else:
+    from app.services.crawler_apify import crawl_website  # noqa: F401
@@ -1,11 +1,22 @@
 import os
 import logging
 from typing import Dict
-from apify_client import ApifyClient
+
+from app.services.html_extract import extract_main_content
 
 logger = logging.getLogger(__name__)
 
 
+def _item_text(item: dict) -> str:
+    """Main content of the page's HTML; the actor's own text when there is no HTML or nothing survives."""
+    html = item.get("html")
+    if html:
+        text = extract_main_content(html)
+        if len(text) > 50:
+            return text
+    return item.get("text") or item.get("markdown") or ""
+
+
 def crawl_website(start_url: str, max_pages: int = 5) -> Dict[str, str]:
     """
     Crawl a website using Apify's Website Content Crawler actor.
@@ -13,6 +24,9 @@ def crawl_website(start_url: str, max_pages: int = 5) -> Dict[str, str]:
     """
     logger.info(f"[Apify] Starting crawl at {start_url} (max_pages={max_pages})")
 
+    # Imported here: the SDK is slow to import and only bot builds need it
+    from apify_client import ApifyClient
+
     client = ApifyClient(os.getenv("APIFY_API_TOKEN"))
 
     run_input = {
@@ -23,6 +37,8 @@ def crawl_website(start_url: str, max_pages: int = 5) -> Dict[str, str]:
         "ignoreCanonicalUrl": True,
         "maxConcurrency": 3,
         "htmlTransformer": "none",
+        # Raw HTML per page, for our own main-content extraction (html_extract)
+        "saveHtml": True,
     }
 
     run = client.actor("apify/website-content-crawler").call(run_input=run_input)
@@ -30,7 +46,7 @@ def crawl_website(start_url: str, max_pages: int = 5) -> Dict[str, str]:
     results = {}
     for item in client.dataset(run.default_dataset_id).iterate_items():
         url = item.get("url")
-        text = item.get("text") or item.get("markdown") or item.get("html") or ""
+        text = _item_text(item)
         if url and len(text) > 50:
             results[url] = text
             logger.info(f"[Apify] ✅ Extracted {len(text)} characters from {url}")
@@ -43,7 +59,7 @@ def crawl_website(start_url: str, max_pages: int = 5) -> Dict[str, str]:
 
         for item in client.dataset(run.default_dataset_id).iterate_items():
             url = item.get("url")
-            text = item.get("text") or item.get("markdown") or item.get("html") or ""
+            text = _item_text(item)
             if url and len(text) > 50:
                 results[url] = text
                 logger.info(f"[Apify] ✅ Extracted {len(text)} characters from {url}")
@@ -0,0 +1,72 @@
+import os
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+from urllib.parse import urljoin, urldefrag, urlparse
+
+import httpx
+
+from app.services.html_extract import extract_main_content, parse_html
+
+logger = logging.getLogger(__name__)
+
+CRAWL_HTTP_CONCURRENCY = int(os.getenv("CRAWL_HTTP_CONCURRENCY", "8"))
+CRAWL_HTTP_MAX_DEPTH = int(os.getenv("CRAWL_HTTP_MAX_DEPTH", "5"))
+CRAWL_HTTP_TIMEOUT_S = float(os.getenv("CRAWL_HTTP_TIMEOUT_S", "15"))
+
+
+def _extract(base_url: str, html: str) -> Tuple[str, List[str]]:
+    """Main content (html_extract) + absolute same-page links, nav and footer links included."""
+    soup = parse_html(html)
+    links = []
+    for a in soup.find_all("a", href=True):
+        url, _ = urldefrag(urljoin(base_url, a["href"]))
+        links.append(url)
+    return extract_main_content(soup), links
+
+
+def _fetch(client: httpx.Client, url: str) -> Tuple[str, str | None, List[str]]:
+    try:
+        response = client.get(url)
+    except httpx.HTTPError as e:
+        logger.warning(f"[HTTP crawler] {url}: {e}")
+        return url, None, []
+    if response.status_code != 200 or "html" not in response.headers.get("content-type", ""):
+        return url, None, []
+    text, links = _extract(str(response.url), response.text)
+    return url, text, links
+
+
+def crawl_website(start_url: str, max_pages: int = 5) -> Dict[str, str]:
+    """
+    Breadth-first crawl of static HTML on the start URL's host (no JS rendering).
+    Same contract as crawler_apify.crawl_website: {url: text} for pages with
+    more than 50 characters of text. Selected with CRAWLER=http.
+    """
+    logger.info(f"[HTTP crawler] Starting crawl at {start_url} (max_pages={max_pages})")
+    host = urlparse(start_url).netloc
+
+    results: Dict[str, str] = {}
+    seen = {start_url}
+    frontier = deque([(start_url, 0)])
+
+    with httpx.Client(timeout=CRAWL_HTTP_TIMEOUT_S, follow_redirects=True) as client, \
+            ThreadPoolExecutor(max_workers=CRAWL_HTTP_CONCURRENCY) as pool:
+        while frontier and len(results) < max_pages:
+            # One batch per round keeps fetches concurrent but BFS-ordered
+            batch = [frontier.popleft() for _ in range(min(len(frontier), CRAWL_HTTP_CONCURRENCY))]
+            depths = dict(batch)
+            for url, text, links in pool.map(lambda item: _fetch(client, item[0]), batch):
+                if text and len(text) > 50 and len(results) < max_pages:
+                    results[url] = text
+                if depths[url] >= CRAWL_HTTP_MAX_DEPTH:
+                    continue
+                for link in links:
+                    parsed = urlparse(link)
+                    if parsed.scheme in ("http", "https") and parsed.netloc == host and link not in seen:
+                        seen.add(link)
+                        frontier.append((link, depths[url] + 1))
+
+    logger.info(f"[HTTP crawler] Finished crawling. Total pages: {len(results)}")
+    return results
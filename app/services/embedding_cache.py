@@ -0,0 +1,75 @@
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "5000"))   # ~1.5 KB per 384-d entry
+
+
+def normalize_query(text: str) -> str:
+    # all-MiniLM-L6-v2 lower-cases its input, so case and spacing don't change the vector
+    return " ".join(text.split()).lower()
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU of chat-question embeddings, shared across bots (the
+    embedding only depends on the text). Vectors are kept as float32
+    arrays; entries restored from a warm-state snapshot are read-only
+    memoryview rows of the memory-mapped file.
+    """
+
+    def __init__(self, max_entries: int = QUERY_EMBED_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, array | memoryview] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> "np.ndarray | None":
+        """A read-only float32 view of the cached vector (no copy)."""
+        import numpy as np
+
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return np.frombuffer(vector, dtype=np.float32)
+
+    def put(self, text: str, vector: "np.ndarray | list[float]"):
+        import numpy as np
+
+        self._put(normalize_query(text), array("f", np.asarray(vector, dtype=np.float32).tobytes()))
+
+    def _put(self, key: str, vector: array | memoryview):
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ---------- warm-state snapshot ----------
+    def snapshot(self) -> tuple[list[str], list[array | memoryview]]:
+        """(keys, vectors), least recently used first so restore keeps the LRU order."""
+        with self._lock:
+            items = list(self._entries.items())
+        return [k for k, _ in items], [v for _, v in items]
+
+    def restore(self, keys: list[str], vectors: list[memoryview]) -> int:
+        for key, row in zip(keys, vectors):
+            self._put(key, row)
+        return len(keys)
+
+
+query_embedding_cache = QueryEmbeddingCache()
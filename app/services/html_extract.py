@@ -0,0 +1,174 @@
+"""
+Main-content extraction from raw HTML, ahead of the cleaner and chunker.
+
+Flattening a whole page with get_text() turns menus, footers, cookie
+banners and "related posts" link lists into text we chunk, embed and
+retrieve. Instead:
+
+  1. drop elements that are never content: script/style, nav/footer/aside,
+     the site <header>, ARIA navigation/banner roles, hidden elements and
+     cookie / share / newsletter widgets
+  2. split what is left into text blocks (the text under each block-level
+     element: paragraphs, list items, cells, bare divs, headings)
+  3. score every block on its text density (words) and link density
+     (share of its characters inside <a>): long prose with few links is
+     kept, link lists and short UI labels ("Read more", "Home") are not
+  4. emit one line per block, headings as "# Title" lines, so
+     text_processing can keep each sentence with its section
+
+lxml is used as the parser when it is installed (several times faster
+than html.parser on large pages); html.parser otherwise.
+"""
+import os
+import re
+from typing import List
+
+from bs4 import BeautifulSoup, NavigableString
+
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+# false: whole-page get_text(), as before this stage existed
+HTML_EXTRACT_ENABLED = os.getenv("HTML_EXTRACT_ENABLED", "true").lower() == "true"
+
+_NEVER_CONTENT = [
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "object",
+    "nav", "footer", "aside", "button", "select", "textarea", "dialog",
+]
+_BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search", "menu", "menubar", "dialog", "alertdialog"}
+# Matched against class / id tokens. Not "menu" or "sidebar": a restaurant's menu is content
+_BOILERPLATE_ATTR = re.compile(
+    r"^(cookie|cookies|consent|gdpr|share|sharing|social|newsletter|subscribe|popup|modal|breadcrumbs?|skip-link)([-_].*)?$",
+    re.IGNORECASE,
+)
+_BLOCK_TAGS = {
+    "address", "article", "blockquote", "body", "caption", "dd", "details", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "hr", "li", "main", "ol", "p", "pre", "section", "summary", "table", "tbody", "td", "tfoot",
+    "th", "thead", "tr", "ul",
+}
+_HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+
+_MAX_LINK_DENSITY = 0.5     # blocks with more of their text in links are navigation
+_MIN_WORDS = 7              # shorter blocks need to look like a sentence or a fact
+_FACT = re.compile(r"[.!?:]$|\d|@")
+_SPACE_BEFORE_PUNCT = re.compile(r" ([.,;:!?])")
+_HEADING_LINE = re.compile(r"(#{1,6}) ")
+
+
+def parse_html(html: str) -> BeautifulSoup:
+    return BeautifulSoup(html, PARSER)
+
+
+def flat_text(soup: BeautifulSoup) -> str:
+    """Whole-page visible text — the pre-extraction behaviour."""
+    for tag in soup(["script", "style", "noscript", "template"]):
+        tag.decompose()
+    return soup.get_text(separator="\n", strip=True)
+
+
+def extract_main_content(markup: "str | BeautifulSoup") -> str:
+    """Main content of a page as text lines, headings as "# Title". Mutates a soup passed in."""
+    soup = parse_html(markup) if isinstance(markup, str) else markup
+    if not HTML_EXTRACT_ENABLED:
+        return flat_text(soup)
+    _strip_boilerplate(soup)
+
+    lines: List[str] = []
+    seen = set()
+    for level, text, link_chars in _blocks(soup.body or soup):
+        link_density = link_chars / len(text)
+        if level:
+            # A heading that is only a link ("Home", "Blog") is a menu entry
+            if link_density < 1 or len(text.split()) >= 3:
+                lines.append(f"{'#' * level} {text}")
+            continue
+        if link_density > _MAX_LINK_DENSITY:
+            continue
+        if len(text.split()) < _MIN_WORDS and (link_chars or not _FACT.search(text)):
+            continue
+        key = text.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        lines.append(text)
+    return "\n".join(_drop_empty_sections(lines))
+
+
+def _strip_boilerplate(soup: BeautifulSoup):
+    for tag in soup(_NEVER_CONTENT):
+        tag.decompose()
+    for tag in soup.find_all(True):
+        if tag.decomposed or tag.attrs is None:
+            continue
+        # The site header; a <header> inside an article holds its title
+        if tag.name == "header" and tag.find_parent(["article", "main"]) is None:
+            tag.decompose()
+            continue
+        style = tag.get("style", "").replace(" ", "").lower()
+        if (
+            tag.get("role", "").lower() in _BOILERPLATE_ROLES
+            or tag.has_attr("hidden")
+            or tag.get("aria-hidden") == "true"
+            or "display:none" in style
+            or any(_BOILERPLATE_ATTR.match(token) for token in _attr_tokens(tag))
+        ):
+            tag.decompose()
+
+
+def _attr_tokens(tag) -> List[str]:
+    classes = tag.get("class") or []
+    if isinstance(classes, str):
+        classes = classes.split()
+    tag_id = tag.get("id")
+    return [*classes, tag_id] if tag_id else list(classes)
+
+
+def _blocks(root):
+    """(heading level or 0, text, characters inside links) per block, in document order."""
+    block, parts, link_chars = None, [], 0
+    for node in root.descendants:
+        if type(node) is not NavigableString:
+            continue
+        owner, in_link = None, False
+        for parent in node.parents:
+            if parent.name == "a":
+                in_link = True
+            if parent.name in _BLOCK_TAGS:
+                owner = parent
+                break
+        if owner is not block:
+            yield from _emit(block, parts, link_chars)
+            block, parts, link_chars = owner, [], 0
+        parts.append(str(node))
+        if in_link:
+            link_chars += len(" ".join(node.split()))
+    yield from _emit(block, parts, link_chars)
+
+
+def _emit(block, parts: List[str], link_chars: int):
+    # Parts are joined with spaces: adjacent inline elements are usually laid out apart
+    text = _SPACE_BEFORE_PUNCT.sub(r"\1", " ".join(" ".join(parts).split()))
+    if text:
+        yield _HEADINGS.get(block.name, 0) if block is not None else 0, text, min(link_chars, len(text))
+
+
+def _drop_empty_sections(lines: List[str]) -> List[str]:
+    """Drop headings with nothing under them before the next heading of the same or a higher level."""
+    kept: List[str] = []
+    next_level = 0          # 0: end of page, 7: body text
+    for line in reversed(lines):
+        level = _heading_level(line)
+        if level and next_level <= level:
+            continue
+        kept.append(line)
+        next_level = level or 7
+    return kept[::-1]
+
+
+def _heading_level(line: str) -> int:
+    match = _HEADING_LINE.match(line)
+    return len(match.group(1)) if match else 0
@@ -0,0 +1,348 @@
+"""
+Shared knowledge bases: one crawl + embedding per website, however many
+bots are built on it.
+
+A KnowledgeBase row is one built version of a normalised URL, stored in
+its own Qdrant collection (vector_store functions take its collection_key
+where they take a bot_id). create_bot attaches new bots to the newest
+ready or building version younger than KB_MAX_AGE_S instead of crawling
+again. A refresh builds a new version for that bot only (copy-on-refresh):
+bots on the old version keep answering from it, and new bots pick up the
+new one. A version no bot points at any more is retired and its
+collection deleted. A version left "building" by a killed process (no
+build heartbeat for KB_BUILD_STALE_S) is not shared, and
+sweep_orphaned_builds fails it and its bots.
+
+Bots created before this layer have no kb_id and keep their own
+bot_<bot_id> collection.
+"""
+import os
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, exists, func, or_
+from sqlalchemy.orm import Session
+
+from app.db import db_session
+from app import models
+from app.services.build_progress import BUILD_HEARTBEAT_S, status_payload
+from app.services.recrawl import forget_pages
+from app.services.status_bus import status_bus
+from app.services.vector_store import delete_collection
+
+logger = logging.getLogger(__name__)
+
+# false: every bot gets its own version (still tracked as a knowledge base)
+KB_SHARING_ENABLED = os.getenv("KB_SHARING_ENABLED", "true").lower() == "true"
+# Versions older than this are not shared with new bots; they crawl afresh
+KB_MAX_AGE_S = float(os.getenv("KB_MAX_AGE_S", str(7 * 24 * 3600)))
+# A "building" version whose build job has not beaten for this long was
+# killed (restart, sleep, crash): it is not shared, and the sweep fails it
+KB_BUILD_STALE_S = float(os.getenv("KB_BUILD_STALE_S", str(10 * BUILD_HEARTBEAT_S)))
+
+LIVE_STATUSES = ("building", "ready")
+SETTLED_STATUSES = ("ready", "failed")
+_VECTOR_BYTES = 384 * 4      # all-MiniLM-L6-v2, float32
+INTERRUPTED_MESSAGE = "The build was interrupted (server restart). Refresh the bot to try again."
+
+
+def normalize_url(url: str) -> str:
+    """Scheme/host lower-cased, default port, fragment and trailing slash dropped, query sorted."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path.rstrip("/"), query, ""))
+
+
+# -----------------------------------------------------
+# ATTACH (request path, caller's session and commit)
+# -----------------------------------------------------
+def find_shared(db: Session, website_url: str) -> models.KnowledgeBase | None:
+    """Newest fresh version of this site that a new bot can point at."""
+    if not KB_SHARING_ENABLED:
+        return None
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=KB_BUILD_STALE_S)
+    return (
+        db.query(models.KnowledgeBase)
+        .filter(
+            models.KnowledgeBase.url_key == normalize_url(website_url),
+            models.KnowledgeBase.created_at >= now - timedelta(seconds=KB_MAX_AGE_S),
+            or_(
+                models.KnowledgeBase.status == "ready",
+                # Only a build that is still running somewhere (just created, or beating)
+                and_(
+                    models.KnowledgeBase.status == "building",
+                    or_(models.KnowledgeBase.created_at >= stale, _build_alive(stale)),
+                ),
+            ),
+        )
+        .order_by(models.KnowledgeBase.id.desc())
+        .first()
+    )
+
+
+def _build_alive(since: datetime):
+    """Correlated EXISTS: a running build job on the version has beaten since `since`."""
+    return exists().where(
+        models.BuildJob.bot_id == models.Bot.id,
+        models.Bot.kb_id == models.KnowledgeBase.id,
+        models.BuildJob.status == "running",
+        models.BuildJob.updated_at >= since,
+    )
+
+
+def new_version(db: Session, website_url: str) -> models.KnowledgeBase:
+    """A fresh, empty version; the caller runs the build once the bot row is committed."""
+    kb = models.KnowledgeBase(
+        url_key=normalize_url(website_url),
+        collection_key=f"kb-{uuid.uuid4()}",
+        status="building",
+    )
+    db.add(kb)
+    db.flush()
+    return kb
+
+
+def settle_attached(db: Session, bot: models.Bot):
+    """
+    Call after committing a bot attached to a shared version. If the build
+    finished between find_shared and that commit, _settle did not see the
+    bot; copy the outcome onto it here.
+    """
+    # Waits for a _settle in flight (it holds the row), then reads its outcome
+    kb = (
+        db.query(models.KnowledgeBase)
+        .filter(models.KnowledgeBase.id == bot.kb_id)
+        .with_for_update()
+        .one()
+    )
+    db.refresh(bot)
+    published = None
+    if bot.status == "processing" and kb.status in SETTLED_STATUSES:
+        bot.status = kb.status
+        bot.error_message = "The shared knowledge base failed to build." if kb.status == "failed" else None
+        published = _notify(db, bot)
+    db.commit()
+    if published:
+        status_bus.publish(*published)
+
+
+def _notify(db: Session, bot: models.Bot) -> tuple:
+    """NOTIFY a bot's new status on the caller's commit; publish the returned args after it."""
+    version = status_bus.next_version(bot.bot_id)
+    payload = jsonable_encoder(status_payload(bot, None))
+    status_bus.notify(db, bot.bot_id, version, payload)
+    return bot.bot_id, version, payload
+
+
+# -----------------------------------------------------
+# BUILD FINISHED
+# -----------------------------------------------------
+def _settle(kb_id: int, builder_bot_pk: int, ok: bool) -> str | None:
+    """
+    Record the build on the version and release bots that were waiting on
+    it. Returns the collection to drop: the failed build's, or one rebuilt
+    into a version that was retired or failed while this build ran (its
+    builder deleted, or swept as orphaned).
+    """
+    now = datetime.utcnow()
+    published = []
+    with db_session() as db:
+        job = (
+            db.query(models.BuildJob)
+            .filter(models.BuildJob.bot_id == builder_bot_pk)
+            .order_by(models.BuildJob.id.desc())
+            .first()
+        )
+        status = "ready" if ok else "failed"
+        values = {"status": status, "built_at": now}
+        if job is not None:
+            values.update(points=job.points_upserted or 0, build_seconds=job.total_seconds)
+        # Conditional: only a version still building is settled. The update
+        # also holds the row lock settle_attached waits on
+        settled = (
+            db.query(models.KnowledgeBase)
+            .filter(models.KnowledgeBase.id == kb_id, models.KnowledgeBase.status == "building")
+            .update(values, synchronize_session=False)
+        )
+        kb = db.get(models.KnowledgeBase, kb_id)
+        if not settled:
+            db.commit()
+            if kb is None:
+                return None
+            logger.warning(f"[KB] Version {kb_id} is {kb.status}, not building — dropping what the build wrote")
+            return kb.collection_key
+
+        # Bots that attached while the build was running
+        builder = db.get(models.Bot, builder_bot_pk)
+        waiting = (
+            db.query(models.Bot)
+            .filter(
+                models.Bot.kb_id == kb_id,
+                models.Bot.id != builder_bot_pk,
+                models.Bot.status == "processing",
+            )
+            .all()
+        )
+        for bot in waiting:
+            bot.status = status
+            bot.error_message = builder.error_message if builder is not None and not ok else None
+            published.append(_notify(db, bot))
+        collection_key = kb.collection_key
+        db.commit()
+
+    for args in published:
+        status_bus.publish(*args)
+    logger.info(f"[KB] Version {kb_id} {status}; {len(waiting)} waiting bots updated")
+    return None if ok else collection_key
+
+
+async def _drop_failed(kb_id: int, collection_key: str):
+    # Don't leave a half-written version behind for check-collections to flag,
+    # or a collection a retired version no longer accounts for
+    try:
+        await delete_collection(collection_key)
+        await asyncio.to_thread(forget_pages, collection_key)
+    except Exception:
+        logger.warning(f"[KB] Could not delete collection of failed version {kb_id}")
+
+
+async def finish_build(kb_id: int, builder_bot_pk: int, ok: bool):
+    stale_collection = await asyncio.to_thread(_settle, kb_id, builder_bot_pk, ok)
+    if stale_collection:
+        await _drop_failed(kb_id, stale_collection)
+
+
+# -----------------------------------------------------
+# ORPHANED BUILDS (process killed mid-build)
+# -----------------------------------------------------
+def _fail_orphans() -> list[tuple[int, str]]:
+    """Fail "building" versions whose build stopped beating, with their jobs and bots."""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=KB_BUILD_STALE_S)
+    published = []
+    with db_session() as db:
+        orphans = (
+            db.query(models.KnowledgeBase)
+            .filter(
+                models.KnowledgeBase.status == "building",
+                models.KnowledgeBase.created_at < stale,
+                ~_build_alive(stale),
+            )
+            .with_for_update()
+            .all()
+        )
+        for kb in orphans:
+            kb.status = "failed"
+            kb.built_at = now
+            bots = db.query(models.Bot).filter(models.Bot.kb_id == kb.id).all()
+            db.query(models.BuildJob).filter(
+                models.BuildJob.bot_id.in_([bot.id for bot in bots]),
+                models.BuildJob.status == "running",
+            ).update(
+                {"status": "failed", "error_message": INTERRUPTED_MESSAGE, "finished_at": now},
+                synchronize_session=False,
+            )
+            for bot in bots:
+                if bot.status not in SETTLED_STATUSES:
+                    bot.status = "failed"
+                    bot.error_message = INTERRUPTED_MESSAGE
+                    published.append(_notify(db, bot))
+        failed = [(kb.id, kb.collection_key) for kb in orphans]
+        db.commit()
+
+    for args in published:
+        status_bus.publish(*args)
+    return failed
+
+
+async def sweep_orphaned_builds():
+    """Lifespan task: fail orphaned versions at startup, then every KB_BUILD_STALE_S."""
+    while True:
+        try:
+            failed = await asyncio.to_thread(_fail_orphans)
+            for kb_id, collection_key in failed:
+                logger.warning(f"[KB] Version {kb_id} was still building with no live build — failed")
+                await _drop_failed(kb_id, collection_key)
+        except Exception as e:
+            logger.warning(f"[KB] Orphaned build sweep failed: {e}")
+        await asyncio.sleep(KB_BUILD_STALE_S)
+
+
+# -----------------------------------------------------
+# RELEASE (bot deleted or moved to a new version)
+# -----------------------------------------------------
+def _retire_if_unused(kb_id: int) -> str | None:
+    with db_session() as db:
+        in_use = db.query(models.Bot.id).filter(models.Bot.kb_id == kb_id).exists()
+        retired = (
+            db.query(models.KnowledgeBase)
+            .filter(
+                models.KnowledgeBase.id == kb_id,
+                models.KnowledgeBase.status != "retired",
+                ~in_use,
+            )
+            .update({"status": "retired"}, synchronize_session=False)
+        )
+        db.commit()
+        if not retired:
+            return None
+        return db.get(models.KnowledgeBase, kb_id).collection_key
+
+
+async def release_storage(bot_id: str, kb_id: int | None):
+    """
+    Call after a bot row is deleted or pointed at another version: drops its
+    reference, deleting the collection once nothing else uses it.
+    """
+    if kb_id is None:
+        await delete_collection(bot_id)      # legacy per-bot collection
+        await asyncio.to_thread(forget_pages, bot_id)
+        return
+    collection_key = await asyncio.to_thread(_retire_if_unused, kb_id)
+    if collection_key:
+        await delete_collection(collection_key)
+        await asyncio.to_thread(forget_pages, collection_key)
+        logger.info(f"[KB] Version {kb_id} has no bots left — retired")
+
+
+# -----------------------------------------------------
+# REPORT
+# -----------------------------------------------------
+def savings_report(db: Session, limit: int = 20) -> dict:
+    """Storage held once instead of per bot, and build time not spent, across all versions."""
+    refs = dict(
+        db.query(models.Bot.kb_id, func.count(models.Bot.id))
+        .filter(models.Bot.kb_id.isnot(None))
+        .group_by(models.Bot.kb_id)
+        .all()
+    )
+    versions = db.query(models.KnowledgeBase).all()
+
+    points_saved = 0
+    build_seconds_saved = 0.0
+    shared = []
+    for kb in versions:
+        n = refs.get(kb.id, 0)
+        if kb.status == "ready" and n > 1:
+            points_saved += (kb.points or 0) * (n - 1)
+            shared.append({"kb_id": kb.id, "url": kb.url_key, "bots": n, "points": kb.points, "built_at": kb.built_at})
+        # Every reuse skipped a crawl + embed + upsert of this size
+        build_seconds_saved += (kb.build_seconds or 0.0) * (kb.reuses or 0)
+
+    return {
+        "versions": sum(1 for kb in versions if kb.status in LIVE_STATUSES),
+        "bots_on_shared_versions": sum(s["bots"] for s in shared),
+        "points_saved": points_saved,
+        "vector_mb_saved": round(points_saved * _VECTOR_BYTES / 2**20, 1),
+        "build_seconds_saved": round(build_seconds_saved, 1),
+        "most_shared": sorted(shared, key=lambda s: s["bots"], reverse=True)[:limit],
+    }
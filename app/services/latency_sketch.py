@@ -0,0 +1,275 @@
+import os
+import asyncio
+import logging
+import math
+import socket
+import struct
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy.orm import Session
+
+from app.db import db_session
+from app import models
+
+logger = logging.getLogger(__name__)
+
+SKETCH_WINDOW_S = int(os.getenv("LATENCY_SKETCH_WINDOW_S", "300"))           # time bucket per stored row
+SKETCH_FLUSH_INTERVAL_S = float(os.getenv("LATENCY_SKETCH_FLUSH_INTERVAL_S", "60"))
+# Rows (every window × bot × provider × stage × process) older than this are deleted
+SKETCH_RETENTION_DAYS = float(os.getenv("LATENCY_SKETCH_RETENTION_DAYS", "30"))
+SKETCH_PRUNE_INTERVAL_S = 3600
+SKETCH_RELATIVE_ACCURACY = 0.01                                                # ±1% on every quantile
+
+# Identifies this process — each worker owns its own rows, so flushes never race
+SKETCH_SOURCE = f"{socket.gethostname()}:{os.getpid()}"
+
+
+# -----------------------------------------------------
+# SKETCH
+# -----------------------------------------------------
+class LatencySketch:
+    """
+    Mergeable quantile sketch over log-spaced buckets (DDSketch-style).
+
+    Every value lands in bucket ceil(log_gamma(ms)), so any quantile is
+    within SKETCH_RELATIVE_ACCURACY of the true value, two sketches merge by
+    adding bucket counts, and a 60 s timeout costs one bucket, not a sample.
+    """
+
+    GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+    LOG_GAMMA = math.log(GAMMA)
+    MIN_MS = 0.1
+    _HEADER = struct.Struct("<BId")     # version, count, sum_ms
+    _BUCKET = struct.Struct("<hI")      # bucket index, count
+
+    def __init__(self):
+        self.buckets: dict[int, int] = defaultdict(int)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def add(self, ms: float, n: int = 1):
+        idx = math.ceil(math.log(max(ms, self.MIN_MS)) / self.LOG_GAMMA)
+        self.buckets[idx] += n
+        self.count += n
+        self.sum_ms += ms * n
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        for idx, n in other.buckets.items():
+            self.buckets[idx] += n
+        self.count += other.count
+        self.sum_ms += other.sum_ms
+        return self
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen > rank:
+                # Bucket midpoint (in log space) keeps the relative error symmetric
+                return 2 * self.GAMMA ** idx / (self.GAMMA + 1)
+        return 2 * self.GAMMA ** max(self.buckets) / (self.GAMMA + 1)
+
+    def summary(self, quantiles: Iterable[float] = (0.5, 0.9, 0.99)) -> dict:
+        out = {"count": self.count, "mean_ms": round(self.sum_ms / self.count, 1) if self.count else None}
+        for q in quantiles:
+            value = self.quantile(q)
+            out[f"p{round(q * 100):d}_ms"] = round(value, 1) if value is not None else None
+        return out
+
+    def to_bytes(self) -> bytes:
+        parts = [self._HEADER.pack(1, self.count, self.sum_ms)]
+        parts.extend(self._BUCKET.pack(idx, n) for idx, n in sorted(self.buckets.items()))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "LatencySketch":
+        sketch = cls()
+        _, sketch.count, sketch.sum_ms = cls._HEADER.unpack_from(data, 0)
+        for idx, n in cls._BUCKET.iter_unpack(data[cls._HEADER.size:]):
+            sketch.buckets[idx] = n
+        return sketch
+
+
+# -----------------------------------------------------
+# IN-MEMORY REGISTRY + PERIODIC FLUSH
+# -----------------------------------------------------
+def _window_start(ts: datetime) -> datetime:
+    epoch = int(ts.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % SKETCH_WINDOW_S)
+
+
+class SketchRegistry:
+    """
+    Per-process sketches keyed by (window, bot, provider, stage).
+    bot_id 0 / provider "" mean "not applicable" (e.g. the embed stage has no LLM provider).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sketches: dict[tuple, LatencySketch] = {}
+        self._task: asyncio.Task | None = None
+        self._next_prune = datetime.min      # first flush after start prunes
+
+    def record(self, stage: str, ms: float, bot_id: int | None = None, provider: str | None = None):
+        key = (_window_start(datetime.utcnow()), bot_id or 0, provider or "", stage)
+        with self._lock:
+            sketch = self._sketches.get(key)
+            if sketch is None:
+                sketch = self._sketches[key] = LatencySketch()
+            sketch.add(ms)
+
+    def pending(self) -> dict[tuple, LatencySketch]:
+        """Copy of sketches not yet flushed (merged into query results)."""
+        with self._lock:
+            return {k: LatencySketch().merge(s) for k, s in self._sketches.items()}
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="latency-sketch-flusher")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(SKETCH_FLUSH_INTERVAL_S)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception:
+                logger.exception("[SKETCH] Flush failed")
+
+    def flush(self):
+        if datetime.utcnow() >= self._next_prune:
+            self._next_prune = datetime.utcnow() + timedelta(seconds=SKETCH_PRUNE_INTERVAL_S)
+            try:
+                self.prune()
+            except Exception:
+                logger.exception("[SKETCH] Prune failed")
+
+        with self._lock:
+            sketches, self._sketches = self._sketches, {}
+        if not sketches:
+            return
+
+        try:
+            with db_session() as db:
+                for (window_start, bot_id, provider, stage), sketch in sketches.items():
+                    row = (
+                        db.query(models.LatencySketchRow)
+                        .filter_by(
+                            window_start=window_start,
+                            bot_id=bot_id,
+                            provider=provider,
+                            stage=stage,
+                            source=SKETCH_SOURCE,
+                        )
+                        .first()
+                    )
+                    if row:
+                        merged = LatencySketch.from_bytes(row.sketch).merge(sketch)
+                        row.sketch = merged.to_bytes()
+                        row.count = merged.count
+                    else:
+                        db.add(
+                            models.LatencySketchRow(
+                                window_start=window_start,
+                                bot_id=bot_id,
+                                provider=provider,
+                                stage=stage,
+                                source=SKETCH_SOURCE,
+                                count=sketch.count,
+                                sketch=sketch.to_bytes(),
+                            )
+                        )
+                db.commit()
+        except Exception:
+            # Put them back so the next flush retries
+            with self._lock:
+                for key, sketch in sketches.items():
+                    current = self._sketches.get(key)
+                    self._sketches[key] = sketch.merge(current) if current else sketch
+            raise
+        logger.info(f"[SKETCH] Flushed {len(sketches)} latency sketches")
+
+    def prune(self, keep_days: float = SKETCH_RETENTION_DAYS) -> int:
+        """Delete windows older than keep_days, whichever process wrote them."""
+        cutoff = datetime.utcnow() - timedelta(days=keep_days)
+        with db_session() as db:
+            pruned = (
+                db.query(models.LatencySketchRow)
+                .filter(models.LatencySketchRow.window_start < cutoff)
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+        if pruned:
+            logger.info(f"[SKETCH] Pruned {pruned} latency sketch rows older than {keep_days:g} days")
+        return pruned
+
+
+latency_sketches = SketchRegistry()
+
+
+# -----------------------------------------------------
+# QUERY: merge stored + unflushed sketches over any window
+# -----------------------------------------------------
+def query_latency(
+    db: Session,
+    since: datetime,
+    until: datetime | None = None,
+    bot_id: int | None = None,
+    stage: str | None = None,
+    provider: str | None = None,
+    group_by: tuple[str, ...] = ("stage",),
+) -> list[dict]:
+    """
+    Return p50/p90/p99 per group for [since, until).
+    Resolution is SKETCH_WINDOW_S; no raw chat_logs are read.
+    """
+    until = until or datetime.utcnow() + timedelta(seconds=SKETCH_WINDOW_S)
+    since_window = _window_start(since)
+
+    q = db.query(models.LatencySketchRow).filter(
+        models.LatencySketchRow.window_start >= since_window,
+        models.LatencySketchRow.window_start < until,
+    )
+    if bot_id is not None:
+        q = q.filter(models.LatencySketchRow.bot_id == bot_id)
+    if stage:
+        q = q.filter(models.LatencySketchRow.stage == stage)
+    if provider:
+        q = q.filter(models.LatencySketchRow.provider == provider)
+
+    rows = [
+        ({"bot_id": r.bot_id, "provider": r.provider, "stage": r.stage}, LatencySketch.from_bytes(r.sketch))
+        for r in q.all()
+    ]
+    for (window_start, b, p, s), sketch in latency_sketches.pending().items():
+        if not (since_window <= window_start < until):
+            continue
+        if (bot_id is not None and b != bot_id) or (stage and s != stage) or (provider and p != provider):
+            continue
+        rows.append(({"bot_id": b, "provider": p, "stage": s}, sketch))
+
+    groups: dict[tuple, LatencySketch] = {}
+    for labels, sketch in rows:
+        key = tuple(labels[g] for g in group_by)
+        groups.setdefault(key, LatencySketch()).merge(sketch)
+
+    return [
+        {**dict(zip(group_by, key)), **sketch.summary()}
+        for key, sketch in sorted(groups.items())
+    ]
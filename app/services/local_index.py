@@ -0,0 +1,325 @@
+"""
+In-process exact-search index for small bots.
+
+Most bots are a few hundred 384-d chunks, so a query is one matmul over a
+contiguous float32 matrix — far cheaper than a network round trip to
+Qdrant. Each bot's index is pulled from Qdrant in the background on first
+use (that request, and any until the pull finishes, are answered by Qdrant), written to
+LOCAL_INDEX_DIR (matrix as a versioned .npy, ids + payloads + the name of
+that .npy as .json) and memory-mapped from there, so restarts and other
+workers on the host reuse it.
+
+Loaded indexes are LRU-evicted under LOCAL_INDEX_BUDGET_MB. Bots above
+LOCAL_INDEX_MAX_POINTS are remembered as too large and stay on Qdrant.
+An index older than LOCAL_INDEX_TTL_S is still served while it is reloaded
+in the background, which is how other workers' rebuilds reach this one.
+"""
+import os
+import asyncio
+import glob
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LOCAL_INDEX_ENABLED = os.getenv("LOCAL_INDEX_ENABLED", "true").lower() == "true"
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "app/data/local_index")
+LOCAL_INDEX_MAX_POINTS = int(os.getenv("LOCAL_INDEX_MAX_POINTS", "5000"))
+LOCAL_INDEX_BUDGET_MB = float(os.getenv("LOCAL_INDEX_BUDGET_MB", "128"))
+LOCAL_INDEX_TTL_S = float(os.getenv("LOCAL_INDEX_TTL_S", "300"))
+
+_SCROLL_PAGE = 256
+
+
+class BotIndex:
+    """Unit-normalised vectors (rows) + the matching point ids and payloads."""
+
+    def __init__(self, vectors: "np.ndarray", ids: List[str], payloads: List[dict], loaded_at: float):
+        self.vectors = vectors
+        self.ids = ids
+        self.payloads = payloads
+        self.loaded_at = loaded_at
+        # Payloads are Python objects; the JSON size is a fair stand-in
+        self.nbytes = vectors.nbytes + sum(len(p.get("text", "")) + 64 for p in payloads)
+
+    def search_many(
+        self, query_vectors: "np.ndarray | List[List[float]]", top_k: int, score_threshold: float | None = None,
+    ) -> List[Tuple[List[str], List[dict]]]:
+        import numpy as np
+
+        if not self.ids or top_k <= 0:
+            return [([], []) for _ in query_vectors]
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        # Not in place: the caller's vectors may be read-only cache views
+        queries = queries / np.where(norms == 0, 1.0, norms)
+        all_scores = queries @ self.vectors.T        # one matmul for every query
+        k = min(top_k, len(self.ids))
+
+        results = []
+        for scores in all_scores:
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            chunks, metadatas = [], []
+            for i in top:
+                if score_threshold is not None and scores[i] < score_threshold:
+                    break
+                payload = self.payloads[i]
+                chunks.append(payload.get("text", ""))
+                metadata = {key: v for key, v in payload.items() if key != "text"}
+                metadata["point_id"] = self.ids[i]
+                metadata["score"] = float(scores[i])
+                metadatas.append(metadata)
+            results.append((chunks, metadatas))
+        return results
+
+
+# -----------------------------------------------------
+# FILES
+# -----------------------------------------------------
+def _json_path(bot_id: str) -> str:
+    return os.path.join(LOCAL_INDEX_DIR, f"{bot_id}.json")
+
+
+def _npy_path(bot_id: str, version: str) -> str:
+    return os.path.join(LOCAL_INDEX_DIR, f"{bot_id}.{version}.npy")
+
+
+def _write_files(bot_id: str, vectors: "np.ndarray", ids: List[str], payloads: List[dict]):
+    import numpy as np
+
+    os.makedirs(LOCAL_INDEX_DIR, exist_ok=True)
+    json_path = _json_path(bot_id)
+    version = f"{time.time_ns()}-{os.getpid()}"
+    npy_name = os.path.basename(_npy_path(bot_id, version))
+    with open(_npy_path(bot_id, version), "wb") as f:
+        np.save(f, vectors)
+    try:
+        with open(json_path) as f:
+            previous = json.load(f).get("vectors")
+    except (OSError, ValueError, AttributeError):
+        previous = None
+    with open(json_path + f".{os.getpid()}.tmp", "w") as f:
+        json.dump({"vectors": npy_name, "ids": ids, "payloads": payloads}, f, separators=(",", ":"))
+    # The .json names its .npy, so this one rename switches vectors and payloads together
+    os.replace(json_path + f".{os.getpid()}.tmp", json_path)
+    if previous and previous != npy_name:
+        try:
+            # Readers that already mapped it keep their mapping
+            os.remove(os.path.join(LOCAL_INDEX_DIR, previous))
+        except FileNotFoundError:
+            pass
+
+
+def _read_files(bot_id: str) -> BotIndex | None:
+    import numpy as np
+
+    json_path = _json_path(bot_id)
+    try:
+        loaded_at = os.path.getmtime(json_path)
+        with open(json_path) as f:
+            data = json.load(f)
+        vectors = np.load(os.path.join(LOCAL_INDEX_DIR, data["vectors"]), mmap_mode="r")
+    except (OSError, ValueError, KeyError, TypeError):
+        return None      # not written yet, from an older layout, or replaced mid-read
+    if len(vectors) != len(data["ids"]):
+        return None
+    return BotIndex(vectors, data["ids"], data["payloads"], loaded_at)
+
+
+def _remove_files(bot_id: str):
+    base = os.path.join(LOCAL_INDEX_DIR, bot_id)
+    for path in [_json_path(bot_id), f"{base}.npy", *glob.glob(glob.escape(base) + ".*.npy")]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# -----------------------------------------------------
+# REGISTRY
+# -----------------------------------------------------
+class LocalIndexRegistry:
+    def __init__(self, budget_bytes: float = LOCAL_INDEX_BUDGET_MB * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self._indexes: OrderedDict[str, BotIndex] = OrderedDict()
+        self._too_large: Dict[str, float] = {}       # bot_id -> recheck after (monotonic)
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._tasks: set[asyncio.Task] = set()     # background loads, referenced until done
+        self._generations: Dict[str, int] = {}      # bumped by invalidate(); loads that straddle one are dropped
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fallbacks = 0
+        self.loads = 0
+
+    @property
+    def bytes_used(self) -> int:
+        with self._lock:
+            return sum(ix.nbytes for ix in self._indexes.values())
+
+    async def search(
+        self, bot_id: str, query_vector: "np.ndarray | List[float]", top_k: int, score_threshold: float | None = None,
+    ) -> Tuple[List[str], List[dict]] | None:
+        """Exact top-k from the local index, or None if the caller should ask Qdrant."""
+        results = await self.search_many(bot_id, [query_vector], top_k, score_threshold)
+        return results[0] if results is not None else None
+
+    async def search_many(
+        self, bot_id: str, query_vectors: "np.ndarray | List[List[float]]", top_k: int, score_threshold: float | None = None,
+    ) -> List[Tuple[List[str], List[dict]]] | None:
+        index = await self._get(bot_id)
+        if index is None:
+            self.fallbacks += 1
+            return None
+        self.hits += 1
+        return index.search_many(query_vectors, top_k, score_threshold)
+
+    async def load(self, bot_id: str) -> bool:
+        """Pull a bot's index now instead of on first use; False if it stays on Qdrant."""
+        return await self._load(bot_id) is not None
+
+    def invalidate(self, bot_id: str):
+        """Forget a bot here and on disk (its points were rebuilt or deleted)."""
+        with self._lock:
+            self._indexes.pop(bot_id, None)
+            self._too_large.pop(bot_id, None)
+            self._generations[bot_id] = self._generations.get(bot_id, 0) + 1
+        _remove_files(bot_id)
+
+    def _generation(self, bot_id: str) -> int:
+        with self._lock:
+            return self._generations.get(bot_id, 0)
+
+    # ---------- loading ----------
+    async def _get(self, bot_id: str) -> BotIndex | None:
+        now = time.monotonic()
+        with self._lock:
+            index = self._indexes.get(bot_id)
+            if index is not None:
+                self._indexes.move_to_end(bot_id)
+            elif self._too_large.get(bot_id, 0) > now:
+                return None
+
+        if index is None:
+            index = await asyncio.to_thread(_read_files, bot_id)
+            if index is None:
+                # Cold: this request goes to Qdrant while the index is pulled in the background
+                self._load_in_background(bot_id)
+                return None
+            self._remember(bot_id, index)
+
+        if time.time() - index.loaded_at > LOCAL_INDEX_TTL_S:
+            # Stale: keep serving it while a fresh copy is pulled from Qdrant
+            self._load_in_background(bot_id)
+        return index
+
+    def _load_in_background(self, bot_id: str):
+        if bot_id in self._loading:
+            return
+        task = asyncio.create_task(self._refresh(bot_id), name=f"local-index-load-{bot_id}")
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, bot_id: str):
+        try:
+            await self._load(bot_id)
+        except Exception:
+            logger.exception(f"[LOCAL INDEX] Background load failed for bot {bot_id}")
+            self.invalidate(bot_id)
+
+    async def _load(self, bot_id: str) -> BotIndex | None:
+        """Pull a bot's points from Qdrant; concurrent callers share one load."""
+        pending = self._loading.get(bot_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[bot_id] = future
+        try:
+            index = await self._load_from_qdrant(bot_id)
+            future.set_result(index)
+            return index
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; don't leave "exception never retrieved" behind
+            future.exception()
+            raise
+        finally:
+            del self._loading[bot_id]
+
+    async def _load_from_qdrant(self, bot_id: str) -> BotIndex | None:
+        import numpy as np
+        from app.services.vector_store import RETRIEVE_PAYLOAD_FIELDS, get_client, get_collection_name
+
+        generation = self._generation(bot_id)
+        client = get_client()
+        collection_name = get_collection_name(bot_id)
+        count = (await client.count(collection_name, exact=True)).count
+        if count > LOCAL_INDEX_MAX_POINTS:
+            with self._lock:
+                self._too_large[bot_id] = time.monotonic() + LOCAL_INDEX_TTL_S
+                self._indexes.pop(bot_id, None)
+            _remove_files(bot_id)
+            return None
+
+        ids, payloads, rows = [], [], []
+        offset = None
+        while True:
+            points, offset = await client.scroll(
+                collection_name,
+                limit=_SCROLL_PAGE,
+                offset=offset,
+                with_payload=RETRIEVE_PAYLOAD_FIELDS,
+                with_vectors=True,
+            )
+            for p in points:
+                ids.append(str(p.id))
+                payloads.append(p.payload or {})
+            if points:
+                # One float32 block per page; the client's float lists are dropped right away
+                rows.append(np.asarray([p.vector for p in points], dtype=np.float32))
+            if offset is None:
+                break
+
+        vectors = np.concatenate(rows) if rows else np.zeros((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1.0, norms)
+
+        index = None
+        try:
+            await asyncio.to_thread(_write_files, bot_id, vectors, ids, payloads)
+            index = await asyncio.to_thread(_read_files, bot_id)
+        except OSError as e:
+            logger.warning(f"[LOCAL INDEX] Could not write {LOCAL_INDEX_DIR}: {e}")
+        if self._generation(bot_id) != generation:
+            # Points changed while we scrolled: this snapshot is stale, and so are the files it wrote
+            await asyncio.to_thread(_remove_files, bot_id)
+            logger.info(f"[LOCAL INDEX] Bot {bot_id} changed during its load — discarded")
+            return None
+        if index is None:
+            # Unwritable LOCAL_INDEX_DIR (or nothing to map): keep the in-memory copy
+            index = BotIndex(vectors, ids, payloads, time.time())
+        self._remember(bot_id, index)
+        self.loads += 1
+        logger.info(f"[LOCAL INDEX] Loaded {len(ids)} points for bot {bot_id}")
+        return index
+
+    def _remember(self, bot_id: str, index: BotIndex):
+        with self._lock:
+            self._indexes[bot_id] = index
+            self._indexes.move_to_end(bot_id)
+            total = sum(ix.nbytes for ix in self._indexes.values())
+            while total > self.budget_bytes and len(self._indexes) > 1:
+                _, evicted = self._indexes.popitem(last=False)
+                total -= evicted.nbytes
+
+
+local_index = LocalIndexRegistry()
@@ -0,0 +1,294 @@
+import os
+import bisect
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+from app.services.latency_sketch import latency_sketches
+
+# Only the first N resolved bots get their own `bot` label value; the rest
+# are reported as "other" so a growing fleet can't explode the series count.
+METRICS_MAX_BOT_LABELS = int(os.getenv("METRICS_MAX_BOT_LABELS", "50"))
+
+# Seconds — spans the ~10 ms Qdrant calls up to the 60 s provider timeout
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+# -----------------------------------------------------
+# MINIMAL PROMETHEUS TEXT-FORMAT REGISTRY
+# -----------------------------------------------------
+def _fmt_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}   # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if idx < len(self.buckets):
+                series[idx] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, labels, le)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f"{self.name}{_fmt_labels(self.labelnames, k)} {v}" for k, v in items]
+        return lines
+
+
+class Callback:
+    """Gauge / counter whose value is read at scrape time, e.g. DB pool occupancy."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], float], type: str = "gauge"):
+        self.name, self.help, self.fn, self.type = name, help, fn, type
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}", f"{self.name} {self.fn()}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# -----------------------------------------------------
+# CHAT METRICS
+# -----------------------------------------------------
+chat_request_seconds = registry.register(Histogram(
+    "chat_request_duration_seconds",
+    "End-to-end chat_with_bot latency",
+    ("bot", "provider", "outcome"),
+))
+chat_stage_seconds = registry.register(Histogram(
+    "chat_stage_duration_seconds",
+    "Latency of each chat pipeline stage",
+    ("stage", "provider", "outcome"),
+))
+chat_requests_total = registry.register(Counter(
+    "chat_requests_total",
+    "Chat requests by outcome",
+    ("provider", "outcome"),
+))
+
+chatlog_flush_seconds = registry.register(Histogram(
+    "chatlog_flush_duration_seconds",
+    "Time to write one batch of chat logs (write-behind, off the request path)",
+    ("outcome",),
+))
+
+
+# -----------------------------------------------------
+# SCRAPE-TIME GAUGES
+# -----------------------------------------------------
+def _read(target: str, key: str | None = None) -> Callable[[], float]:
+    """
+    Scrape-time reader for "module:object.attribute": the attribute (called
+    when it is a method), then [key] when given. The module is imported on
+    the first scrape, so this one doesn't pull in every service.
+    """
+    module_name, _, path = target.partition(":")
+
+    def read():
+        value = importlib.import_module(module_name)
+        for name in path.split("."):
+            value = getattr(value, name)
+        if callable(value):
+            value = value()
+        return value.get(key, 0) if key is not None else value
+    return read
+
+
+registry.register(Callback("db_pool_checked_out", "Connections currently checked out", _read("app.db:get_pool_status", "checked_out")))
+registry.register(Callback("db_pool_overflow", "Overflow connections currently open", _read("app.db:get_pool_status", "overflow")))
+registry.register(Callback("db_pool_checkout_wait_ms_max", "Longest checkout wait since start (ms)", _read("app.db:get_pool_status", "wait_ms_max")))
+registry.register(Callback("db_pool_overflow_events_total", "Checkouts that opened an overflow connection", _read("app.db:get_pool_status", "overflow_events"), "counter"))
+registry.register(Callback("db_pool_timeouts_total", "Checkouts that timed out", _read("app.db:get_pool_status", "timeouts"), "counter"))
+registry.register(Callback("chatlog_queue_depth", "Chat logs waiting to be written", _read("app.services.chat_log_writer:chat_log_writer.stats", "queued")))
+registry.register(Callback("bot_status_subscribers", "Open /status/stream and /status/wait connections", _read("app.services.status_bus:status_bus.subscribers")))
+registry.register(Callback("chatlog_dropped_total", "Chat logs dropped (queue full / failed flush)", _read("app.services.chat_log_writer:chat_log_writer.stats", "dropped"), "counter"))
+
+registry.register(Callback("principal_cache_hits_total", "Authenticated requests served without a users lookup", _read("app.services.principal_cache:principal_cache.hits"), "counter"))
+registry.register(Callback("principal_cache_misses_total", "Authenticated requests that loaded the user from the DB", _read("app.services.principal_cache:principal_cache.misses"), "counter"))
+
+
+registry.register(Callback("local_index_hits_total", "Retrievals answered by the in-process index", _read("app.services.local_index:local_index.hits"), "counter"))
+registry.register(Callback("local_index_fallbacks_total", "Retrievals sent to Qdrant (bot too large or index unavailable)", _read("app.services.local_index:local_index.fallbacks"), "counter"))
+registry.register(Callback("local_index_loads_total", "Bot indexes pulled from Qdrant", _read("app.services.local_index:local_index.loads"), "counter"))
+registry.register(Callback("local_index_bytes", "Estimated memory held by loaded bot indexes", _read("app.services.local_index:local_index.bytes_used")))
+
+
+registry.register(Callback("chunk_embedding_store_hits_total", "Build chunks whose embedding came from the on-disk store", _read("app.services.chunk_embedding_store:chunk_embedding_store.hits"), "counter"))
+registry.register(Callback("chunk_embedding_store_misses_total", "Build chunks the store had no embedding for", _read("app.services.chunk_embedding_store:chunk_embedding_store.misses"), "counter"))
+registry.register(Callback("chunk_embedding_store_evictions_total", "Store segments dropped to stay under EMBED_STORE_MAX_MB", _read("app.services.chunk_embedding_store:chunk_embedding_store.evictions"), "counter"))
+registry.register(Callback("chunk_embedding_store_bytes", "Size of the store's vector segments on disk", _read("app.services.chunk_embedding_store:chunk_embedding_store.bytes_used")))
+
+
+registry.register(Callback("recrawl_pages_checked_total", "Pages revisited by the recrawl scheduler", _read("app.services.recrawl:recrawl_scheduler.stats", "checked"), "counter"))
+registry.register(Callback("recrawl_pages_not_modified_total", "Revisits answered 304 Not Modified", _read("app.services.recrawl:recrawl_scheduler.stats", "not_modified"), "counter"))
+registry.register(Callback("recrawl_pages_unchanged_total", "Revisits whose extracted text hash was unchanged", _read("app.services.recrawl:recrawl_scheduler.stats", "unchanged"), "counter"))
+registry.register(Callback("recrawl_pages_changed_total", "Revisits that found new content and were reindexed", _read("app.services.recrawl:recrawl_scheduler.stats", "changed"), "counter"))
+registry.register(Callback("recrawl_pages_gone_total", "Revisited pages that were removed (404 / 410 / empty)", _read("app.services.recrawl:recrawl_scheduler.stats", "gone"), "counter"))
+registry.register(Callback("recrawl_pages_errors_total", "Revisits that failed to fetch", _read("app.services.recrawl:recrawl_scheduler.stats", "errors"), "counter"))
+registry.register(Callback("recrawl_pages_deferred_total", "Due pages left for later by the global or tenant crawl budget", _read("app.services.recrawl:recrawl_scheduler.stats", "deferred"), "counter"))
+registry.register(Callback("recrawl_chunks_reindexed_total", "Chunks re-embedded and upserted by incremental reindexing", _read("app.services.recrawl:recrawl_scheduler.stats", "chunks_reindexed"), "counter"))
+
+
+registry.register(Callback("query_embedding_cache_hits_total", "Chat questions answered without an embedding API call", _read("app.services.embedding_cache:query_embedding_cache.hits"), "counter"))
+registry.register(Callback("query_embedding_cache_misses_total", "Chat questions that had to be embedded", _read("app.services.embedding_cache:query_embedding_cache.misses"), "counter"))
+registry.register(Callback("bot_config_cache_hits_total", "Chats that skipped the bots lookup", _read("app.services.bot_config_cache:bot_config_cache.hits"), "counter"))
+registry.register(Callback("bot_config_cache_misses_total", "Chats that loaded the bot from the DB", _read("app.services.bot_config_cache:bot_config_cache.misses"), "counter"))
+registry.register(Callback("warm_state_restored_query_embeddings", "Query embeddings restored from the warm-state snapshot at startup", _read("app.services.warm_state:warm_state.restored", "query_embeddings")))
+registry.register(Callback("warm_state_restored_bots", "Hot bot configs restored from the warm-state snapshot at startup", _read("app.services.warm_state:warm_state.restored", "bots")))
+
+
+def _startup(field: str) -> Callable[[], float]:
+    def read():
+        from app.startup import startup_profile
+        return startup_profile.gauge(field)
+    return read
+
+
+registry.register(Callback("app_import_seconds", "Seconds from process start until app.main was imported", _startup("imported")))
+registry.register(Callback("app_ready_seconds", "Seconds from process start until startup finished", _startup("ready")))
+registry.register(Callback("app_first_chat_seconds", "Seconds from process start until the first chat response (NaN until then)", _startup("first_chat")))
+
+
+_bot_labels: set[str] = set()
+_bot_labels_lock = threading.Lock()
+
+
+def bot_label(bot_id: str | None) -> str:
+    if not bot_id:
+        return "none"
+    with _bot_labels_lock:
+        if bot_id in _bot_labels:
+            return bot_id
+        if len(_bot_labels) < METRICS_MAX_BOT_LABELS:
+            _bot_labels.add(bot_id)
+            return bot_id
+    return "other"
+
+
+# Stages whose duration depends on which LLM provider answered
+PROVIDER_STAGES = {"generate"}
+
+
+class StageTimer:
+    """
+    Collects per-stage wall time (ms) for one request:
+
+        timer = StageTimer()
+        with timer.stage("embed"):
+            ...
+        timer.as_dict()  -> {"embed": 123.4, ...}
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round(self.stages.get(name, 0.0) + (time.perf_counter() - t0) * 1000, 2)
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def as_dict(self) -> dict[str, float]:
+        return dict(self.stages)
+
+
+def observe_chat(
+    timer: StageTimer,
+    outcome: str,
+    bot_id: str | None = None,
+    bot_pk: int | None = None,
+    provider: str | None = None,
+    provider_attempts: list[tuple[str, float]] | None = None,
+):
+    """
+    Export one chat request's timings as histograms + latency sketches.
+    Every outcome goes into the sketches: a provider timeout that ends as a
+    429 or 500 is exactly the tail p95/p99 should show. With
+    `provider_attempts` ((provider, ms) per LLM call), provider stages are
+    split per call, so a fallback's time isn't charged to the provider
+    that finally answered.
+    """
+    total_ms = timer.total_ms()
+    provider_label = provider or "none"
+
+    chat_requests_total.inc(provider_label, outcome)
+    # Only bots that resolved get a label slot: junk ids from 404s / 400s would use them up
+    bot = bot_label(bot_id) if bot_pk is not None else "other"
+    chat_request_seconds.observe(total_ms / 1000, bot, provider_label, outcome)
+
+    for stage, ms in timer.stages.items():
+        if stage not in PROVIDER_STAGES:
+            chat_stage_seconds.observe(ms / 1000, stage, "none", outcome)
+            latency_sketches.record(stage, ms, bot_id=bot_pk)
+            continue
+        for attempt_provider, attempt_ms in provider_attempts or [(provider, ms)]:
+            chat_stage_seconds.observe(attempt_ms / 1000, stage, attempt_provider or "none", outcome)
+            latency_sketches.record(stage, attempt_ms, bot_id=bot_pk, provider=attempt_provider)
+
+    latency_sketches.record("total", total_ms, bot_id=bot_pk, provider=provider)
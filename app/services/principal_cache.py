@@ -0,0 +1,72 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+# Short: other workers only see admin changes to a user once this expires
+AUTH_PRINCIPAL_TTL_S = float(os.getenv("AUTH_PRINCIPAL_TTL_S", "30"))
+AUTH_PRINCIPAL_CACHE_SIZE = int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", "10000"))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    The authenticated user as routes see it — a detached snapshot of the
+    users row, so it can be cached and shared across requests.
+    """
+    id: int
+    email: str
+    name: str
+    role: str
+    bot_limit: int | None
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(id=user.id, email=user.email, name=user.name, role=user.role, bot_limit=user.bot_limit)
+
+
+class PrincipalCache:
+    """
+    Bounded LRU of verified principals keyed by user id, each valid for
+    AUTH_PRINCIPAL_TTL_S. Admin endpoints that change or delete a user call
+    invalidate(user_id) so this worker picks the change up immediately.
+    """
+
+    def __init__(self, ttl: float = AUTH_PRINCIPAL_TTL_S, max_entries: int = AUTH_PRINCIPAL_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, tuple[float, Principal]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Principal | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, principal: Principal):
+        with self._lock:
+            self._entries[principal.id] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int | None = None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+principal_cache = PrincipalCache()
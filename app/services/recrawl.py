@@ -0,0 +1,390 @@
+"""
+Background recrawl: keep knowledge bases fresh without full rebuilds.
+
+Every indexed page has a CrawledPage row (written by run_pipeline) with its
+ETag / Last-Modified, a hash of its extracted text and a revisit interval
+that halves when the page is seen to change and doubles when it isn't.
+Each tick the scheduler takes the due pages, ranks them by observed change
+rate × traffic of the bots answering from them (message_count,
+last_used_at), spends the global and per-tenant crawl budgets on the top
+ones, and revisits them with conditional GETs. Only pages that changed (or
+disappeared) are re-chunked, re-embedded and swapped in their collection.
+
+Budgets are counted in this process: enable RECRAWL_ENABLED in one worker.
+Pages built by the Apify crawler are extracted differently from this
+fetcher, so their first revisit only records a baseline hash.
+"""
+import os
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import httpx
+
+from app.db import db_session
+from app import models
+
+logger = logging.getLogger(__name__)
+
+RECRAWL_ENABLED = os.getenv("RECRAWL_ENABLED", "false").lower() == "true"
+RECRAWL_TICK_S = float(os.getenv("RECRAWL_TICK_S", "60"))
+RECRAWL_CONCURRENCY = int(os.getenv("RECRAWL_CONCURRENCY", "4"))
+# Revisit interval bounds; new pages start at the base interval
+RECRAWL_BASE_INTERVAL_S = float(os.getenv("RECRAWL_BASE_INTERVAL_S", str(24 * 3600)))
+RECRAWL_MIN_INTERVAL_S = float(os.getenv("RECRAWL_MIN_INTERVAL_S", "3600"))
+RECRAWL_MAX_INTERVAL_S = float(os.getenv("RECRAWL_MAX_INTERVAL_S", str(30 * 24 * 3600)))
+# Crawl budgets, in page fetches
+RECRAWL_GLOBAL_PAGES_PER_HOUR = int(os.getenv("RECRAWL_GLOBAL_PAGES_PER_HOUR", "600"))
+RECRAWL_TENANT_PAGES_PER_DAY = int(os.getenv("RECRAWL_TENANT_PAGES_PER_DAY", "200"))
+# Collections whose bots have not answered anything for this long are left alone
+RECRAWL_IDLE_DAYS = float(os.getenv("RECRAWL_IDLE_DAYS", "30"))
+
+_RECENT_USE = timedelta(days=7)
+_LEASE_S = 600     # a claimed page is not handed out again while it is being checked
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+# -----------------------------------------------------
+# PAGE RECORDS (build side)
+# -----------------------------------------------------
+def record_pages(collection_key: str, page_texts: Dict[str, str], hashes_comparable: bool):
+    """
+    Replace a collection's page records after a full build. Hashes are kept
+    only when the build used the same extraction as the recrawler (CRAWLER=http).
+    """
+    now = datetime.utcnow()
+    with db_session() as db:
+        db.query(models.CrawledPage).filter(models.CrawledPage.collection_key == collection_key).delete()
+        db.add_all(
+            models.CrawledPage(
+                collection_key=collection_key,
+                url=url,
+                content_hash=content_hash(text) if hashes_comparable else None,
+                interval_s=RECRAWL_BASE_INTERVAL_S,
+                last_checked_at=now,
+                next_check_at=now + timedelta(seconds=RECRAWL_BASE_INTERVAL_S),
+            )
+            for url, text in page_texts.items()
+        )
+        db.commit()
+
+
+def forget_pages(collection_key: str):
+    with db_session() as db:
+        db.query(models.CrawledPage).filter(models.CrawledPage.collection_key == collection_key).delete()
+        db.commit()
+
+
+# -----------------------------------------------------
+# BUDGETS
+# -----------------------------------------------------
+class CrawlBudget:
+    """Page fetches allowed per key (None = global) in a fixed window."""
+
+    def __init__(self, limit: int, window_s: float):
+        self.limit = limit
+        self.window_s = window_s
+        self._window_start = time.monotonic()
+        self._spent: Dict[object, int] = defaultdict(int)
+
+    def remaining(self, key=None) -> int:
+        if time.monotonic() - self._window_start >= self.window_s:
+            self._window_start = time.monotonic()
+            self._spent.clear()
+        return max(0, self.limit - self._spent[key])
+
+    def spend(self, key=None, n: int = 1):
+        self._spent[key] += n
+
+    def resets_in(self) -> float:
+        return max(0.0, self.window_s - (time.monotonic() - self._window_start))
+
+
+# -----------------------------------------------------
+# SCHEDULER
+# -----------------------------------------------------
+class RecrawlScheduler:
+    def __init__(self):
+        self.global_budget = CrawlBudget(RECRAWL_GLOBAL_PAGES_PER_HOUR, 3600)
+        self.tenant_budget = CrawlBudget(RECRAWL_TENANT_PAGES_PER_DAY, 24 * 3600)
+        self.stats = {
+            "checked": 0,
+            "not_modified": 0,     # 304 — nothing downloaded
+            "unchanged": 0,        # downloaded, same text
+            "changed": 0,
+            "gone": 0,
+            "errors": 0,
+            "deferred": 0,         # due but over a budget this tick
+            "chunks_reindexed": 0,
+        }
+        self._task: asyncio.Task | None = None
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if RECRAWL_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="recrawl-scheduler")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(RECRAWL_TICK_S)
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("[RECRAWL] Tick failed")
+
+    # ---------- one round ----------
+    async def tick(self) -> dict:
+        budget = self.global_budget.remaining()
+        if budget <= 0:
+            return {}
+        pages = await asyncio.to_thread(self._claim_due, budget)
+        if not pages:
+            return {}
+
+        semaphore = asyncio.Semaphore(RECRAWL_CONCURRENCY)
+        from app.services.crawler_http import CRAWL_HTTP_TIMEOUT_S
+
+        async with httpx.AsyncClient(timeout=CRAWL_HTTP_TIMEOUT_S, follow_redirects=True) as client:
+
+            async def check(page: dict) -> dict:
+                async with semaphore:
+                    return await self._check(client, page)
+
+            results = await asyncio.gather(*(check(p) for p in pages))
+
+        changed: Dict[str, Dict[str, str]] = defaultdict(dict)
+        gone: Dict[str, List[str]] = defaultdict(list)
+        bot_ids = {r["collection_key"]: r["bot_id"] for r in results}
+        for r in results:
+            self.stats["checked"] += 1
+            self.stats[r["outcome"]] += 1
+            if r["outcome"] == "changed":
+                changed[r["collection_key"]][r["url"]] = r["text"]
+            elif r["outcome"] == "gone":
+                gone[r["collection_key"]].append(r["url"])
+
+        for collection_key in set(changed) | set(gone):
+            try:
+                await self._reindex(
+                    collection_key, bot_ids[collection_key], changed.get(collection_key, {}), gone.get(collection_key, []),
+                )
+            except Exception:
+                logger.exception(f"[RECRAWL] Reindex of {collection_key} failed; pages stay due")
+                failed = set(changed.get(collection_key, {})) | set(gone.get(collection_key, []))
+                results = [r for r in results if not (r["collection_key"] == collection_key and r["url"] in failed)]
+
+        await asyncio.to_thread(self._save, results)
+        summary = {
+            "checked": len(results),
+            "changed": sum(len(v) for v in changed.values()),
+            "gone": sum(len(v) for v in gone.values()),
+        }
+        logger.info(f"[RECRAWL] {summary}")
+        return summary
+
+    def _claim_due(self, budget: int) -> List[dict]:
+        """Rank due pages by change rate × traffic, fit them into the budgets and lease them."""
+        now = datetime.utcnow()
+        with db_session() as db:
+            due = (
+                db.query(models.CrawledPage)
+                .filter(models.CrawledPage.next_check_at <= now)
+                .order_by(models.CrawledPage.next_check_at)
+                .limit(budget * 4)
+                .all()
+            )
+            if not due:
+                return []
+            traffic = _collection_traffic(db, {p.collection_key for p in due})
+
+            ranked = []
+            for page in due:
+                interval = page.interval_s or RECRAWL_BASE_INTERVAL_S
+                usage = traffic.get(page.collection_key)
+                # No ready bot answers from it (building, or orphaned), or nobody asks:
+                # look again an interval later instead of blocking the head of the queue
+                if usage is None or (
+                    usage["last_used_at"] and now - usage["last_used_at"] > timedelta(days=RECRAWL_IDLE_DAYS)
+                ):
+                    page.next_check_at = now + timedelta(seconds=interval)
+                    continue
+                change_rate = ((page.changes or 0) + 1) / ((page.checks or 0) + 2)
+                weight = 1 + math.log1p(usage["messages"])
+                if not usage["last_used_at"] or now - usage["last_used_at"] > _RECENT_USE:
+                    weight *= 0.25
+                # Long-starved pages catch up even on quiet bots
+                overdue = min(3.0, 1 + (now - page.next_check_at).total_seconds() / interval)
+                ranked.append((change_rate * weight * overdue, page, usage))
+            ranked.sort(key=lambda item: item[0], reverse=True)
+
+            claimed = []
+            for _, page, usage in ranked:
+                if len(claimed) >= budget:
+                    break
+                if self.tenant_budget.remaining(usage["tenant"]) <= 0:
+                    # Out of the tenant's daily budget: not due again before it refills
+                    wait_s = min(page.interval_s or RECRAWL_BASE_INTERVAL_S, self.tenant_budget.resets_in())
+                    page.next_check_at = now + timedelta(seconds=wait_s)
+                    continue
+                self.tenant_budget.spend(usage["tenant"])
+                self.global_budget.spend()
+                page.next_check_at = now + timedelta(seconds=_LEASE_S)
+                claimed.append({
+                    "id": page.id,
+                    "collection_key": page.collection_key,
+                    "bot_id": usage["bot_id"],
+                    "url": page.url,
+                    "etag": page.etag,
+                    "last_modified": page.last_modified,
+                    "content_hash": page.content_hash,
+                })
+            self.stats["deferred"] += len(ranked) - len(claimed)
+            db.commit()
+        return claimed
+
+    async def _check(self, client: httpx.AsyncClient, page: dict) -> dict:
+        """Conditional GET of one page → outcome + new validators / text."""
+        from app.services.crawler_http import _extract
+
+        result = {**page, "outcome": "errors", "text": None}
+        headers = {}
+        if page["etag"]:
+            headers["If-None-Match"] = page["etag"]
+        if page["last_modified"]:
+            headers["If-Modified-Since"] = page["last_modified"]
+        try:
+            response = await client.get(page["url"], headers=headers)
+        except httpx.HTTPError as e:
+            logger.warning(f"[RECRAWL] {page['url']}: {e}")
+            return result
+
+        if response.status_code == 304:
+            result["outcome"] = "not_modified"
+            return result
+        if response.status_code in (404, 410):
+            result["outcome"] = "gone"
+            return result
+        if response.status_code != 200 or "html" not in response.headers.get("content-type", ""):
+            return result
+
+        text, _ = await asyncio.to_thread(_extract, str(response.url), response.text)
+        result["etag"] = response.headers.get("etag")
+        result["last_modified"] = response.headers.get("last-modified")
+        if len(text) <= 50:
+            result["outcome"] = "gone"     # the crawler wouldn't have indexed it either
+            return result
+        new_hash = content_hash(text)
+        if page["content_hash"] is None or new_hash == page["content_hash"]:
+            # No hash yet (Apify build): this visit is the baseline
+            result["outcome"] = "unchanged"
+        else:
+            result["outcome"] = "changed"
+            result["text"] = text
+        result["content_hash"] = new_hash
+        return result
+
+    async def _reindex(self, collection_key: str, bot_id: str, changed: Dict[str, str], gone: List[str]):
+        """Swap the chunks of changed pages and drop those of removed ones."""
+        from app.services.chunk_embedding_store import embed_chunks
+        from app.services.text_processing import process_text_to_chunks
+        from app.services.vector_store import add_chunks_to_qdrant, chunk_metadatas, delete_page_chunks, next_chunk_index
+
+        texts, metadatas, embeddings = [], [], []
+        # Same payload as run_pipeline writes, numbered after the collection's existing chunks
+        first_index = await next_chunk_index(collection_key) if changed else 0
+        for url, text in changed.items():
+            chunks = process_text_to_chunks(text)
+            if not chunks:
+                continue
+            vectors, _ = await embed_chunks(chunks)
+            embeddings.append(vectors)
+            metadatas.extend(chunk_metadatas(bot_id, url, len(chunks), first_index + len(texts)))
+            texts.extend(chunks)
+
+        await delete_page_chunks(collection_key, list(changed) + gone)
+        if texts:
+            import numpy as np
+
+            await add_chunks_to_qdrant(collection_key, texts, np.concatenate(embeddings), metadatas)
+        self.stats["chunks_reindexed"] += len(texts)
+        logger.info(
+            f"[RECRAWL] {collection_key}: {len(changed)} pages changed ({len(texts)} chunks), {len(gone)} gone"
+        )
+
+    def _save(self, results: List[dict]):
+        now = datetime.utcnow()
+        with db_session() as db:
+            for r in results:
+                page = db.get(models.CrawledPage, r["id"])
+                if page is None:
+                    continue
+                if r["outcome"] == "gone":
+                    db.delete(page)
+                    continue
+                interval = page.interval_s or RECRAWL_BASE_INTERVAL_S
+                if r["outcome"] == "changed":
+                    page.changes = (page.changes or 0) + 1
+                    page.last_changed_at = now
+                    interval = max(RECRAWL_MIN_INTERVAL_S, interval / 2)
+                elif r["outcome"] in ("not_modified", "unchanged"):
+                    interval = min(RECRAWL_MAX_INTERVAL_S, interval * 2)
+                if r["outcome"] != "errors":
+                    page.etag = r["etag"]
+                    page.last_modified = r["last_modified"]
+                    page.content_hash = r["content_hash"]
+                page.checks = (page.checks or 0) + 1
+                page.interval_s = interval
+                page.last_checked_at = now
+                page.next_check_at = now + timedelta(seconds=interval)
+            db.commit()
+
+
+def _collection_traffic(db, collection_keys: set) -> Dict[str, dict]:
+    """
+    collection key -> messages and last use summed over its ready bots, and
+    the busiest bot: its owner is the tenant charged for the recrawls, and its
+    bot_id goes on reindexed chunks.
+    """
+    rows = (
+        db.query(
+            models.KnowledgeBase.collection_key, models.Bot.bot_id, models.Bot.user_id,
+            models.Bot.message_count, models.Bot.last_used_at,
+        )
+        .join(models.Bot, models.Bot.kb_id == models.KnowledgeBase.id)
+        .filter(models.KnowledgeBase.collection_key.in_(collection_keys), models.Bot.status == "ready")
+        .all()
+    )
+    rows += (
+        db.query(models.Bot.bot_id.label("collection_key"), models.Bot.bot_id, models.Bot.user_id, models.Bot.message_count, models.Bot.last_used_at)
+        .filter(models.Bot.kb_id.is_(None), models.Bot.bot_id.in_(collection_keys), models.Bot.status == "ready")
+        .all()
+    )
+    traffic: Dict[str, dict] = {}
+    for key, bot_id, user_id, messages, last_used_at in rows:
+        entry = traffic.setdefault(key, {"messages": 0, "last_used_at": None, "tenant": user_id, "bot_id": bot_id, "top": -1})
+        entry["messages"] += messages or 0
+        if last_used_at and (entry["last_used_at"] is None or last_used_at > entry["last_used_at"]):
+            entry["last_used_at"] = last_used_at
+        if (messages or 0) > entry["top"]:
+            entry["top"], entry["tenant"], entry["bot_id"] = messages or 0, user_id, bot_id
+    return traffic
+
+
+recrawl_scheduler = RecrawlScheduler()
@@ -0,0 +1,76 @@
+import json
+import logging
+from typing import List, Optional
+
+from app.services.vector_store import fetch_chunk_texts
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------------------------------------
+# WRITE SIDE: compact references stored in ChatLog
+# -----------------------------------------------------
+def build_source_refs(metadatas: List[dict]) -> List[dict]:
+    """
+    Turn retrieve_chunks() metadata into compact references:
+      {"id": <qdrant point id>, "page_url": ..., "score": ..., "chunk_index": ...}
+    Optional "start"/"end" char offsets are kept when the retriever provides them.
+    The chunk text itself already lives in Qdrant, so it is not copied.
+    """
+    refs = []
+    for meta in metadatas:
+        meta = meta or {}
+        ref = {
+            "id": meta.get("point_id"),
+            "page_url": meta.get("page_url"),
+        }
+        if meta.get("score") is not None:
+            ref["score"] = round(float(meta["score"]), 4)
+        if meta.get("chunk_index") is not None:
+            ref["chunk_index"] = meta["chunk_index"]
+        for key in ("start", "end"):
+            if meta.get(key) is not None:
+                ref[key] = meta[key]
+        refs.append(ref)
+    return refs
+
+
+def dump_source_refs(refs: List[dict]) -> str:
+    return json.dumps(refs, separators=(",", ":"))
+
+
+def load_source_refs(raw: Optional[str]) -> List[dict]:
+    if not raw:
+        return []
+    try:
+        refs = json.loads(raw)
+    except ValueError:
+        logger.warning("Could not parse ChatLog.retrieved_sources")
+        return []
+    return refs if isinstance(refs, list) else []
+
+
+# -----------------------------------------------------
+# READ SIDE: rehydrate text only when a conversation is viewed
+# -----------------------------------------------------
+async def resolve_sources(bot_id: str, refs: List[dict]) -> List[dict]:
+    """
+    Return refs with a "text" field filled from Qdrant.
+    Legacy rows that still carry their own "text" are passed through unchanged;
+    text is None when the point no longer exists (e.g. the bot was refreshed).
+    """
+    wanted = [r["id"] for r in refs if r.get("id") and "text" not in r]
+    texts = {}
+    if wanted:
+        try:
+            texts = await fetch_chunk_texts(bot_id, wanted)
+        except Exception:
+            logger.exception(f"Could not resolve {len(wanted)} source refs for bot {bot_id}")
+
+    resolved = []
+    for r in refs:
+        if "text" in r:
+            resolved.append(r)
+        else:
+            resolved.append({**r, "text": texts.get(r.get("id"))})
+    return resolved
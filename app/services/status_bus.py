@@ -0,0 +1,189 @@
+import os
+import json
+import asyncio
+import logging
+import select
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.db import engine
+
+logger = logging.getLogger(__name__)
+
+# Postgres NOTIFY channel shared by every worker
+STATUS_CHANNEL = "bot_status"
+
+# Finished builds are forgotten this long after their last update
+STATUS_TERMINAL_TTL_S = float(os.getenv("STATUS_TERMINAL_TTL_S", "300"))
+
+TERMINAL_STATUSES = {"ready", "failed"}
+
+USE_PG_NOTIFY = engine.dialect.name == "postgresql"
+
+
+class StatusBus:
+    """
+    Latest build status per bot, pushed to SSE / long-poll subscribers.
+
+    The pipeline publishes every stage change and progress write. Each state
+    carries a version (ms timestamp, monotonic per bot) so clients can resume
+    with `since=` / Last-Event-ID and never see an older state after a newer one.
+
+    With Postgres, publishes also go out as NOTIFY (sent in the same
+    transaction as the BuildJob write) and every worker runs one LISTEN
+    thread that feeds its local bus — a client connected to worker A sees a
+    build running on worker B. The same channel carries bot_config_cache
+    invalidations, so a bot deleted or rebuilt through one worker stops
+    being served as ready by all of them. Other databases are single-process only.
+    """
+
+    def __init__(self):
+        self._states: dict[str, tuple[int, dict, float]] = {}   # bot_id -> (version, payload, received_at)
+        self._changed: dict[str, asyncio.Event] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._listener: threading.Thread | None = None
+        self._stopping = threading.Event()
+        self.subscribers = 0
+
+    # -------------------------------------------------
+    # PUBLISH
+    # -------------------------------------------------
+    def next_version(self, bot_id: str) -> int:
+        current = self._states.get(bot_id)
+        now_ms = int(time.time() * 1000)
+        return max(now_ms, current[0] + 1) if current else now_ms
+
+    @staticmethod
+    def notify(db, bot_id: str, version: int, payload: dict):
+        """Queue a NOTIFY on `db`'s transaction (delivered to all workers on commit)."""
+        if USE_PG_NOTIFY:
+            message = json.dumps({"bot_id": bot_id, "version": version, "payload": payload}, default=str)
+            db.execute(text("SELECT pg_notify(:channel, :message)"), {"channel": STATUS_CHANNEL, "message": message})
+
+    @staticmethod
+    def notify_invalidate(db, bot_id: str):
+        """Queue a bot_config_cache invalidation for every worker on `db`'s transaction."""
+        if USE_PG_NOTIFY:
+            message = json.dumps({"invalidate": bot_id})
+            db.execute(text("SELECT pg_notify(:channel, :message)"), {"channel": STATUS_CHANNEL, "message": message})
+
+    def publish(self, bot_id: str, version: int, payload: dict):
+        """Deliver to local subscribers. Safe to call from any thread."""
+        if self._loop is not None and not self._on_loop():
+            self._loop.call_soon_threadsafe(self._apply, bot_id, version, payload)
+        else:
+            self._apply(bot_id, version, payload)
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _apply(self, bot_id: str, version: int, payload: dict):
+        current = self._states.get(bot_id)
+        if current and current[0] >= version:
+            return      # our own NOTIFY echoing back, or an out-of-order message
+        self._states[bot_id] = (version, payload, time.monotonic())
+        event = self._changed.pop(bot_id, None)
+        if event:
+            event.set()
+        self._prune()
+
+    def _prune(self):
+        cutoff = time.monotonic() - STATUS_TERMINAL_TTL_S
+        stale = [
+            bot_id for bot_id, (_, payload, received_at) in self._states.items()
+            if payload.get("status") in TERMINAL_STATUSES and received_at < cutoff
+        ]
+        for bot_id in stale:
+            del self._states[bot_id]
+
+    # -------------------------------------------------
+    # SUBSCRIBE
+    # -------------------------------------------------
+    def current(self, bot_id: str) -> tuple[int, dict] | None:
+        state = self._states.get(bot_id)
+        return (state[0], state[1]) if state else None
+
+    def seed(self, bot_id: str, payload: dict) -> tuple[int, dict]:
+        """Store a DB snapshot (version 0) unless a published state already exists."""
+        if bot_id not in self._states:
+            self._states[bot_id] = (0, payload, time.monotonic())
+        return self.current(bot_id)
+
+    async def wait(self, bot_id: str, since: int, timeout: float) -> tuple[int, dict] | None:
+        """Return the first state newer than `since`, or None after `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        while True:
+            state = self.current(bot_id)
+            if state and state[0] > since:
+                return state
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            event = self._changed.setdefault(bot_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    # -------------------------------------------------
+    # LIFECYCLE (Postgres LISTEN thread)
+    # -------------------------------------------------
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        if USE_PG_NOTIFY and self._listener is None:
+            self._stopping.clear()
+            self._listener = threading.Thread(target=self._listen, name="status-bus-listener", daemon=True)
+            self._listener.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._listener is not None:
+            self._listener.join(timeout=5)
+            self._listener = None
+
+    def _listen(self):
+        import psycopg2
+
+        from app.services.bot_config_cache import bot_config_cache
+
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        backoff = 1.0
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {STATUS_CHANNEL}")
+                logger.info(f"[STATUS] Listening on '{STATUS_CHANNEL}'")
+                backoff = 1.0
+
+                while not self._stopping.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        note = conn.notifies.pop(0)
+                        try:
+                            msg = json.loads(note.payload)
+                            if "invalidate" in msg:
+                                bot_config_cache.invalidate(msg["invalidate"])
+                            else:
+                                self.publish(msg["bot_id"], msg["version"], msg["payload"])
+                        except Exception:
+                            logger.exception("[STATUS] Bad notification payload")
+            except Exception as e:
+                logger.warning(f"[STATUS] LISTEN connection lost ({e}); retrying in {backoff:.0f}s")
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+status_bus = StatusBus()
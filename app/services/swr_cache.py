@@ -0,0 +1,75 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SWRCache:
+    """
+    Small stale-while-revalidate cache for expensive, read-mostly responses.
+
+    - younger than fresh_ttl  → served from cache
+    - younger than stale_ttl  → served from cache, refreshed in a background thread
+    - older / missing         → computed inline
+
+    Loaders are plain sync callables (they run in FastAPI's threadpool
+    anyway), and only one refresh per key is in flight at a time.
+    """
+
+    def __init__(self, fresh_ttl: float, stale_ttl: float, max_entries: int = 128):
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: dict[Hashable, tuple[float, Any]] = {}
+        self._refreshing: set[Hashable] = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry:
+            age = now - entry[0]
+            if age < self.fresh_ttl:
+                return entry[1]
+            if age < self.stale_ttl:
+                self._refresh_in_background(key, loader)
+                return entry[1]
+
+        return self._load(key, loader)
+
+    def invalidate(self, key: Hashable | None = None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        value = loader()
+        with self._lock:
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+            self._entries[key] = (time.monotonic(), value)
+        return value
+
+    def _refresh_in_background(self, key: Hashable, loader: Callable[[], Any]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self._load(key, loader)
+            except Exception:
+                logger.exception(f"[SWR] Background refresh failed for {key!r}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
@@ -1,12 +1,15 @@
 import re
 import logging
-from typing import List
+from typing import List, Tuple
 
 # ✅ use the cleaner we created in app/services/cleaner.py
 from app.services.cleaner import clean_scraped_text as clean_raw_text
 
 logger = logging.getLogger(__name__)
 
+# "# Title" lines, as html_extract (and Markdown) write headings
+HEADING_LINE = re.compile(r"^#{1,6}[ \t]+(.+?)[ \t#]*$", re.MULTILINE)
+
 
 # -----------------------------------------------------
 # 1. SPLIT INTO SENTENCES
@@ -29,6 +32,20 @@ def split_into_sentences(text: str) -> List[str]:
     return sentences
 
 
+def split_sections(text: str) -> List[Tuple[str | None, str]]:
+    """
+    (heading, body) pairs at "# Title" lines. Text without heading lines is
+    a single section with no heading.
+    """
+    sections: List[Tuple[str | None, str]] = []
+    heading, start = None, 0
+    for match in HEADING_LINE.finditer(text):
+        sections.append((heading, text[start:match.start()]))
+        heading, start = match.group(1).strip(), match.end()
+    sections.append((heading, text[start:]))
+    return [(h, body) for h, body in sections if h or body.strip()]
+
+
 # -----------------------------------------------------
 # 2. OPTIONAL: LEGACY CHUNKING (not used by pipeline now)
 # -----------------------------------------------------
@@ -75,8 +92,10 @@ def process_text_to_chunks(
     Convert raw page text into overlapping chunks.
 
     Pipeline:
-    1. Clean raw HTML text using cleaner.clean_text()
-    2. Split into sentences
+    1. Clean raw HTML text using cleaner.clean_text(), section by section
+       when the text has "# Title" heading lines (html_extract output)
+    2. Split into sentences; each kept heading becomes the first sentence
+       of its section, so chunks carry the heading they sit under
     3. Build overlapping word-window chunks
 
     - max_words:     target size of each chunk (approx tokens)
@@ -85,19 +104,21 @@ def process_text_to_chunks(
 
     logger.info("Starting text cleaning + chunking...")
 
-    # 1️⃣ Clean raw scraped text (remove navbar/footer/junk/repeats/etc.)
-    cleaned = clean_raw_text(text)
-    logger.info(f"Cleaned text length after cleaner: {len(cleaned)} chars")
-
-    if not cleaned.strip():
-        logger.warning("Cleaned text is empty after cleaning.")
-        return []
-
-    # 2️⃣ Sentence split
-    sentences = split_into_sentences(cleaned)
+    # 1️⃣ + 2️⃣ Clean raw scraped text (remove navbar/footer/junk/repeats/etc.), sentence split
+    sentences: List[str] = []
+    cleaned_chars = 0
+    for heading, body in split_sections(text):
+        cleaned = clean_raw_text(body)
+        cleaned_chars += len(cleaned)
+        body_sentences = split_into_sentences(cleaned)
+        if heading and body_sentences:
+            sentences.append(heading if heading[-1] in ".!?:" else f"{heading}:")
+        sentences.extend(body_sentences)
+    logger.info(f"Cleaned text length after cleaner: {cleaned_chars} chars")
     logger.info(f"Total sentences after split: {len(sentences)}")
 
     if not sentences:
+        logger.warning("Cleaned text is empty after cleaning.")
         return []
 
     # 3️⃣ Build overlapping chunks
@@ -1,119 +1,410 @@
-
-
 import os
-from qdrant_client import AsyncQdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
-from qdrant_client.http.exceptions import UnexpectedResponse
-from typing import List, Tuple
+import asyncio
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Tuple
 import uuid
 from dotenv import load_dotenv
 load_dotenv()
 
+from app.services.local_index import LOCAL_INDEX_ENABLED, local_index
+
+# qdrant_client is imported on first use, not at app import — it is the
+# single slowest import in the app and most cold starts are widget chats
+# that hit the DB / embedding API first.
+if TYPE_CHECKING:
+    import numpy as np
+    from qdrant_client import AsyncQdrantClient
+    from qdrant_client.models import SearchParams
+
+logger = logging.getLogger(__name__)
 
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+# Without a server: embedded Qdrant persisted under this directory (one
+# process at a time — it takes a lock). ":memory:" keeps the old throwaway mode.
+QDRANT_PATH = os.getenv("QDRANT_PATH", "app/data/qdrant")
+# New collections keep vectors + payloads on disk (mmap) instead of in RAM.
+# Honoured by the server; embedded mode always persists to its SQLite file.
+QDRANT_ON_DISK = os.getenv("QDRANT_ON_DISK", "false").lower() == "true"
+
+# Server transport: gRPC sends vectors as packed floats instead of JSON text
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_TIMEOUT_S = int(os.getenv("QDRANT_TIMEOUT_S", "10"))
+# REST connection pool (httpx) and keep-alive for both transports
+QDRANT_MAX_CONNECTIONS = int(os.getenv("QDRANT_MAX_CONNECTIONS", "32"))
+QDRANT_KEEPALIVE_CONNECTIONS = int(os.getenv("QDRANT_KEEPALIVE_CONNECTIONS", "16"))
+QDRANT_KEEPALIVE_S = float(os.getenv("QDRANT_KEEPALIVE_S", "30"))
+
+# Large sites are upserted in bounded batches, a few in flight at a time
+QDRANT_UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256"))
+QDRANT_UPSERT_CONCURRENCY = int(os.getenv("QDRANT_UPSERT_CONCURRENCY", "4"))
+QDRANT_UPSERT_RETRIES = int(os.getenv("QDRANT_UPSERT_RETRIES", "3"))
+
+_client: "AsyncQdrantClient | None" = None
+_client_lock = threading.Lock()
+# Collections this process created or saw — skips a get_collection round trip per upsert
+_known_collections: set[str] = set()
+
+
+class CollectionNotFound(Exception):
+    """The bot's collection doesn't exist (REST 404, gRPC NOT_FOUND or local-mode ValueError)."""
+
+
+class QdrantStorageLocked(RuntimeError):
+    """Embedded Qdrant's QDRANT_PATH is held by another process (usually the running app)."""
+
+
+def _server_options() -> dict:
+    """Transport, timeout and connection-reuse settings for a Qdrant server."""
+    import httpx
+
+    keepalive_ms = int(QDRANT_KEEPALIVE_S * 1000)
+    return {
+        "prefer_grpc": QDRANT_PREFER_GRPC,
+        "grpc_port": QDRANT_GRPC_PORT,
+        "timeout": QDRANT_TIMEOUT_S,
+        # Passed through to the REST transport's httpx.AsyncClient
+        "limits": httpx.Limits(
+            max_connections=QDRANT_MAX_CONNECTIONS,
+            max_keepalive_connections=QDRANT_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=QDRANT_KEEPALIVE_S,
+        ),
+        # HTTP/2 pings keep the single gRPC channel warm between chats
+        "grpc_options": {
+            "grpc.keepalive_time_ms": keepalive_ms,
+            "grpc.keepalive_timeout_ms": min(keepalive_ms, 10_000),
+            "grpc.keepalive_permit_without_calls": 1,
+        },
+    }
+
+
+def get_client() -> "AsyncQdrantClient":
+    """Build the shared Qdrant client on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from qdrant_client import AsyncQdrantClient
+
+                if QDRANT_URL and QDRANT_API_KEY:
+                    transport = "gRPC" if QDRANT_PREFER_GRPC else "REST"
+                    logger.info(f"[QDRANT] Connecting to {QDRANT_URL} over {transport}")
+                    _client = AsyncQdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, **_server_options())
+                elif QDRANT_PATH == ":memory:":
+                    logger.warning("[QDRANT] QDRANT_PATH=:memory: — knowledge bases are lost on restart")
+                    _client = AsyncQdrantClient(":memory:")
+                else:
+                    logger.info(f"[QDRANT] No server configured — embedded Qdrant at {QDRANT_PATH}")
+                    try:
+                        _client = AsyncQdrantClient(path=QDRANT_PATH)
+                    except RuntimeError as e:
+                        if "already accessed" not in str(e):
+                            raise
+                        raise QdrantStorageLocked(
+                            f"Embedded Qdrant at {QDRANT_PATH} is locked by another process (is the app "
+                            "running?). Stop it first, or set QDRANT_URL to use a Qdrant server."
+                        ) from e
+    return _client
+
+
+async def close_client():
+    """Close the shared client (releases the embedded-mode storage lock)."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+    _known_collections.clear()
 
-print("QDRANT_URL =", QDRANT_URL)
-print("QDRANT_API_KEY =", "SET" if QDRANT_API_KEY else "NOT SET")
 
-# Initialize client
-if QDRANT_URL and QDRANT_API_KEY:
-    client = AsyncQdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
-else:
-    # Local mode for testing
-    client = AsyncQdrantClient(":memory:")
+def _is_not_found(e: Exception) -> bool:
+    from qdrant_client.http.exceptions import UnexpectedResponse
+
+    if isinstance(e, UnexpectedResponse):
+        return e.status_code == 404
+    # gRPC transport raises grpc.aio.AioRpcError with a status code
+    code = getattr(e, "code", None)
+    if callable(code):
+        try:
+            return getattr(code(), "name", None) == "NOT_FOUND"
+        except Exception:
+            return False
+    # Local mode raises ValueError("Collection ... not found")
+    return isinstance(e, ValueError) and "not found" in str(e)
 
 COLLECTION_PREFIX = "bot_"
+# Payload fields retrieval returns — everything else stays on the server
+RETRIEVE_PAYLOAD_FIELDS = ["text", "page_url", "chunk_index"]
 
 def get_collection_name(bot_id: str) -> str:
     """Get collection name for a bot"""
     return f"{COLLECTION_PREFIX}{bot_id}"
 
 async def init_collection(bot_id: str, vector_size: int = 384):
-    """Initialize collection if it doesn't exist"""
+    """Initialize collection if it doesn't exist (remembered per process)"""
+    from qdrant_client.models import Distance, VectorParams
+
+    client = get_client()
     collection_name = get_collection_name(bot_id)
+    if collection_name in _known_collections:
+        return
     
     try:
         await client.get_collection(collection_name)
         print(f"Collection {collection_name} already exists")
-    except UnexpectedResponse as e:
+    except Exception as e:
         # Only treat a true 404 (collection not found) as "needs to be created"
         # Any other status (wrong URL, auth error, etc.) should propagate
-        if e.status_code != 404:
+        if not _is_not_found(e):
             raise
         await client.create_collection(
             collection_name=collection_name,
-            vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE)
+            vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE, on_disk=QDRANT_ON_DISK),
+            on_disk_payload=QDRANT_ON_DISK,
         )
         print(f"Created collection {collection_name}")
+    _known_collections.add(collection_name)
+
+async def _upsert_batch(bot_id: str, points: list, vector_size: int, wait: bool):
+    """Upsert one batch, retrying with backoff; recreates the collection if another worker dropped it."""
+    collection_name = get_collection_name(bot_id)
+    for attempt in range(1, QDRANT_UPSERT_RETRIES + 1):
+        try:
+            await get_client().upsert(collection_name=collection_name, points=points, wait=wait)
+            return
+        except Exception as e:
+            if attempt == QDRANT_UPSERT_RETRIES:
+                raise
+            if _is_not_found(e):
+                _known_collections.discard(collection_name)
+                await init_collection(bot_id, vector_size)
+            backoff = 0.5 * 2 ** (attempt - 1)
+            logger.warning(
+                f"[QDRANT] Upsert of {len(points)} points to {collection_name} failed "
+                f"(attempt {attempt}/{QDRANT_UPSERT_RETRIES}): {e}; retrying in {backoff:.1f}s"
+            )
+            await asyncio.sleep(backoff)
+
+def chunk_metadatas(bot_id: str, page_url: str, n_chunks: int, first_index: int) -> List[dict]:
+    """Payload of one page's chunks (besides "text"); chunk_index runs across the collection"""
+    return [
+        {"bot_id": bot_id, "page_url": page_url, "chunk_index": first_index + i}
+        for i in range(n_chunks)
+    ]
+
+async def next_chunk_index(bot_id: str) -> int:
+    """One past the highest chunk_index in the collection (0 if it is empty)"""
+    client = get_client()
+    highest, offset = -1, None
+    while True:
+        points, offset = await client.scroll(
+            collection_name=get_collection_name(bot_id),
+            limit=1000,
+            offset=offset,
+            with_payload=["chunk_index"],
+            with_vectors=False,
+        )
+        for p in points:
+            highest = max(highest, p.payload.get("chunk_index") or 0)
+        if offset is None:
+            return highest + 1
 
 async def add_chunks_to_qdrant(
     bot_id: str,
     texts: List[str],
-    embeddings: List[List[float]],
-    metadatas: List[dict]
-):
-    """Add chunks with embeddings to Qdrant"""
-    
-    # Detect vector size from first embedding
-    vector_size = len(embeddings[0])
+    embeddings: "np.ndarray | List[List[float]]",
+    metadatas: List[dict],
+    on_progress: Callable[[int], Awaitable[None]] | None = None,
+) -> float:
+    """
+    Add chunks with embeddings (a float32 matrix, one row per chunk) to Qdrant
+    in batches of QDRANT_UPSERT_BATCH_SIZE, QDRANT_UPSERT_CONCURRENCY at a
+    time. Batches are sent with wait=False; the last one waits, and since
+    Qdrant applies a collection's updates in order, everything is searchable
+    when this returns. on_progress(n) is awaited after each batch. Returns points/s
+    (0.0 for no chunks).
+    """
+    import numpy as np
+    from qdrant_client.models import PointStruct
+
+    if not texts:
+        # Nothing to send (and no vector size to create the collection with)
+        return 0.0
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    vector_size = embeddings.shape[1]
     await init_collection(bot_id, vector_size)
     
     collection_name = get_collection_name(bot_id)
-    
-    points = [
-        PointStruct(
-            id=str(uuid.uuid4()),
-            vector=embedding,
-            payload={
-                "text": text,
-                **metadata
-            }
-        )
-        for text, embedding, metadata in zip(texts, embeddings, metadatas)
-    ]
-    
-    await client.upsert(
-        collection_name=collection_name,
-        points=points
-    )
-    
-    print(f"✅ Added {len(points)} chunks to {collection_name}")
+    n_points = len(texts)
+    starts = range(0, n_points, QDRANT_UPSERT_BATCH_SIZE)
 
-async def retrieve_chunks(
-    bot_id: str,
-    query_vector: List[float],
-    top_k: int = 5
-) -> Tuple[List[str], List[dict]]:
-    """Search for similar chunks"""
-    
-    collection_name = get_collection_name(bot_id)
-    
-    # Use query_points instead of search
-    search_result = await client.query_points(
-        collection_name=collection_name,
-        query=query_vector,
-        limit=top_k
+    def batch_points(start: int) -> list:
+        # Python-float lists only exist for the batches in flight
+        end = start + QDRANT_UPSERT_BATCH_SIZE
+        return [
+            PointStruct(
+                id=str(uuid.uuid4()),
+                vector=embedding,
+                payload={
+                    "text": text,
+                    **metadata
+                }
+            )
+            for text, embedding, metadata in zip(texts[start:end], embeddings[start:end].tolist(), metadatas[start:end])
+        ]
+
+    t0 = time.perf_counter()
+    semaphore = asyncio.Semaphore(QDRANT_UPSERT_CONCURRENCY)
+
+    async def send(start: int, wait: bool):
+        async with semaphore:
+            batch = batch_points(start)
+            await _upsert_batch(bot_id, batch, vector_size, wait)
+        if on_progress:
+            await on_progress(len(batch))
+
+    await asyncio.gather(*(send(start, wait=False) for start in starts[:-1]))
+    # Consistency barrier: sent only after every earlier batch was acknowledged
+    await send(starts[-1], wait=True)
+    local_index.invalidate(bot_id)
+
+    seconds = time.perf_counter() - t0
+    points_per_s = n_points / seconds if seconds else 0.0
+    logger.info(
+        f"[QDRANT] Added {n_points} chunks to {collection_name} in {len(starts)} batches, "
+        f"{seconds:.2f}s ({points_per_s:.0f} points/s)"
     )
-    
+    return points_per_s
+
+def _to_chunks(points) -> Tuple[List[str], List[dict]]:
     chunks = []
     metadatas = []
     
-    for point in search_result.points:
+    for point in points:
         chunks.append(point.payload.get("text", ""))
         
-        # Extract metadata (everything except 'text')
+        # Extract metadata (everything except 'text') + the point reference
         metadata = {k: v for k, v in point.payload.items() if k != "text"}
+        metadata["point_id"] = str(point.id)
+        metadata["score"] = point.score
         metadatas.append(metadata)
     
     return chunks, metadatas
 
+async def retrieve_chunks(
+    bot_id: str,
+    query_vector: "np.ndarray | List[float]",
+    top_k: int = 5,
+    search_params: "SearchParams | None" = None,
+    score_threshold: float | None = None,
+) -> Tuple[List[str], List[dict]]:
+    """
+    Search for similar chunks (search_params: hnsw_ef / quantization overrides).
+    Each metadata dict carries the hit's "score" and "point_id"; hits scoring
+    below score_threshold are dropped, so the result may be empty.
+    Raises CollectionNotFound if the bot has no collection.
+    """
+    results = await retrieve_chunks_batch(bot_id, [query_vector], top_k, search_params, score_threshold)
+    return results[0]
+
+async def retrieve_chunks_batch(
+    bot_id: str,
+    query_vectors: "np.ndarray | List[List[float]]",
+    top_k: int = 5,
+    search_params: "SearchParams | None" = None,
+    score_threshold: float | None = None,
+) -> List[Tuple[List[str], List[dict]]]:
+    """
+    retrieve_chunks for several query vectors in one round trip
+    (query_batch_points). Small bots are answered from the in-process
+    local_index; explicit search_params always go to Qdrant.
+    """
+    
+    if len(query_vectors) == 0:
+        return []
+    collection_name = get_collection_name(bot_id)
+
+    if LOCAL_INDEX_ENABLED and search_params is None:
+        try:
+            results = await local_index.search_many(bot_id, query_vectors, top_k, score_threshold)
+        except Exception as e:
+            if _is_not_found(e):
+                raise CollectionNotFound(collection_name) from e
+            logger.exception(f"[LOCAL INDEX] Search failed for bot {bot_id}, using Qdrant")
+            results = None
+        if results is not None:
+            return results
+
+    import numpy as np
+    from qdrant_client.models import QueryRequest
+
+    requests = [
+        QueryRequest(
+            query=vector,   # plain floats only here, at the client boundary
+            limit=top_k,
+            params=search_params,
+            score_threshold=score_threshold,
+            with_payload=RETRIEVE_PAYLOAD_FIELDS,
+        )
+        for vector in np.asarray(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1).tolist()
+    ]
+    try:
+        responses = await get_client().query_batch_points(collection_name=collection_name, requests=requests)
+    except Exception as e:
+        if _is_not_found(e):
+            raise CollectionNotFound(collection_name) from e
+        raise
+
+    return [_to_chunks(response.points) for response in responses]
+
+async def delete_page_chunks(bot_id: str, page_urls: List[str]):
+    """Remove every chunk of these pages (before re-adding the pages that changed)"""
+    from qdrant_client.models import FieldCondition, Filter, FilterSelector, MatchAny
+
+    if not page_urls:
+        return
+    await get_client().delete(
+        collection_name=get_collection_name(bot_id),
+        points_selector=FilterSelector(
+            filter=Filter(must=[FieldCondition(key="page_url", match=MatchAny(any=page_urls))])
+        ),
+        wait=True,
+    )
+    local_index.invalidate(bot_id)
+
+async def fetch_chunk_texts(bot_id: str, point_ids: List[str]) -> Dict[str, str]:
+    """Look up chunk text for the given point ids (missing points are skipped)"""
+    if not point_ids:
+        return {}
+
+    collection_name = get_collection_name(bot_id)
+    points = await get_client().retrieve(
+        collection_name=collection_name,
+        ids=point_ids,
+        with_payload=["text"],
+        with_vectors=False,
+    )
+    return {str(p.id): p.payload.get("text", "") for p in points}
+
+async def list_bot_ids() -> List[str]:
+    """Bot ids that currently have a collection"""
+    response = await get_client().get_collections()
+    return [
+        c.name[len(COLLECTION_PREFIX):]
+        for c in response.collections
+        if c.name.startswith(COLLECTION_PREFIX)
+    ]
+
 async def delete_collection(bot_id: str):
     """Delete a bot's collection"""
     collection_name = get_collection_name(bot_id)
+    local_index.invalidate(bot_id)
+    _known_collections.discard(collection_name)
     
     try:
-        await client.delete_collection(collection_name)
+        await get_client().delete_collection(collection_name)
         print(f"✅ Deleted collection {collection_name}")
     except Exception as e:
         print(f"⚠️ Could not delete {collection_name}: {e}")
\ No newline at end of file
@@ -0,0 +1,177 @@
+"""
+Warm-state snapshot: what a fresh process would otherwise relearn from its
+first visitors — hot bot configs, the query-embedding cache and provider
+health — saved periodically and on shutdown, restored in lifespan before
+uvicorn opens the port.
+
+File layout (native byte order — a snapshot is only read on the host that wrote it):
+
+    header   magic b"WARM", version u16, dim u16, meta_len u32, n_vectors u32
+    meta     JSON (bot ids, provider stats, cache keys, embedding model)
+    padding  to a 64-byte boundary
+    vectors  float32[n_vectors][dim]
+
+The vector block is memory-mapped on restore, so restored cache entries
+are views into the page cache and only the rows that get hit are read.
+"""
+import os
+import asyncio
+import json
+import logging
+import mmap
+import struct
+import time
+from array import array
+
+from app.db import db_session
+from app import models
+from app.services.ai_client import provider_health
+from app.services.bot_config_cache import bot_config_cache
+from app.services.embedding_cache import query_embedding_cache
+from app.services.embeddings import HF_MODEL
+
+logger = logging.getLogger(__name__)
+
+WARM_STATE_PATH = os.getenv("WARM_STATE_PATH", "app/data/warm_state.bin")   # "" disables snapshots
+WARM_STATE_INTERVAL_S = float(os.getenv("WARM_STATE_INTERVAL_S", "300"))
+
+_MAGIC = b"WARM"
+_VERSION = 1
+_HEADER = struct.Struct("=4sHHII")
+_ALIGN = 64
+
+
+# -----------------------------------------------------
+# FILE FORMAT
+# -----------------------------------------------------
+def write_snapshot(path: str, meta: dict, vectors: list[array | memoryview]):
+    """Write atomically (tmp file + rename) so a crash never leaves half a snapshot."""
+    dim = len(vectors[0]) if vectors else 0
+    if any(len(v) != dim for v in vectors):
+        raise ValueError("all vectors in a snapshot must have the same dimension")
+    n_vectors = len(vectors)
+    meta_bytes = json.dumps(meta, separators=(",", ":")).encode()
+    head = _HEADER.pack(_MAGIC, _VERSION, dim, len(meta_bytes), n_vectors) + meta_bytes
+    padding = b"\0" * (-len(head) % _ALIGN)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(head + padding)
+        for vector in vectors:
+            f.write(vector)
+    os.replace(tmp, path)
+
+
+def read_snapshot(path: str) -> tuple[dict, list[memoryview]]:
+    """(meta, vectors) with each vector a read-only float32 view over the mapped file."""
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, dim, meta_len, n_vectors = _HEADER.unpack_from(mm, 0)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError(f"{path} is not a v{_VERSION} warm-state snapshot")
+    meta_end = _HEADER.size + meta_len
+    meta = json.loads(mm[_HEADER.size:meta_end])
+    offset = meta_end + (-meta_end % _ALIGN)
+    # The views keep the mapping alive after this function returns
+    block = memoryview(mm)[offset:offset + n_vectors * dim * 4].cast("f")
+    return meta, [block[i * dim:(i + 1) * dim] for i in range(n_vectors)]
+
+
+# -----------------------------------------------------
+# SAVE / RESTORE
+# -----------------------------------------------------
+def _load_ready_bots(bot_ids: list[str]) -> dict[str, tuple[int, str | None]]:
+    """Re-check the saved hot bots in one query — some may have been deleted or rebuilt since."""
+    if not bot_ids:
+        return {}
+    with db_session() as db:
+        rows = (
+            db.query(models.Bot.bot_id, models.Bot.id, models.KnowledgeBase.collection_key)
+            .outerjoin(models.KnowledgeBase, models.KnowledgeBase.id == models.Bot.kb_id)
+            .filter(models.Bot.bot_id.in_(bot_ids), models.Bot.status == "ready")
+            .all()
+        )
+    return {bot_id: (bot_pk, collection_key) for bot_id, bot_pk, collection_key in rows}
+
+
+class WarmState:
+    def __init__(self, path: str = WARM_STATE_PATH, interval: float = WARM_STATE_INTERVAL_S):
+        self.path = path
+        self.interval = interval
+        self.restored: dict[str, int] = {}
+        self._task: asyncio.Task | None = None
+
+    def save(self) -> dict:
+        keys, vectors = query_embedding_cache.snapshot()
+        meta = {
+            "saved_at": time.time(),
+            "embedding_model": HF_MODEL,
+            "bots": bot_config_cache.hot_bot_ids(),
+            "providers": provider_health.snapshot(),
+            "query_keys": keys,
+        }
+        write_snapshot(self.path, meta, vectors)
+        counts = {"bots": len(meta["bots"]), "query_embeddings": len(keys)}
+        logger.info(f"[WARM] Saved snapshot to {self.path}: {counts}")
+        return counts
+
+    def restore(self) -> dict[str, int]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            meta, vectors = read_snapshot(self.path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"[WARM] Ignoring unreadable snapshot {self.path}: {e}")
+            return {}
+
+        try:
+            ready = _load_ready_bots(meta.get("bots", []))
+        except Exception as e:
+            # Only a warm-up: a database that is down or behind on migrations mustn't stop startup
+            logger.warning(f"[WARM] Could not load bots from the database, starting their cache cold: {e}")
+            ready = {}
+        # Keep the saved order (least recently used first) so the LRU order survives
+        for bot_id in meta.get("bots", []):
+            if bot_id in ready:
+                bot_config_cache.put(bot_id, *ready[bot_id])
+
+        embeddings = 0
+        if meta.get("embedding_model") == HF_MODEL:
+            embeddings = query_embedding_cache.restore(meta.get("query_keys", []), vectors)
+
+        providers = provider_health.restore(meta.get("providers", {}))
+        self.restored = {"bots": len(ready), "query_embeddings": embeddings, "providers": providers}
+        age_s = time.time() - meta.get("saved_at", time.time())
+        logger.info(f"[WARM] Restored snapshot saved {age_s:.0f}s ago: {self.restored}")
+        return self.restored
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self.path and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="warm-state-snapshotter")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.path:
+            try:
+                await asyncio.to_thread(self.save)
+            except Exception:
+                logger.exception("[WARM] Snapshot on shutdown failed")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.save)
+            except Exception:
+                logger.exception("[WARM] Periodic snapshot failed")
+
+
+warm_state = WarmState()
@@ -0,0 +1,166 @@
+"""
+Cold-start timings: process spawn → app imported → lifespan done → first chat answered.
+
+    python -m app.startup                # slowest imports + lifespan steps
+    python -m app.startup --top 40
+
+At runtime the same numbers are logged once the app is ready and exported
+on /metrics (app_import_seconds, app_ready_seconds, app_first_chat_seconds),
+all measured from process start.
+"""
+import argparse
+import logging
+import math
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def _clock() -> float:
+    # CLOCK_BOOTTIME shares its origin with /proc starttime; elsewhere fall back to monotonic
+    return time.clock_gettime(time.CLOCK_BOOTTIME) if hasattr(time, "CLOCK_BOOTTIME") else time.monotonic()
+
+
+def _process_start_time() -> float:
+    """_clock() reading when the process was spawned (Linux /proc), else now."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime, clock ticks since boot); comm may contain spaces
+            starttime = int(f.read().rsplit(")", 1)[1].split()[19])
+        return starttime / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return _clock()
+
+
+class StartupProfile:
+    """Milestones of one process's cold start, in seconds since spawn."""
+
+    def __init__(self):
+        self.process_started = _process_start_time()
+        self.steps: dict[str, float] = {}
+        self.imported: float | None = None
+        self.ready: float | None = None
+        self.first_chat: float | None = None
+        self.first_chat_outcome: str | None = None
+        self._lock = threading.Lock()
+
+    def _since_start(self) -> float:
+        return round(_clock() - self.process_started, 3)
+
+    @contextmanager
+    def step(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[name] = round(time.perf_counter() - t0, 4)
+
+    def mark_imported(self):
+        self.imported = self._since_start()
+
+    def mark_ready(self):
+        self.ready = self._since_start()
+        steps = ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in self.steps.items())
+        logger.info(f"[STARTUP] imported at {self.imported}s, ready at {self.ready}s ({steps})")
+
+    def record_first_chat(self, outcome: str):
+        if self.first_chat is not None:
+            return
+        with self._lock:
+            if self.first_chat is not None:
+                return
+            self.first_chat = self._since_start()
+            self.first_chat_outcome = outcome
+        logger.info(f"[STARTUP] first chat answered at {self.first_chat}s ({outcome})")
+
+    def gauge(self, field: str) -> float:
+        value = getattr(self, field)
+        return math.nan if value is None else value
+
+    def summary(self) -> dict:
+        return {
+            "imported_s": self.imported,
+            "ready_s": self.ready,
+            "first_chat_s": self.first_chat,
+            "first_chat_outcome": self.first_chat_outcome,
+            "steps_s": dict(self.steps),
+        }
+
+
+startup_profile = StartupProfile()
+
+
+# -----------------------------------------------------
+# CLI: per-module import time + lifespan steps
+# -----------------------------------------------------
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)")
+
+
+def import_times(target: str = "app.main") -> list[dict]:
+    """
+    Import `target` in a fresh interpreter under -X importtime and return
+    per-module self / cumulative time (ms), slowest cumulative first.
+    Only top-level entries of each package are kept so nested modules
+    aren't counted twice.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, check=True,
+    )
+    totals = defaultdict(lambda: [0, 0])
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if not m:
+            continue
+        self_us, cumulative_us, module = int(m[1]), int(m[2]), m[3]
+        # app.* modules are reported individually, third-party by top-level package
+        key = module if module.startswith("app.") or module == "app" else module.split(".")[0]
+        totals[key][0] += self_us
+        if module == key:
+            totals[key][1] = max(totals[key][1], cumulative_us)
+    rows = [
+        {"module": k, "self_ms": round(s / 1000, 1), "cumulative_ms": round(c / 1000, 1)}
+        for k, (s, c) in totals.items()
+    ]
+    return sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)
+
+
+async def _run_lifespan():
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.startup")
+    parser.add_argument("--top", type=int, default=25, help="how many modules to list")
+    args = parser.parse_args()
+
+    print("Slowest imports under `import app.main` (fresh interpreter):")
+    print(f"  {'module':<40} {'cumulative':>12} {'self':>10}")
+    for row in import_times()[:args.top]:
+        print(f"  {row['module']:<40} {row['cumulative_ms']:>9.1f} ms {row['self_ms']:>7.1f} ms")
+
+    import asyncio
+    # Run as __main__, this module isn't the app.startup the app records into
+    from app.startup import startup_profile as profile
+
+    t0 = time.perf_counter()
+    import app.main  # noqa: F401
+    import_s = time.perf_counter() - t0
+    asyncio.run(_run_lifespan())
+    print(f"\nIn this process: import app.main {import_s * 1000:.0f} ms")
+    for name, seconds in profile.steps.items():
+        print(f"  lifespan {name:<30} {seconds * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Offline load test for chat_with_bot — no network, no provider keys.
+
+    python -m benchmarks.chat_load
+    python -m benchmarks.chat_load --concurrency 64 --duration 30 \
+        --openrouter-latency 1200:0.6 --openrouter-errors 429=0.1
+    python -m benchmarks.chat_load --database-url postgresql://localhost/chatbot_bench --json out.json
+
+What it does:
+  1. starts benchmarks.fake_providers (HF / OpenRouter / Groq stand-ins) in a subprocess
+  2. boots the real FastAPI app in this process (uvicorn, SQLite or the
+     given database, Qdrant :memory:) and seeds a user, bots and chunks
+  3. runs benchmarks.load_client in a subprocess for the given duration
+  4. reports RPS, p50/p95/p99, status codes, server-side stage latencies
+     (from the app's own latency sketches) and event-loop lag
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.fake_providers import add_profile_args, fake_vector
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# -----------------------------------------------------
+# EVENT-LOOP LAG
+# -----------------------------------------------------
+class LoopLagMonitor:
+    """
+    Sleeps `interval` seconds in a loop and records how late it wakes up.
+    Anything blocking the app's event loop (sync DB calls, CPU work in a
+    handler) shows up here directly.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples_ms: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self.samples_ms.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples_ms.append(max((loop.time() - t0 - self.interval) * 1000, 0.0))
+
+    def summary(self) -> dict:
+        if not self.samples_ms:
+            return {}
+        arr = np.asarray(self.samples_ms)
+        p50, p99 = np.percentile(arr, [50, 99])
+        return {
+            "samples": int(arr.size),
+            "p50_ms": round(float(p50), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(arr.max()), 2),
+            "over_50ms": int((arr > 50).sum()),
+        }
+
+
+# -----------------------------------------------------
+# SETUP
+# -----------------------------------------------------
+def _configure_env(args, providers_url: str, db_path: str):
+    """Must run before anything under app/ is imported (modules read env at import)."""
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{db_path}"
+    os.environ["QDRANT_URL"] = ""
+    os.environ["QDRANT_PATH"] = ":memory:"      # → AsyncQdrantClient(":memory:")
+    os.environ["CHAT_SCORE_THRESHOLD"] = ""     # fake vectors are unrelated; always call the LLM
+    os.environ["HF_API_TOKEN"] = "bench"
+    os.environ["HF_API_BASE"] = f"{providers_url}/hf"
+    os.environ["OPENROUTER_API_KEY"] = "bench"
+    os.environ["OPENROUTER_API_BASE"] = f"{providers_url}/openrouter"
+    os.environ["GROQ_API_KEY"] = "bench"
+    os.environ["GROQ_API_BASE"] = f"{providers_url}/groq"
+
+
+async def _wait_http(url: str, timeout: float = 15):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+async def _seed(num_bots: int, chunks_per_bot: int) -> list[str]:
+    from qdrant_client.models import Distance, VectorParams
+
+    from app import models
+    from app.db import db_session
+    from app.services import vector_store
+
+    bot_ids = [f"bench-{i}" for i in range(num_bots)]
+    with db_session() as db:
+        user = db.query(models.User).filter(models.User.email == "bench@example.com").first()
+        if not user:
+            user = models.User(email="bench@example.com", name="bench", hashed_password="!")
+            db.add(user)
+            db.flush()
+        for bot_id in bot_ids:
+            if not db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first():
+                db.add(models.Bot(bot_id=bot_id, website_url=f"https://{bot_id}.example", status="ready", user_id=user.id))
+        db.commit()
+
+    for bot_id in bot_ids:
+        name = vector_store.get_collection_name(bot_id)
+        client = vector_store.get_client()
+        if not await client.collection_exists(name):
+            await client.create_collection(
+                name, vectors_config=VectorParams(size=384, distance=Distance.COSINE)
+            )
+        texts = [
+            f"{bot_id} page {i // 10} section {i}: we offer services, pricing, support and refunds. " * 4
+            for i in range(chunks_per_bot)
+        ]
+        await vector_store.add_chunks_to_qdrant(
+            bot_id,
+            texts,
+            [fake_vector(t) for t in texts],
+            [{"page_url": f"https://{bot_id}.example/p{i // 10}", "chunk_index": i} for i in range(chunks_per_bot)],
+        )
+    return bot_ids
+
+
+def _stage_latency(since) -> list[dict]:
+    from app.db import db_session
+    from app.services.latency_sketch import query_latency
+
+    with db_session() as db:
+        return query_latency(db, since=since, group_by=("stage", "provider"))
+
+
+# -----------------------------------------------------
+# RUN
+# -----------------------------------------------------
+async def run(args) -> dict:
+    providers_port = _free_port()
+    app_port = _free_port()
+    providers_url = f"http://127.0.0.1:{providers_port}"
+    app_url = f"http://127.0.0.1:{app_port}"
+    workdir = tempfile.mkdtemp(prefix="chat-bench-")
+
+    provider_cmd = [sys.executable, "-m", "benchmarks.fake_providers", "--port", str(providers_port)]
+    for name in ("hf", "openrouter", "groq"):
+        provider_cmd += [f"--{name}-latency", getattr(args, f"{name}_latency")]
+        provider_cmd += [f"--{name}-errors", getattr(args, f"{name}_errors")]
+    providers = subprocess.Popen(provider_cmd, cwd=REPO_ROOT)
+
+    try:
+        _configure_env(args, providers_url, os.path.join(workdir, "bench.db"))
+        os.chdir(REPO_ROOT)  # app mounts app/static relative to cwd
+
+        import uvicorn
+        from datetime import datetime
+        from app.main import app
+        from app.migrate import create_schema
+
+        create_schema()
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+        server = uvicorn.Server(uvicorn.Config(
+            app,
+            host="127.0.0.1",
+            port=app_port,
+            log_level="warning",
+            access_log=False,
+            proxy_headers=True,          # visitors are told apart by X-Forwarded-For
+            forwarded_allow_ips="*",
+        ))
+        server_task = asyncio.create_task(server.serve())
+        await _wait_http(f"{providers_url}/health")
+        await _wait_http(f"{app_url}/")
+
+        bot_ids = await _seed(args.bots, args.chunks)
+        started_at = datetime.utcnow()
+
+        lag = LoopLagMonitor()
+        lag.start()
+        client = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "benchmarks.load_client",
+            "--url", app_url,
+            "--bots", ",".join(bot_ids),
+            "--concurrency", str(args.concurrency),
+            "--duration", str(args.duration),
+            "--warmup", str(args.warmup),
+            "--think-ms", str(args.think_ms),
+            stdout=asyncio.subprocess.PIPE,
+            cwd=REPO_ROOT,
+        )
+        out, _ = await client.communicate()
+        await lag.stop()
+        if client.returncode != 0:
+            raise RuntimeError(f"load client exited with {client.returncode}")
+
+        import httpx
+        async with httpx.AsyncClient() as http:
+            provider_stats = (await http.get(f"{providers_url}/stats")).json()
+
+        result = {
+            "config": {
+                "database": os.environ["DATABASE_URL"].split("@")[-1],
+                "bots": args.bots,
+                "chunks_per_bot": args.chunks,
+            },
+            **json.loads(out),
+            "event_loop_lag": lag.summary(),
+            "server_stages": _stage_latency(started_at),
+            "providers": provider_stats,
+        }
+
+        server.should_exit = True
+        await server_task
+        return result
+    finally:
+        providers.terminate()
+        providers.wait()
+
+
+def print_report(result: dict):
+    print()
+    print(f"Concurrency {result['concurrency']}, {result['duration_s']}s measured, db={result['config']['database']}")
+    print(f"  requests   {result['requests']}  ({result['rps']} rps, {result['ok_rps']} ok rps)")
+    print(f"  statuses   {result['status_counts']}")
+    ok = result["latency_ok"]
+    if ok.get("count"):
+        print(f"  latency    p50 {ok['p50_ms']} ms  p95 {ok['p95_ms']} ms  p99 {ok['p99_ms']} ms  max {ok['max_ms']} ms")
+    lag = result["event_loop_lag"]
+    if lag:
+        print(f"  loop lag   p50 {lag['p50_ms']} ms  p99 {lag['p99_ms']} ms  max {lag['max_ms']} ms  (>50ms: {lag['over_50ms']})")
+    print("  server stages:")
+    for row in result["server_stages"]:
+        label = row["stage"] + (f" [{row['provider']}]" if row["provider"] else "")
+        print(f"    {label:<24} n={row['count']:<6} p50 {row['p50_ms']} ms  p99 {row['p99_ms']} ms")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.chat_load")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds (after warmup)")
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--think-ms", type=float, default=0, help="pause between a visitor's questions")
+    parser.add_argument("--bots", type=int, default=5)
+    parser.add_argument("--chunks", type=int, default=200, help="Qdrant points per bot")
+    parser.add_argument("--database-url", default=None, help="default: fresh SQLite file in a temp dir")
+    parser.add_argument("--json", default=None, help="also write the full result here")
+    add_profile_args(parser)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
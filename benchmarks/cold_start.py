@@ -0,0 +1,232 @@
+"""
+Cold-start benchmark: spawn uvicorn, time until it answers, then time the first chat.
+
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --runs 10 --json cold.json
+    python -m benchmarks.cold_start --compare cold.json          # diff against an earlier run
+
+Each run starts `uvicorn app.main:app` in a fresh process (like a Render
+free-plan wake-up), against a schema created once with
+`python -m app.migrate create-schema` and benchmarks.fake_providers for the
+embedding / LLM APIs. Measured from spawn:
+
+  ready_s        GET / answers
+  first_chat_s   the first POST /api/chat/{bot_id} returns
+
+plus the app's own app_import_seconds / app_ready_seconds /
+app_first_chat_seconds from /metrics. Without --qdrant-url every process
+gets an empty in-memory Qdrant, so the first chat ends at "knowledge base
+not found" (404) after embedding and the Qdrant lookup — still the whole
+cold path except the LLM call.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOT_ID = "cold-start-bench"
+STARTUP_GAUGES = ("app_import_seconds", "app_ready_seconds", "app_first_chat_seconds")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _wait_http(url: str, deadline: float):
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"{url} did not come up")
+
+
+# -----------------------------------------------------
+# SETUP (runs once, in a child process so this one stays cold)
+# -----------------------------------------------------
+SEED_SCRIPT = """
+import asyncio, sys
+from app import models
+from app.db import db_session
+from app.migrate import create_schema
+
+create_schema()
+with db_session() as db:
+    user = models.User(email="bench@example.com", name="bench", hashed_password="!")
+    db.add(user)
+    db.flush()
+    db.add(models.Bot(bot_id=sys.argv[1], website_url="https://bench.example", status="ready", user_id=user.id))
+    db.commit()
+
+if sys.argv[2] == "qdrant":
+    from qdrant_client.models import Distance, VectorParams
+    from app.services import vector_store
+    from benchmarks.fake_providers import fake_vector
+
+    async def seed():
+        client = vector_store.get_client()
+        name = vector_store.get_collection_name(sys.argv[1])
+        if not await client.collection_exists(name):
+            await client.create_collection(name, vectors_config=VectorParams(size=384, distance=Distance.COSINE))
+        texts = [f"We offer services, pricing and support. Section {i}." for i in range(50)]
+        await vector_store.add_chunks_to_qdrant(
+            sys.argv[1], texts, [fake_vector(t) for t in texts], [{"page_url": "https://bench.example"}] * len(texts)
+        )
+    asyncio.run(seed())
+"""
+
+
+def _scrape_startup_gauges(app_url: str) -> dict:
+    text = httpx.get(f"{app_url}/metrics").text
+    out = {}
+    for line in text.splitlines():
+        name, _, value = line.partition(" ")
+        if name in STARTUP_GAUGES:
+            out[name] = None if value.lower() == "nan" else float(value)
+    return out
+
+
+# -----------------------------------------------------
+# ONE COLD START
+# -----------------------------------------------------
+def run_once(env: dict, timeout: float) -> dict:
+    port = _free_port()
+    app_url = f"http://127.0.0.1:{port}"
+    t0 = time.monotonic()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_http(f"{app_url}/", t0 + timeout)
+        ready_s = time.monotonic() - t0
+        response = httpx.post(
+            f"{app_url}/api/chat/{BOT_ID}",
+            json={"message": "What services do you offer?"},
+            timeout=timeout,
+        )
+        first_chat_s = time.monotonic() - t0
+        return {
+            "ready_s": round(ready_s, 3),
+            "first_chat_s": round(first_chat_s, 3),
+            "first_chat_status": response.status_code,
+            **_scrape_startup_gauges(app_url),
+        }
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="cold-start-")
+    providers_port = _free_port()
+    providers_url = f"http://127.0.0.1:{providers_port}"
+    env = {
+        **os.environ,
+        "DATABASE_URL": args.database_url or f"sqlite:///{workdir}/bench.db",
+        "QDRANT_URL": args.qdrant_url or "",
+        "QDRANT_API_KEY": args.qdrant_api_key or "",
+        "QDRANT_PATH": ":memory:",
+        "CHAT_SCORE_THRESHOLD": "",             # fake vectors are unrelated; always call the LLM
+        "HF_API_TOKEN": "bench",
+        "HF_API_BASE": f"{providers_url}/hf",
+        "OPENROUTER_API_KEY": "bench",
+        "OPENROUTER_API_BASE": f"{providers_url}/openrouter",
+        "GROQ_API_KEY": "bench",
+        "GROQ_API_BASE": f"{providers_url}/groq",
+    }
+    providers = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_providers", "--port", str(providers_port)],
+        cwd=REPO_ROOT,
+    )
+    try:
+        subprocess.run(
+            [sys.executable, "-c", SEED_SCRIPT, BOT_ID, "qdrant" if args.qdrant_url else "db"],
+            cwd=REPO_ROOT, env=env, check=True,
+        )
+        _wait_http(f"{providers_url}/health", time.monotonic() + 15)
+        runs = []
+        for i in range(args.runs):
+            result = run_once(env, args.timeout)
+            runs.append(result)
+            print(
+                f"run {i + 1}: ready {result['ready_s']}s  first chat {result['first_chat_s']}s "
+                f"({result['first_chat_status']})",
+                file=sys.stderr,
+            )
+    finally:
+        providers.terminate()
+        providers.wait()
+
+    summary = {}
+    for key in ("ready_s", "first_chat_s") + STARTUP_GAUGES:
+        values = [r[key] for r in runs if r.get(key) is not None]
+        if values:
+            summary[key] = {
+                "median": round(float(np.median(values)), 3),
+                "max": round(float(np.max(values)), 3),
+            }
+    return {
+        "benchmark": "cold_start",
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "qdrant": "server" if args.qdrant_url else "memory",
+        "summary": summary,
+        "runs": runs,
+    }
+
+
+def compare(current: dict, baseline: dict):
+    print(f"\nvs {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    for key, stats in current["summary"].items():
+        old = baseline.get("summary", {}).get(key)
+        if old and old["median"]:
+            delta = 100 * (stats["median"] - old["median"]) / old["median"]
+            print(f"  {key:<24} {old['median']}s → {stats['median']}s ({delta:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.cold_start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--database-url", default=None, help="default: fresh SQLite file in a temp dir")
+    parser.add_argument("--qdrant-url", default=None, help="seed and query a real Qdrant server")
+    parser.add_argument("--qdrant-api-key", default=None)
+    parser.add_argument("--json", default=None, help="write results here")
+    parser.add_argument("--compare", default=None, help="earlier --json output to diff against")
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result["summary"], indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
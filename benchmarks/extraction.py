@@ -0,0 +1,175 @@
+"""
+HTML main-content extraction (app/services/html_extract): chunks and
+embedding work per site, whole-page text vs extracted content.
+
+    python -m benchmarks.extraction                              # synthetic site, 200 pages
+    python -m benchmarks.extraction --pages 500 --boilerplate 0.5
+    python -m benchmarks.extraction --urls urls.txt --json extraction.json
+
+Each page's HTML goes through both paths, then the same cleaner + chunker
+run_pipeline uses:
+
+  flat       get_text() of the whole page (script/style removed) — the
+             behaviour before html_extract
+  extracted  extract_main_content()
+
+Per site: pages, chunks, unique chunks (what embed_chunks sends to the
+embedding API on a cold store), words in those unique chunks (what the
+embedding API bills for, roughly tokens / 1.3) and extraction ms per page.
+On the synthetic site, `body_recall` is the share of each page's own
+sentences that survive extraction — boilerplate removed shouldn't cost
+content.
+
+--urls is a file with one page URL per line (or a comma-separated list);
+pages are grouped into sites by host.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import urlparse
+
+import httpx
+
+from benchmarks.cold_start import _git_commit
+from benchmarks.synthetic_site import SyntheticSite
+
+MODES = ("flat", "extracted")
+
+
+def _pages_from_urls(spec: str) -> dict[str, list[tuple[str, str]]]:
+    """{host: [(url, html)]}"""
+    if os.path.exists(spec):
+        with open(spec) as f:
+            urls = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    else:
+        urls = [u.strip() for u in spec.split(",") if u.strip()]
+    sites = defaultdict(list)
+    with httpx.Client(timeout=20, follow_redirects=True, headers={"User-Agent": "Mozilla/5.0 (extraction benchmark)"}) as client:
+        for url in urls:
+            try:
+                response = client.get(url)
+            except httpx.HTTPError as e:
+                print(f"skip {url}: {e}", file=sys.stderr)
+                continue
+            if response.status_code != 200 or "html" not in response.headers.get("content-type", ""):
+                print(f"skip {url}: {response.status_code} {response.headers.get('content-type')}", file=sys.stderr)
+                continue
+            sites[urlparse(url).netloc].append((url, response.text))
+    return sites
+
+
+# -----------------------------------------------------
+# MEASURE
+# -----------------------------------------------------
+def measure(pages: list[tuple[str, str]], mode: str) -> tuple[dict, dict[str, str]]:
+    from app.services.embedding_cache import normalize_query
+    from app.services.html_extract import extract_main_content, flat_text, parse_html
+    from app.services.text_processing import process_text_to_chunks
+
+    texts, chunks, unique = {}, 0, {}
+    extract_s = 0.0
+    for url, html in pages:
+        t0 = time.perf_counter()
+        soup = parse_html(html)
+        texts[url] = extract_main_content(soup) if mode == "extracted" else flat_text(soup)
+        extract_s += time.perf_counter() - t0
+        for chunk in process_text_to_chunks(texts[url]):
+            chunks += 1
+            unique.setdefault(normalize_query(chunk), chunk)
+    return {
+        "pages": len(pages),
+        "text_chars": sum(len(t) for t in texts.values()),
+        "chunks": chunks,
+        "unique_chunks": len(unique),
+        "embed_words": sum(len(c.split()) for c in unique.values()),
+        "extract_ms_per_page": round(extract_s * 1000 / max(len(pages), 1), 2),
+    }, texts
+
+
+def _reduction(before, after) -> float | None:
+    return round(100 * (1 - after / before), 1) if before else None
+
+
+def body_recall(site: SyntheticSite, indices: list[int], texts: list[str]) -> float:
+    from app.services.text_processing import split_into_sentences
+
+    found = total = 0
+    for index, text in zip(indices, texts):
+        flat = " ".join(text.split())
+        for paragraph in site.body(index):
+            for sentence in split_into_sentences(paragraph):
+                total += 1
+                found += sentence in flat
+    return round(found / total, 4) if total else 1.0
+
+
+# -----------------------------------------------------
+# ORCHESTRATION
+# -----------------------------------------------------
+def run(args) -> dict:
+    from app.services.html_extract import PARSER
+
+    synthetic = None
+    if args.urls:
+        sites = _pages_from_urls(args.urls)
+    else:
+        synthetic = SyntheticSite(args.pages, args.page_kb, args.boilerplate, args.duplicates)
+        indices = list(range(args.pages))
+        sites = {"synthetic": [(f"/p/{i}.html", synthetic.render(i)) for i in indices]}
+
+    results = {}
+    for host, pages in sites.items():
+        site = {}
+        for mode in MODES:
+            site[mode], texts = measure(pages, mode)
+        if synthetic is not None:
+            site["extracted"]["body_recall"] = body_recall(synthetic, indices, [texts[url] for url, _ in pages])
+        site["reduction_pct"] = {
+            metric: _reduction(site["flat"][metric], site["extracted"][metric])
+            for metric in ("text_chars", "chunks", "unique_chunks", "embed_words")
+        }
+        results[host] = site
+        print(
+            f"{host:<32} {len(pages):>4} pages  chunks {site['flat']['chunks']} → {site['extracted']['chunks']} "
+            f"({site['reduction_pct']['chunks']}% fewer)  embed words {site['flat']['embed_words']} → "
+            f"{site['extracted']['embed_words']} ({site['reduction_pct']['embed_words']}% fewer)  "
+            f"extract {site['extracted']['extract_ms_per_page']} ms/page",
+            file=sys.stderr,
+        )
+
+    return {
+        "benchmark": "extraction",
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "parser": PARSER,
+        "params": (
+            {"urls": args.urls} if args.urls else
+            {"pages": args.pages, "page_kb": args.page_kb, "boilerplate": args.boilerplate, "duplicates": args.duplicates}
+        ),
+        "sites": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.extraction")
+    parser.add_argument("--urls", default=None, help="file with one URL per line, or comma-separated URLs")
+    parser.add_argument("--pages", type=int, default=200, help="synthetic site pages")
+    parser.add_argument("--page-kb", type=float, default=8)
+    parser.add_argument("--boilerplate", type=float, default=0.3)
+    parser.add_argument("--duplicates", type=float, default=0.1)
+    parser.add_argument("--json", default=None, help="write results here")
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps({host: site["reduction_pct"] for host, site in result["sites"].items()}, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
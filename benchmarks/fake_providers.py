@@ -0,0 +1,150 @@
+"""
+Local stand-ins for the Hugging Face embedding API and the OpenRouter / Groq
+chat-completions APIs, with configurable latency and error rates.
+
+    python -m benchmarks.fake_providers --port 9100 \
+        --openrouter-latency 800:0.5 --openrouter-errors 429=0.05
+
+Latency is "median_ms[:sigma]" (log-normal; sigma 0 = constant).
+Errors are "status=rate,..." (e.g. "429=0.05,500=0.01").
+
+Point the app at it with:
+    HF_API_BASE=http://127.0.0.1:9100/hf
+    OPENROUTER_API_BASE=http://127.0.0.1:9100/openrouter
+    GROQ_API_BASE=http://127.0.0.1:9100/groq
+"""
+import argparse
+import asyncio
+import math
+import random
+import zlib
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+EMBED_DIM = 384
+PROVIDERS = ("hf", "openrouter", "groq")
+
+
+class Profile:
+    """Latency / error distribution for one provider."""
+
+    def __init__(self, latency: str = "0", errors: str = ""):
+        median, _, sigma = latency.partition(":")
+        self.median_ms = float(median)
+        self.sigma = float(sigma or 0)
+        self.errors = [
+            (int(code), float(rate))
+            for code, rate in (e.split("=") for e in errors.split(",") if e)
+        ]
+
+    def delay_s(self) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        return self.median_ms * math.exp(random.gauss(0, self.sigma)) / 1000
+
+    def error(self) -> int | None:
+        r = random.random()
+        for code, rate in self.errors:
+            if r < rate:
+                return code
+            r -= rate
+        return None
+
+    def describe(self) -> dict:
+        return {"median_ms": self.median_ms, "sigma": self.sigma, "errors": dict(self.errors)}
+
+
+def fake_vector(text: str) -> list[float]:
+    """Deterministic unit vector per text, so seeded chunks and queries line up."""
+    rng = np.random.default_rng(zlib.crc32(text.encode()))
+    v = rng.standard_normal(EMBED_DIM)
+    return (v / np.linalg.norm(v)).tolist()
+
+
+def create_app(profiles: dict[str, Profile]) -> FastAPI:
+    app = FastAPI()
+    stats = {name: {"requests": 0, "errors": 0} for name in PROVIDERS}
+
+    async def simulate(name: str):
+        profile = profiles[name]
+        stats[name]["requests"] += 1
+        await asyncio.sleep(profile.delay_s())
+        code = profile.error()
+        if code:
+            stats[name]["errors"] += 1
+            return JSONResponse({"error": {"message": f"injected {code}"}}, status_code=code)
+        return None
+
+    def completion(model: str, payload: dict) -> dict:
+        question = payload["messages"][-1]["content"]
+        return {
+            "id": "fake-completion",
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"Stand-in answer ({len(question)} chars of context)."},
+                "finish_reason": "stop",
+            }],
+        }
+
+    @app.post("/hf/models/{model:path}")
+    async def hf_feature_extraction(model: str, request: Request):
+        error = await simulate("hf")
+        if error:
+            return error
+        inputs = (await request.json())["inputs"]
+        if isinstance(inputs, str):
+            return fake_vector(inputs)
+        return [fake_vector(t) for t in inputs]
+
+    @app.post("/openrouter/chat/completions")
+    async def openrouter_chat(request: Request):
+        return await simulate("openrouter") or completion("openrouter-fake", await request.json())
+
+    @app.post("/groq/chat/completions")
+    async def groq_chat(request: Request):
+        return await simulate("groq") or completion("groq-fake", await request.json())
+
+    @app.get("/stats")
+    def get_stats():
+        return {
+            name: {**stats[name], **profiles[name].describe()}
+            for name in PROVIDERS
+        }
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    return app
+
+
+def add_profile_args(parser: argparse.ArgumentParser):
+    defaults = {"hf": "40:0.3", "openrouter": "900:0.5", "groq": "300:0.4"}
+    for name in PROVIDERS:
+        parser.add_argument(f"--{name}-latency", default=defaults[name], help="median_ms[:sigma]")
+        parser.add_argument(f"--{name}-errors", default="", help="status=rate,...")
+
+
+def profiles_from_args(args) -> dict[str, Profile]:
+    return {
+        name: Profile(getattr(args, f"{name}_latency"), getattr(args, f"{name}_errors"))
+        for name in PROVIDERS
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.fake_providers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_profile_args(parser)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(profiles_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Ingestion throughput benchmark: run_pipeline against a synthetic site.
+
+    python -m benchmarks.ingest                                  # 10, 100, 1000 pages
+    python -m benchmarks.ingest --pages 10,100,1000,10000 --json ingest.json
+    python -m benchmarks.ingest --compare ingest.json            # diff against an earlier run
+
+Runs the real pipeline (HTTP crawl → clean/chunk → embed → Qdrant upsert)
+with CRAWLER=http against benchmarks.synthetic_site, embeddings from
+benchmarks.fake_providers, SQLite and Qdrant :memory:. Each page count runs
+in a fresh process so peak RSS is per run. Per-stage times come from the
+BuildJob row the pipeline writes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Throughput metrics compared by --compare (higher is better)
+COMPARE_METRICS = ("pages_per_s", "crawl_pages_per_s", "chunk_mb_per_s", "embed_chunks_per_s", "upsert_points_per_s")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _current_rss_mb() -> float | None:
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError):
+        return None
+
+
+def _rate(n, seconds, scale=1.0):
+    return round(n / scale / seconds, 1) if n and seconds else None
+
+
+# -----------------------------------------------------
+# ONE RUN (child process)
+# -----------------------------------------------------
+async def run_one(pages: int, site_url: str, providers_url: str) -> dict:
+    workdir = tempfile.mkdtemp(prefix="ingest-bench-")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{workdir}/bench.db",
+        "QDRANT_URL": "",
+        "QDRANT_PATH": ":memory:",
+        "HF_API_TOKEN": "bench",
+        "HF_API_BASE": f"{providers_url}/hf",
+        "CRAWLER": "http",
+        "CRAWL_MAX_PAGES": str(pages),
+        "EMBED_STORE_DIR": os.path.join(workdir, "embedding_store"),
+    })
+    os.chdir(REPO_ROOT)
+
+    import logging
+    from qdrant_client.models import Distance, VectorParams
+
+    from app import models
+    from app.db import Base, engine, db_session
+    from app.routers.bots import run_pipeline
+    from app.services import vector_store
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    Base.metadata.create_all(bind=engine)
+    with db_session() as db:
+        user = models.User(email="bench@example.com", name="bench", hashed_password="!")
+        db.add(user)
+        db.flush()
+        bot = models.Bot(bot_id="ingest-bench", website_url=site_url, status="processing", user_id=user.id)
+        db.add(bot)
+        db.commit()
+        bot_pk = bot.id
+
+    # Local :memory: Qdrant reports a missing collection differently from the server
+    await vector_store.get_client().create_collection(
+        vector_store.get_collection_name("ingest-bench"),
+        vectors_config=VectorParams(size=384, distance=Distance.COSINE),
+    )
+
+    rss_before = _current_rss_mb()
+    t0 = time.perf_counter()
+    ok = await run_pipeline("ingest-bench", site_url, bot_pk)
+    wall = time.perf_counter() - t0
+
+    with db_session() as db:
+        job = db.query(models.BuildJob).filter(models.BuildJob.bot_id == bot_pk).one()
+        error = db.get(models.Bot, bot_pk).error_message
+        return {
+            "pages_requested": pages,
+            "ok": ok,
+            "error": error,
+            "pages": job.pages_processed,
+            "bytes": job.bytes_fetched,
+            "chunks": job.chunks_produced,
+            "points": job.points_upserted,
+            "embeddings_reused": job.embeddings_reused,
+            "total_s": round(wall, 3),
+            "crawl_s": job.crawl_seconds,
+            "chunk_s": job.chunk_seconds,
+            "embed_s": round((job.embed_seconds or 0) - (job.chunk_seconds or 0), 3),
+            "upsert_s": job.save_seconds,
+            "pages_per_s": _rate(job.pages_processed, wall),
+            "crawl_pages_per_s": _rate(job.pages_fetched, job.crawl_seconds),
+            "chunk_mb_per_s": _rate(job.bytes_fetched, job.chunk_seconds, 2**20),
+            "embed_chunks_per_s": _rate(job.chunks_embedded, (job.embed_seconds or 0) - (job.chunk_seconds or 0)),
+            "upsert_points_per_s": _rate(job.points_upserted, job.save_seconds),
+            "rss_before_mb": rss_before,
+            "peak_rss_mb": _peak_rss_mb(),
+        }
+
+
+# -----------------------------------------------------
+# ORCHESTRATION
+# -----------------------------------------------------
+def _wait_http(url: str, timeout: float = 15):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(args) -> dict:
+    sizes = [int(n) for n in args.pages.split(",")]
+    site_port, providers_port = _free_port(), _free_port()
+    site_url = f"http://127.0.0.1:{site_port}/"
+    providers_url = f"http://127.0.0.1:{providers_port}"
+
+    site = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.synthetic_site",
+        "--port", str(site_port),
+        "--pages", str(max(sizes)),
+        "--page-kb", str(args.page_kb),
+        "--boilerplate", str(args.boilerplate),
+        "--duplicates", str(args.duplicates),
+    ], cwd=REPO_ROOT)
+    providers = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_providers",
+        "--port", str(providers_port),
+        "--hf-latency", args.hf_latency,
+    ], cwd=REPO_ROOT)
+
+    runs = []
+    try:
+        _wait_http(f"{site_url}manifest.json")
+        _wait_http(f"{providers_url}/health")
+        for n in sizes:
+            out = subprocess.check_output([
+                sys.executable, "-m", "benchmarks.ingest",
+                "--run-one", str(n), "--site-url", site_url, "--providers-url", providers_url,
+            ], cwd=REPO_ROOT)
+            run = json.loads(out.decode().strip().splitlines()[-1])
+            runs.append(run)
+            print(_format_run(run), file=sys.stderr)
+    finally:
+        site.terminate()
+        providers.terminate()
+        site.wait()
+        providers.wait()
+
+    return {
+        "benchmark": "ingest",
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "params": {
+            "page_kb": args.page_kb,
+            "boilerplate": args.boilerplate,
+            "duplicates": args.duplicates,
+            "hf_latency": args.hf_latency,
+        },
+        "runs": runs,
+    }
+
+
+def _format_run(run: dict) -> str:
+    return (
+        f"{run['pages']:>6} pages  {run['chunks']:>7} chunks  {run['total_s']:>8.2f}s  "
+        f"crawl {run['crawl_s']}s  chunk {run['chunk_s']}s  embed {run['embed_s']}s  upsert {run['upsert_s']}s  "
+        f"{run['pages_per_s']} pages/s  reused {run.get('embeddings_reused')}  peak RSS {run['peak_rss_mb']} MB"
+        + ("" if run["ok"] else f"  FAILED: {run['error']}")
+    )
+
+
+def compare(current: dict, baseline: dict):
+    base_runs = {r["pages_requested"]: r for r in baseline["runs"]}
+    print(f"\nvs {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    for run in current["runs"]:
+        base = base_runs.get(run["pages_requested"])
+        if not base:
+            continue
+        parts = []
+        for metric in COMPARE_METRICS + ("peak_rss_mb",):
+            new, old = run.get(metric), base.get(metric)
+            if new and old:
+                parts.append(f"{metric} {100 * (new - old) / old:+.1f}%")
+        print(f"  {run['pages_requested']:>6} pages: " + ", ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.ingest")
+    parser.add_argument("--pages", default="10,100,1000", help="comma-separated page counts")
+    parser.add_argument("--page-kb", type=float, default=8)
+    parser.add_argument("--boilerplate", type=float, default=0.3)
+    parser.add_argument("--duplicates", type=float, default=0.1)
+    parser.add_argument("--hf-latency", default="5:0.3", help="fake embedding latency, median_ms[:sigma]")
+    parser.add_argument("--json", default=None, help="write results here")
+    parser.add_argument("--compare", default=None, help="earlier --json output to diff against")
+    # internal: one run in a fresh process
+    parser.add_argument("--run-one", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--site-url", help=argparse.SUPPRESS)
+    parser.add_argument("--providers-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one is not None:
+        print(json.dumps(asyncio.run(run_one(args.run_one, args.site_url, args.providers_url))))
+        return
+
+    result = run_all(args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
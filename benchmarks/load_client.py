@@ -0,0 +1,138 @@
+"""
+Closed-loop widget traffic against POST /api/chat/{bot_id}.
+
+Runs in its own process (started by benchmarks.chat_load) so the load
+generator never competes with the app for the event loop it is measuring.
+
+Each virtual user plays a stream of widget visitors: a visitor gets a fresh
+X-Forwarded-For address, picks one bot and asks a few questions — staying
+under the per-session question limit, exactly like real embeds.
+
+Prints one JSON summary to stdout.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+
+import httpx
+import numpy as np
+
+QUESTIONS = [
+    "What services do you offer?",
+    "How much does it cost?",
+    "Where are you located?",
+    "How can I contact support?",
+    "Do you offer refunds?",
+    "What are your opening hours?",
+    "Who is this website for?",
+    "How do I get started?",
+]
+
+# Stay under the chat router's 5-questions-per-session limit
+QUESTIONS_PER_VISITOR = 4
+
+_visitor_ids = itertools.count(1)
+
+
+def _visitor_ip() -> str:
+    n = next(_visitor_ids)
+    return f"10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+
+
+def summarize(latencies_ms: list[float]) -> dict:
+    if not latencies_ms:
+        return {"count": 0}
+    arr = np.asarray(latencies_ms)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "count": int(arr.size),
+        "mean_ms": round(float(arr.mean()), 1),
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+        "max_ms": round(float(arr.max()), 1),
+    }
+
+
+async def run(url: str, bot_ids: list[str], concurrency: int, duration: float, warmup: float, think_ms: float) -> dict:
+    statuses: Counter = Counter()
+    ok_latencies: list[float] = []
+    all_latencies: list[float] = []
+
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+
+        async def user():
+            while time.perf_counter() < stop_at:
+                headers = {"X-Forwarded-For": _visitor_ip()}
+                bot_id = random.choice(bot_ids)
+                for _ in range(QUESTIONS_PER_VISITOR):
+                    t0 = time.perf_counter()
+                    if t0 >= stop_at:
+                        return
+                    try:
+                        r = await client.post(
+                            f"/api/chat/{bot_id}",
+                            json={"message": random.choice(QUESTIONS)},
+                            headers=headers,
+                        )
+                        status = str(r.status_code)
+                    except httpx.HTTPError as e:
+                        status = type(e).__name__
+                    t1 = time.perf_counter()
+
+                    if t0 >= measure_from:
+                        ms = (t1 - t0) * 1000
+                        statuses[status] += 1
+                        all_latencies.append(ms)
+                        if status == "200":
+                            ok_latencies.append(ms)
+                    if think_ms:
+                        await asyncio.sleep(think_ms / 1000)
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+
+    measured = max(time.perf_counter() - measure_from, 1e-9)
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(measured, 2),
+        "requests": sum(statuses.values()),
+        "rps": round(sum(statuses.values()) / measured, 1),
+        "ok_rps": round(statuses.get("200", 0) / measured, 1),
+        "status_counts": dict(statuses),
+        "latency_ok": summarize(ok_latencies),
+        "latency_all": summarize(all_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_client")
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--bots", required=True, help="comma-separated bot ids")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--think-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(
+        args.url,
+        args.bots.split(","),
+        args.concurrency,
+        args.duration,
+        args.warmup,
+        args.think_ms,
+    ))
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Retrieval latency: in-process local_index vs a Qdrant round trip, per bot size.
+
+    python -m benchmarks.local_index
+    python -m benchmarks.local_index --points 100,300,1000,5000 --queries 500
+    python -m benchmarks.local_index --qdrant-url http://localhost:6333    # real network round trip
+
+For each size a scratch collection is filled with random unit vectors, then
+the same queries go through client.query_points and local_index.search
+(after the index is loaded up front). Top-k ids are compared so a mismatch shows up as
+recall < 1. Without --qdrant-url the baseline is Qdrant :memory:, which has
+no network hop — the gap against a real server is larger.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+from benchmarks.load_client import summarize
+
+
+async def run_size(points: int, dim: int, queries: int, top_k: int, rng: np.random.Generator) -> dict:
+    from qdrant_client.models import Distance, PointStruct, VectorParams
+    from app.services import vector_store
+    from app.services.local_index import local_index
+
+    bot_id = f"local-index-bench-{uuid.uuid4().hex[:8]}"
+    client = vector_store.get_client()
+    name = vector_store.get_collection_name(bot_id)
+    await client.create_collection(name, vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+
+    vectors = rng.standard_normal((points, dim)).astype(np.float32)
+    for start in range(0, points, 512):
+        await client.upsert(name, points=[
+            PointStruct(id=str(uuid.uuid4()), vector=v.tolist(), payload={"text": f"chunk {start + i}", "page_url": "https://bench.example"})
+            for i, v in enumerate(vectors[start:start + 512])
+        ])
+
+    qs = rng.standard_normal((queries, dim)).astype(np.float32).tolist()
+    t0 = time.perf_counter()
+    await local_index.load(bot_id)
+    load_ms = (time.perf_counter() - t0) * 1000
+
+    qdrant_ms, local_ms, overlap = [], [], []
+    try:
+        for q in qs:
+            t0 = time.perf_counter()
+            result = await client.query_points(name, query=q, limit=top_k)
+            qdrant_ms.append((time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            local = await local_index.search(bot_id, q, top_k)
+            local_ms.append((time.perf_counter() - t0) * 1000)
+
+            if local is None:
+                continue
+            expected = {str(p.id) for p in result.points}
+            overlap.append(len(expected & {m["point_id"] for m in local[1]}) / max(len(expected), 1))
+    finally:
+        await vector_store.delete_collection(bot_id)
+
+    return {
+        "points": points,
+        "local_load_ms": round(load_ms, 1),
+        "served_locally": bool(overlap),
+        "recall_vs_qdrant": round(float(np.mean(overlap)), 4) if overlap else None,
+        "qdrant": summarize(qdrant_ms),
+        "local": summarize(local_ms),
+    }
+
+
+async def run(args) -> dict:
+    rng = np.random.default_rng(0)
+    results = []
+    for points in args.points:
+        row = await run_size(points, args.dim, args.queries, args.top_k, rng)
+        results.append(row)
+        print(
+            f"{points:>6} points  qdrant p50 {row['qdrant']['p50_ms']} ms  "
+            f"local p50 {row['local']['p50_ms']} ms  recall {row['recall_vs_qdrant']}",
+            file=sys.stderr,
+        )
+    return {"benchmark": "local_index", "qdrant": "server" if args.qdrant_url else "memory", "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.local_index")
+    parser.add_argument("--points", default="100,300,1000,5000", help="comma-separated bot sizes")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--qdrant-url", default=None)
+    parser.add_argument("--qdrant-api-key", default=None)
+    parser.add_argument("--json", default=None, help="write results here")
+    args = parser.parse_args()
+    args.points = [int(p) for p in args.points.split(",") if p]
+
+    # Must be set before app.services.vector_store / local_index are imported
+    os.environ["QDRANT_URL"] = args.qdrant_url or ""
+    os.environ["QDRANT_API_KEY"] = args.qdrant_api_key or ""
+    os.environ["QDRANT_PATH"] = ":memory:"
+    os.environ["LOCAL_INDEX_DIR"] = tempfile.mkdtemp(prefix="local-index-bench-")
+    os.environ["LOCAL_INDEX_MAX_POINTS"] = str(max(args.points))
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result["results"], indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Embedded Qdrant: persistent (QDRANT_PATH) vs in-memory, at realistic bot counts.
+
+    python -m benchmarks.qdrant_embedded
+    python -m benchmarks.qdrant_embedded --bots 500 --points 300 --queries 2000 --json embedded.json
+
+Every bot gets its own collection of --points random 384-d vectors (a
+max_pages=10 bot is a few hundred chunks). Each measurement runs in a fresh
+process so RSS is per mode:
+
+  memory     build + query in one process with QDRANT_PATH=:memory:
+  persistent build into a temp QDRANT_PATH, then a second process reopens
+             it (what a restart pays) and queries
+
+Queries go straight to client.query_points on random bots — the in-process
+local_index is bypassed so this measures Qdrant itself.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.ingest import REPO_ROOT, _current_rss_mb, _git_commit, _peak_rss_mb
+from benchmarks.load_client import summarize
+
+DIM = 384
+
+
+def _dir_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return round(total / 2**20, 1)
+
+
+# -----------------------------------------------------
+# CHILD PROCESS
+# -----------------------------------------------------
+async def build(bots: int, points: int, rng: np.random.Generator) -> float:
+    from qdrant_client.models import Distance, PointStruct, VectorParams
+    from app.services.vector_store import get_client, get_collection_name
+
+    client = get_client()
+    t0 = time.perf_counter()
+    for b in range(bots):
+        name = get_collection_name(f"bench-{b}")
+        await client.create_collection(name, vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+        vectors = rng.standard_normal((points, DIM)).astype(np.float32)
+        await client.upsert(name, points=[
+            PointStruct(id=str(uuid.uuid4()), vector=v.tolist(), payload={"text": f"chunk {i} " * 40, "page_url": f"https://bot{b}.example/{i % 10}"})
+            for i, v in enumerate(vectors)
+        ])
+    return time.perf_counter() - t0
+
+
+async def query(bots: int, queries: int, rng: np.random.Generator) -> list[float]:
+    from app.services.vector_store import get_client, get_collection_name
+
+    client = get_client()
+    latencies = []
+    for _ in range(queries):
+        name = get_collection_name(f"bench-{rng.integers(bots)}")
+        q = rng.standard_normal(DIM).astype(np.float32).tolist()
+        t0 = time.perf_counter()
+        await client.query_points(name, query=q, limit=3)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+async def child(args) -> dict:
+    from app.services.vector_store import close_client, get_client
+
+    rng = np.random.default_rng(args.seed)
+    result = {"rss_before_mb": _current_rss_mb()}
+
+    t0 = time.perf_counter()
+    get_client()
+    if args.child in ("build", "memory"):
+        result["build_s"] = round(await build(args.bots, args.points, rng), 2)
+    else:
+        # Embedded storage is loaded when the client is constructed / first touched
+        await get_client().get_collections()
+        result["open_s"] = round(time.perf_counter() - t0, 3)
+
+    if args.child in ("memory", "reopen"):
+        result["rss_after_load_mb"] = _current_rss_mb()
+        result["query"] = summarize(await query(args.bots, args.queries, rng))
+    result["peak_rss_mb"] = _peak_rss_mb()
+    await close_client()
+    return result
+
+
+def _run_child(kind: str, qdrant_path: str, args) -> dict:
+    env = {**os.environ, "QDRANT_URL": "", "QDRANT_API_KEY": "", "QDRANT_PATH": qdrant_path}
+    out = subprocess.check_output([
+        sys.executable, "-m", "benchmarks.qdrant_embedded", "--child", kind,
+        "--bots", str(args.bots), "--points", str(args.points), "--queries", str(args.queries),
+    ], cwd=REPO_ROOT, env=env)
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+
+# -----------------------------------------------------
+# ORCHESTRATION
+# -----------------------------------------------------
+def run(args) -> dict:
+    print(f"memory: {args.bots} bots × {args.points} points", file=sys.stderr)
+    memory = _run_child("memory", ":memory:", args)
+
+    qdrant_path = tempfile.mkdtemp(prefix="qdrant-embedded-")
+    try:
+        print(f"persistent: building in {qdrant_path}", file=sys.stderr)
+        built = _run_child("build", qdrant_path, args)
+        persistent = _run_child("reopen", qdrant_path, args)
+        persistent["build_s"] = built["build_s"]
+        persistent["disk_mb"] = _dir_mb(qdrant_path)
+    finally:
+        shutil.rmtree(qdrant_path, ignore_errors=True)
+
+    for name, r in (("memory", memory), ("persistent", persistent)):
+        print(
+            f"{name:<11} query p50 {r['query']['p50_ms']} ms  p99 {r['query']['p99_ms']} ms  "
+            f"RSS {r['rss_after_load_mb']} MB  peak {r['peak_rss_mb']} MB"
+            + (f"  reopen {r['open_s']}s  disk {r['disk_mb']} MB" if name == "persistent" else ""),
+            file=sys.stderr,
+        )
+    return {
+        "benchmark": "qdrant_embedded",
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "params": {"bots": args.bots, "points": args.points, "queries": args.queries, "dim": DIM},
+        "memory": memory,
+        "persistent": persistent,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.qdrant_embedded")
+    parser.add_argument("--bots", type=int, default=200)
+    parser.add_argument("--points", type=int, default=300, help="points per bot")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--json", default=None, help="write results here")
+    parser.add_argument("--child", choices=("memory", "build", "reopen"), help=argparse.SUPPRESS)
+    parser.add_argument("--seed", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args))))
+        return
+
+    result = run(args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
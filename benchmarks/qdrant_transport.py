@@ -0,0 +1,164 @@
+"""
+Qdrant server transport: REST vs gRPC, per query and per bulk upsert.
+
+    python -m benchmarks.qdrant_transport --qdrant-url http://localhost:6333
+    python -m benchmarks.qdrant_transport --qdrant-url https://xyz.cloud.qdrant.io --qdrant-api-key ... \
+        --points 2000 --queries 1000 --concurrency 8 --json transport.json
+
+Each transport runs in a fresh process with QDRANT_PREFER_GRPC set, so the
+client, its connection pool and keep-alive settings are built exactly as
+the app builds them. Per transport:
+
+  upsert     --points random 384-d chunks through add_chunks_to_qdrant
+             (batching and concurrency from QDRANT_UPSERT_*)
+  retrieve   --queries calls to retrieve_chunks, --concurrency at a time,
+             with the in-process local_index disabled
+
+CPU is process time (user + sys) of the client process, reported per query
+and per 1k points — the part of a request the worker itself pays for.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.cold_start import REPO_ROOT, _git_commit
+from benchmarks.load_client import summarize
+
+DIM = 384
+TRANSPORTS = ("rest", "grpc")
+
+
+# -----------------------------------------------------
+# CHILD PROCESS
+# -----------------------------------------------------
+async def upsert(bot_id: str, points: int, rng: np.random.Generator) -> dict:
+    from app.services.vector_store import add_chunks_to_qdrant
+
+    vectors = rng.standard_normal((points, DIM)).astype(np.float32).tolist()
+    texts = [f"chunk {i} " * 40 for i in range(points)]
+    metadatas = [{"page_url": f"https://bench.example/{i % 50}", "chunk_index": i} for i in range(points)]
+
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    points_per_s = await add_chunks_to_qdrant(bot_id, texts, vectors, metadatas)
+    seconds, cpu_s = time.perf_counter() - t0, time.process_time() - cpu0
+    return {
+        "seconds": round(seconds, 2),
+        "points_per_s": round(points_per_s),
+        "cpu_ms_per_1k_points": round(cpu_s * 1000 / points * 1000, 1),
+    }
+
+
+async def retrieve(bot_id: str, queries: int, concurrency: int, top_k: int, rng: np.random.Generator) -> dict:
+    from app.services.vector_store import retrieve_chunks
+
+    qs = rng.standard_normal((queries, DIM)).astype(np.float32).tolist()
+    await retrieve_chunks(bot_id, qs[0], top_k)      # connect / handshake outside the window
+    latencies = []
+    pending = iter(qs)
+
+    async def worker():
+        for q in pending:
+            t0 = time.perf_counter()
+            await retrieve_chunks(bot_id, q, top_k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds, cpu_s = time.perf_counter() - t0, time.process_time() - cpu0
+    return {
+        **summarize(latencies),
+        "qps": round(queries / seconds, 1),
+        "cpu_ms_per_query": round(cpu_s * 1000 / queries, 3),
+    }
+
+
+async def child(args) -> dict:
+    from app.services.vector_store import close_client, delete_collection
+
+    rng = np.random.default_rng(args.seed)
+    bot_id = f"transport-bench-{uuid.uuid4().hex[:8]}"
+    try:
+        result = {"upsert": await upsert(bot_id, args.points, rng)}
+        result["retrieve"] = await retrieve(bot_id, args.queries, args.concurrency, args.top_k, rng)
+    finally:
+        await delete_collection(bot_id)
+        await close_client()
+    return result
+
+
+def _run_child(transport: str, args) -> dict:
+    env = {
+        **os.environ,
+        "QDRANT_URL": args.qdrant_url,
+        "QDRANT_API_KEY": args.qdrant_api_key,
+        "QDRANT_PREFER_GRPC": "true" if transport == "grpc" else "false",
+        "LOCAL_INDEX_ENABLED": "false",
+    }
+    out = subprocess.check_output([
+        sys.executable, "-m", "benchmarks.qdrant_transport", "--child", transport,
+        "--qdrant-url", args.qdrant_url, "--points", str(args.points), "--queries", str(args.queries),
+        "--concurrency", str(args.concurrency), "--top-k", str(args.top_k),
+    ], cwd=REPO_ROOT, env=env)
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+
+# -----------------------------------------------------
+# ORCHESTRATION
+# -----------------------------------------------------
+def run(args) -> dict:
+    results = {}
+    for transport in TRANSPORTS:
+        print(f"{transport}: {args.points} points, {args.queries} queries × {args.concurrency}", file=sys.stderr)
+        r = results[transport] = _run_child(transport, args)
+        print(
+            f"{transport:<5} retrieve p50 {r['retrieve']['p50_ms']} ms  p99 {r['retrieve']['p99_ms']} ms  "
+            f"cpu {r['retrieve']['cpu_ms_per_query']} ms/query  "
+            f"upsert {r['upsert']['points_per_s']} points/s  cpu {r['upsert']['cpu_ms_per_1k_points']} ms/1k",
+            file=sys.stderr,
+        )
+    return {
+        "benchmark": "qdrant_transport",
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "params": {
+            "points": args.points, "queries": args.queries, "concurrency": args.concurrency,
+            "top_k": args.top_k, "dim": DIM,
+        },
+        **results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.qdrant_transport")
+    parser.add_argument("--qdrant-url", required=True, help="Qdrant server exposing both REST and gRPC")
+    # The app only uses a server when a key is set; servers without auth ignore it
+    parser.add_argument("--qdrant-api-key", default="bench")
+    parser.add_argument("--points", type=int, default=2000, help="points upserted per transport")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--json", default=None, help="write results here")
+    parser.add_argument("--child", choices=TRANSPORTS, help=argparse.SUPPRESS)
+    parser.add_argument("--seed", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args))))
+        return
+
+    result = run(args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+Replay real chat traffic from chat_logs.
+
+    # 1. export a window (anonymised) from the production database
+    DATABASE_URL=... python -m benchmarks.replay export --since 2026-10-01T09:00 --until 2026-10-01T10:00 --out trace.jsonl
+
+    # 2. replay it with the original inter-arrival times (or 2x / 10x faster)
+    python -m benchmarks.replay run trace.jsonl --target http://127.0.0.1:8000 --speed 2 --out local.json
+    python -m benchmarks.replay run trace.jsonl --target https://staging.example --bot-map <old>=<new> --out staging.json
+
+    # 3. compare two runs
+    python -m benchmarks.replay compare local.json staging.json
+
+Anonymisation: session ids are replaced with a keyed hash (stable within one
+export), and e-mail addresses, phone numbers, URLs and long digit runs in
+messages are replaced with placeholders. Nothing else from chat_logs
+(answers, sources) is exported.
+
+Each anonymised session is replayed from its own X-Forwarded-For address, so
+per-session question limits behave as they did in production. The target
+must trust that header (uvicorn --proxy-headers --forwarded-allow-ips='*');
+otherwise every request shares one session and hits the limit.
+
+Cache hit rates come from /metrics: every `<name>_hits_total` /
+`<name>_misses_total` counter pair is diffed across the run.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import re
+import secrets
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+PERCENTILES = (10, 25, 50, 75, 90, 95, 99, 99.9)
+
+_SCRUBBERS = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<email>"),
+    (re.compile(r"https?://\S+"), "<url>"),
+    (re.compile(r"\+?\d[\d\s().-]{7,}\d"), "<phone>"),
+    (re.compile(r"\d{5,}"), "<number>"),
+]
+
+
+def scrub(message: str) -> str:
+    for pattern, placeholder in _SCRUBBERS:
+        message = pattern.sub(placeholder, message)
+    return message
+
+
+# -----------------------------------------------------
+# EXPORT
+# -----------------------------------------------------
+def export(since: datetime, until: datetime, out: str, bot_id: str | None = None, salt: str | None = None) -> int:
+    from app.db import db_session
+    from app import models
+
+    key = (salt or secrets.token_hex(16)).encode()
+    count = 0
+    first_ts = None
+
+    with db_session() as db, open(out, "w") as f:
+        q = (
+            db.query(
+                models.ChatLog.created_at,
+                models.ChatLog.session_id,
+                models.ChatLog.user_message,
+                models.Bot.bot_id,
+            )
+            .join(models.Bot, models.Bot.id == models.ChatLog.bot_id)
+            .filter(models.ChatLog.created_at >= since, models.ChatLog.created_at < until)
+            .order_by(models.ChatLog.created_at)
+        )
+        if bot_id:
+            q = q.filter(models.Bot.bot_id == bot_id)
+
+        f.write(json.dumps({"meta": {
+            "since": since.isoformat(),
+            "until": until.isoformat(),
+            "bot_id": bot_id,
+            "exported_at": datetime.utcnow().isoformat(timespec="seconds"),
+        }}) + "\n")
+        for created_at, session_id, message, public_bot_id in q.yield_per(1000):
+            first_ts = first_ts or created_at
+            f.write(json.dumps({
+                "t": round((created_at - first_ts).total_seconds(), 3),
+                "bot_id": public_bot_id,
+                "session": hmac.new(key, (session_id or "").encode(), hashlib.sha256).hexdigest()[:16],
+                "message": scrub(message or ""),
+            }) + "\n")
+            count += 1
+    return count
+
+
+def load_trace(path: str) -> tuple[dict, list[dict]]:
+    meta, events = {}, []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if "meta" in row:
+                meta = row["meta"]
+            else:
+                events.append(row)
+    return meta, events
+
+
+# -----------------------------------------------------
+# /metrics SCRAPE
+# -----------------------------------------------------
+_SAMPLE = re.compile(r"^([a-zA-Z_:][\w:]*)(\{[^}]*\})?\s+([-+\w.]+)$")
+
+
+async def scrape_counters(client: httpx.AsyncClient, token: str | None) -> dict[str, float]:
+    """Sum of every sample per metric name (labels collapsed)."""
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    try:
+        r = await client.get("/metrics", headers=headers)
+    except httpx.HTTPError:
+        return {}
+    if r.status_code != 200:
+        return {}
+    totals: dict[str, float] = defaultdict(float)
+    for line in r.text.splitlines():
+        m = _SAMPLE.match(line)
+        if m:
+            try:
+                totals[m.group(1)] += float(m.group(3))
+            except ValueError:
+                pass
+    return dict(totals)
+
+
+def cache_hit_rates(before: dict, after: dict) -> dict:
+    rates = {}
+    for name in after:
+        if not name.endswith("_hits_total"):
+            continue
+        base = name[: -len("_hits_total")]
+        hits = after[name] - before.get(name, 0)
+        misses = after.get(f"{base}_misses_total", 0) - before.get(f"{base}_misses_total", 0)
+        if hits + misses:
+            rates[base] = {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 4)}
+    return rates
+
+
+# -----------------------------------------------------
+# RUN
+# -----------------------------------------------------
+def _session_ip(session: str) -> str:
+    h = int(session[:8], 16) if session else 0
+    return f"10.{(h >> 16) & 255}.{(h >> 8) & 255}.{h & 255 or 1}"
+
+
+def latency_summary(latencies_ms: list[float]) -> dict:
+    if not latencies_ms:
+        return {"count": 0}
+    arr = np.asarray(latencies_ms)
+    return {
+        "count": int(arr.size),
+        "mean_ms": round(float(arr.mean()), 1),
+        **{f"p{p:g}_ms": round(float(np.percentile(arr, p)), 1) for p in PERCENTILES},
+        "max_ms": round(float(arr.max()), 1),
+    }
+
+
+async def run(
+    trace: str,
+    target: str,
+    speed: float = 1.0,
+    bot_map: dict[str, str] | None = None,
+    max_concurrency: int = 500,
+    metrics_token: str | None = None,
+    limit: int | None = None,
+) -> dict:
+    meta, events = load_trace(trace)
+    if limit:
+        events = events[:limit]
+    bot_map = bot_map or {}
+
+    statuses: Counter = Counter()
+    ok_latencies: list[float] = []
+    all_latencies: list[float] = []
+    schedule_lag_ms: list[float] = []
+    per_bot: dict[str, list[float]] = defaultdict(list)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+    async with httpx.AsyncClient(base_url=target, limits=limits, timeout=120) as client:
+        before = await scrape_counters(client, metrics_token)
+        start = time.perf_counter()
+
+        async def fire(event: dict):
+            due = start + event["t"] / speed
+            await asyncio.sleep(max(due - time.perf_counter(), 0))
+            async with semaphore:
+                t0 = time.perf_counter()
+                # Late starts mean the client (or the concurrency cap) couldn't keep up
+                schedule_lag_ms.append(max(t0 - due, 0) * 1000)
+                bot_id = bot_map.get(event["bot_id"], event["bot_id"])
+                try:
+                    r = await client.post(
+                        f"/api/chat/{bot_id}",
+                        json={"message": event["message"] or "hello"},
+                        headers={"X-Forwarded-For": _session_ip(event["session"])},
+                    )
+                    status = str(r.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                ms = (time.perf_counter() - t0) * 1000
+            statuses[status] += 1
+            all_latencies.append(ms)
+            if status == "200":
+                ok_latencies.append(ms)
+                per_bot[bot_id].append(ms)
+
+        await asyncio.gather(*(fire(e) for e in events))
+        elapsed = time.perf_counter() - start
+        after = await scrape_counters(client, metrics_token)
+
+    lag = np.asarray(schedule_lag_ms) if schedule_lag_ms else np.zeros(1)
+    return {
+        "target": target,
+        "trace": trace,
+        "trace_meta": meta,
+        "speed": speed,
+        "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "requests": len(events),
+        "elapsed_s": round(elapsed, 2),
+        "rps": round(len(events) / elapsed, 2) if elapsed else None,
+        "status_counts": dict(statuses),
+        "latency_ok": latency_summary(ok_latencies),
+        "latency_all": latency_summary(all_latencies),
+        "schedule_lag_ms": {"p50": round(float(np.percentile(lag, 50)), 1), "p99": round(float(np.percentile(lag, 99)), 1)},
+        "per_bot_p50_ms": {b: round(float(np.percentile(v, 50)), 1) for b, v in per_bot.items()},
+        "cache": cache_hit_rates(before, after),
+        "ok_latencies_ms": [round(v, 1) for v in ok_latencies],
+    }
+
+
+# -----------------------------------------------------
+# COMPARE
+# -----------------------------------------------------
+def ks_statistic(a: list[float], b: list[float]) -> float | None:
+    """Two-sample Kolmogorov–Smirnov distance between latency distributions."""
+    if not a or not b:
+        return None
+    a, b = np.sort(a), np.sort(b)
+    grid = np.concatenate([a, b])
+    cdf_a = np.searchsorted(a, grid, side="right") / a.size
+    cdf_b = np.searchsorted(b, grid, side="right") / b.size
+    return round(float(np.max(np.abs(cdf_a - cdf_b))), 4)
+
+
+def compare(path_a: str, path_b: str):
+    with open(path_a) as f:
+        a = json.load(f)
+    with open(path_b) as f:
+        b = json.load(f)
+
+    print(f"A: {a['target']} x{a['speed']} ({a['started_at']})")
+    print(f"B: {b['target']} x{b['speed']} ({b['started_at']})\n")
+    print(f"{'':<12}{'A':>12}{'B':>12}{'Δ':>10}")
+    for key in [f"p{p:g}_ms" for p in PERCENTILES] + ["mean_ms", "max_ms"]:
+        va, vb = a["latency_ok"].get(key), b["latency_ok"].get(key)
+        if va is None or vb is None:
+            continue
+        delta = f"{100 * (vb - va) / va:+.1f}%" if va else ""
+        print(f"{key:<12}{va:>12}{vb:>12}{delta:>10}")
+    print(f"{'rps':<12}{a['rps']:>12}{b['rps']:>12}")
+    print(f"\nKS distance (ok latency): {ks_statistic(a['ok_latencies_ms'], b['ok_latencies_ms'])}")
+    print(f"status A: {a['status_counts']}")
+    print(f"status B: {b['status_counts']}")
+
+    caches = sorted(set(a["cache"]) | set(b["cache"]))
+    if caches:
+        print("\ncache hit rate:")
+        for name in caches:
+            ra = a["cache"].get(name, {}).get("hit_rate")
+            rb = b["cache"].get(name, {}).get("hit_rate")
+            print(f"  {name:<32} A {ra}  B {rb}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.replay")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export", help="Export an anonymised chat_logs window (uses DATABASE_URL)")
+    p.add_argument("--since", type=datetime.fromisoformat, required=True)
+    p.add_argument("--until", type=datetime.fromisoformat, required=True)
+    p.add_argument("--bot-id", default=None)
+    p.add_argument("--salt", default=None, help="reuse to keep session hashes stable across exports")
+    p.add_argument("--out", required=True)
+
+    p = sub.add_parser("run", help="Replay a trace against a deployment")
+    p.add_argument("trace")
+    p.add_argument("--target", required=True)
+    p.add_argument("--speed", type=float, default=1.0, help="2 = twice as fast as recorded")
+    p.add_argument("--bot-map", action="append", default=[], help="old_bot_id=new_bot_id (repeatable)")
+    p.add_argument("--max-concurrency", type=int, default=500)
+    p.add_argument("--metrics-token", default=None)
+    p.add_argument("--limit", type=int, default=None, help="replay only the first N requests")
+    p.add_argument("--out", required=True)
+
+    p = sub.add_parser("compare", help="Compare two run results")
+    p.add_argument("a")
+    p.add_argument("b")
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        n = export(args.since, args.until, args.out, bot_id=args.bot_id, salt=args.salt)
+        print(f"Exported {n} requests to {args.out}")
+    elif args.command == "run":
+        bot_map = dict(m.split("=", 1) for m in args.bot_map)
+        result = asyncio.run(run(
+            args.trace,
+            args.target,
+            speed=args.speed,
+            bot_map=bot_map,
+            max_concurrency=args.max_concurrency,
+            metrics_token=args.metrics_token,
+            limit=args.limit,
+        ))
+        with open(args.out, "w") as f:
+            json.dump(result, f)
+        print(json.dumps({k: v for k, v in result.items() if k != "ok_latencies_ms"}, indent=2))
+    elif args.command == "compare":
+        compare(args.a, args.b)
+
+
+if __name__ == "__main__":
+    main()
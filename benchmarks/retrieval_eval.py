@@ -0,0 +1,253 @@
+"""
+Retrieval quality vs latency sweep.
+
+    python -m benchmarks.retrieval_eval --corpus corpus.jsonl --questions questions.jsonl
+    python -m benchmarks.retrieval_eval --from-bot <bot_id> --questions questions.jsonl \
+        --chunking 220:40,150:30,320:60 --top-k 3,5,8 --hnsw-ef 32,128 --quantization none,int8
+
+Inputs (JSON lines):
+  corpus     {"url": "...", "text": "..."}                 page text as crawled
+  questions  {"question": "...", "pages": ["url", ...]}     pages that answer it
+
+--from-bot rebuilds the corpus from a bot's Qdrant points (chunks joined in
+chunk_index order per page; overlaps are kept, which is close enough for
+comparing chunkings). --export-corpus writes it out for reuse.
+
+For every chunking (max_words:overlap) × index (hnsw m, quantization) the
+corpus is chunked with process_text_to_chunks, embedded with embed_text
+(cached across configurations) and loaded into a scratch collection; every
+top_k × hnsw_ef is then queried through retrieve_chunks.
+
+Reported per configuration: recall@k (share of labelled pages retrieved),
+hit@k, MRR, prompt tokens (≈ chars / 4 of build_rag_prompt output) and
+retrieval latency. HNSW / quantization settings only matter against a real
+Qdrant server (QDRANT_URL); the local :memory: client searches exhaustively.
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import time
+import uuid
+from collections import defaultdict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+
+def _load_jsonl(path: str) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _parse_list(value: str, cast=str) -> list:
+    return [cast(v) for v in value.split(",") if v]
+
+
+class EmbeddingCache:
+    """Embeds each distinct text once per run (chunkings share many sentences / questions)."""
+
+    def __init__(self, batch_size: int = 32):
+        self.batch_size = batch_size
+        self._vectors: dict[str, list[float]] = {}
+        self.calls = 0
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        from app.services.embeddings import embed_text
+
+        keys = [hashlib.sha1(t.encode()).hexdigest() for t in texts]
+        missing = list({k: t for k, t in zip(keys, texts) if k not in self._vectors}.items())
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i:i + self.batch_size]
+            vectors = await embed_text([t for _, t in batch])
+            self.calls += len(batch)
+            for (k, _), v in zip(batch, vectors):
+                self._vectors[k] = v
+        return [self._vectors[k] for k in keys]
+
+
+# -----------------------------------------------------
+# CORPUS
+# -----------------------------------------------------
+async def corpus_from_bot(bot_id: str) -> list[dict]:
+    from app.services.vector_store import get_client, get_collection_name
+
+    client = get_client()
+    pages: dict[str, list[tuple[int, str]]] = defaultdict(list)
+    offset = None
+    while True:
+        points, offset = await client.scroll(
+            collection_name=get_collection_name(bot_id),
+            limit=256,
+            offset=offset,
+            with_payload=["text", "page_url", "chunk_index"],
+            with_vectors=False,
+        )
+        for p in points:
+            pages[p.payload.get("page_url") or ""].append((p.payload.get("chunk_index") or 0, p.payload.get("text", "")))
+        if offset is None:
+            break
+    return [
+        {"url": url, "text": "\n".join(text for _, text in sorted(chunks))}
+        for url, chunks in pages.items()
+    ]
+
+
+# -----------------------------------------------------
+# ONE INDEX BUILD + QUERIES
+# -----------------------------------------------------
+async def build_index(corpus, max_words, overlap, hnsw_m, quantization, cache) -> tuple[str, int]:
+    from qdrant_client.models import (
+        Distance, HnswConfigDiff, ScalarQuantization, ScalarQuantizationConfig, ScalarType, VectorParams,
+    )
+    from app.services.text_processing import process_text_to_chunks
+    from app.services.vector_store import add_chunks_to_qdrant, get_client, get_collection_name
+
+    texts, metadatas = [], []
+    for page in corpus:
+        for chunk in process_text_to_chunks(page["text"], max_words=max_words, overlap_words=overlap):
+            metadatas.append({"page_url": page["url"], "chunk_index": len(texts)})
+            texts.append(chunk)
+    vectors = await cache.embed(texts)
+
+    scratch_id = f"eval-{uuid.uuid4().hex[:12]}"
+    await get_client().create_collection(
+        collection_name=get_collection_name(scratch_id),
+        vectors_config=VectorParams(size=len(vectors[0]), distance=Distance.COSINE),
+        hnsw_config=HnswConfigDiff(m=hnsw_m),
+        quantization_config=(
+            ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, always_ram=True))
+            if quantization == "int8" else None
+        ),
+    )
+    await add_chunks_to_qdrant(scratch_id, texts, vectors, metadatas)
+    return scratch_id, len(texts)
+
+
+async def evaluate(scratch_id, questions, question_vectors, top_k, hnsw_ef, quantization) -> dict:
+    from qdrant_client.models import QuantizationSearchParams, SearchParams
+    from app.services.rag import build_rag_prompt
+    from app.services.vector_store import retrieve_chunks
+
+    params = SearchParams(
+        hnsw_ef=hnsw_ef,
+        quantization=QuantizationSearchParams(rescore=True) if quantization != "none" else None,
+    )
+
+    recalls, hits, reciprocal_ranks, prompt_tokens, latencies = [], [], [], [], []
+    for q, vector in zip(questions, question_vectors):
+        relevant = set(q["pages"])
+        t0 = time.perf_counter()
+        chunks, metadatas = await retrieve_chunks(scratch_id, vector, top_k=top_k, search_params=params)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+        urls = [m.get("page_url") for m in metadatas]
+        found = relevant & set(urls)
+        recalls.append(len(found) / len(relevant) if relevant else 0.0)
+        hits.append(1.0 if found else 0.0)
+        rank = next((i for i, url in enumerate(urls, start=1) if url in relevant), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+        system_prompt, user_message = build_rag_prompt(chunks, q["question"])
+        prompt_tokens.append((len(system_prompt) + len(user_message)) / CHARS_PER_TOKEN)
+
+    lat = np.asarray(latencies)
+    return {
+        "recall@k": round(float(np.mean(recalls)), 3),
+        "hit@k": round(float(np.mean(hits)), 3),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 3),
+        "prompt_tokens_mean": round(float(np.mean(prompt_tokens))),
+        "retrieve_p50_ms": round(float(np.percentile(lat, 50)), 2),
+        "retrieve_p95_ms": round(float(np.percentile(lat, 95)), 2),
+    }
+
+
+# -----------------------------------------------------
+# SWEEP
+# -----------------------------------------------------
+async def sweep(args) -> dict:
+    from app.services.vector_store import get_client, get_collection_name
+
+    if args.from_bot:
+        corpus = await corpus_from_bot(args.from_bot)
+        if args.export_corpus:
+            with open(args.export_corpus, "w") as f:
+                f.writelines(json.dumps(page) + "\n" for page in corpus)
+    else:
+        corpus = _load_jsonl(args.corpus)
+    questions = _load_jsonl(args.questions)
+
+    cache = EmbeddingCache()
+    question_vectors = await cache.embed([q["question"] for q in questions])
+
+    chunkings = [tuple(int(x) for x in c.split(":")) for c in _parse_list(args.chunking)]
+    indexes = list(itertools.product(_parse_list(args.hnsw_m, int), _parse_list(args.quantization)))
+    searches = list(itertools.product(_parse_list(args.top_k, int), _parse_list(args.hnsw_ef, int)))
+
+    results = []
+    for (max_words, overlap), (hnsw_m, quantization) in itertools.product(chunkings, indexes):
+        scratch_id, n_chunks = await build_index(corpus, max_words, overlap, hnsw_m, quantization, cache)
+        try:
+            for top_k, hnsw_ef in searches:
+                row = {
+                    "max_words": max_words,
+                    "overlap": overlap,
+                    "chunks": n_chunks,
+                    "hnsw_m": hnsw_m,
+                    "quantization": quantization,
+                    "top_k": top_k,
+                    "hnsw_ef": hnsw_ef,
+                    **await evaluate(scratch_id, questions, question_vectors, top_k, hnsw_ef, quantization),
+                }
+                results.append(row)
+                print(_format_row(row))
+        finally:
+            await get_client().delete_collection(get_collection_name(scratch_id))
+
+    return {
+        "benchmark": "retrieval_eval",
+        "pages": len(corpus),
+        "questions": len(questions),
+        "embedding_calls": cache.calls,
+        "results": results,
+    }
+
+
+def _format_row(r: dict) -> str:
+    return (
+        f"words {r['max_words']:>4}/{r['overlap']:<3} m {r['hnsw_m']:<3} {r['quantization']:<5} "
+        f"k {r['top_k']:<2} ef {r['hnsw_ef']:<4} | recall {r['recall@k']:.3f}  hit {r['hit@k']:.3f}  "
+        f"mrr {r['mrr']:.3f}  tokens {r['prompt_tokens_mean']:>5}  p50 {r['retrieve_p50_ms']} ms  p95 {r['retrieve_p95_ms']} ms"
+    )
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.retrieval_eval")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--corpus", help="pages as JSON lines {url, text}")
+    source.add_argument("--from-bot", help="rebuild the corpus from this bot's Qdrant collection")
+    parser.add_argument("--export-corpus", help="with --from-bot: save the rebuilt corpus here")
+    parser.add_argument("--questions", required=True, help="JSON lines {question, pages: [url, ...]}")
+    parser.add_argument("--chunking", default="220:40", help="max_words:overlap,...")
+    parser.add_argument("--top-k", default="3,5")
+    parser.add_argument("--hnsw-m", default="16")
+    parser.add_argument("--hnsw-ef", default="128")
+    parser.add_argument("--quantization", default="none", help="none,int8")
+    parser.add_argument("--json", default=None, help="write results here")
+    args = parser.parse_args()
+
+    result = asyncio.run(sweep(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Deterministic synthetic website for ingestion benchmarks.
+
+    python -m benchmarks.synthetic_site --port 9200 --pages 1000 \
+        --page-kb 8 --boilerplate 0.3 --duplicates 0.1
+
+Pages are generated on request from their index (nothing is held in memory):
+  - `boilerplate` is the share of each page taken by the shared header /
+    nav / footer (what the cleaner has to strip or dedupe)
+  - `duplicates` is the share of pages whose body copies an earlier page
+    (mirrors, print views, tag pages...)
+  - pages form a tree with `fanout` links per page, so a breadth-first crawl
+    from / reaches every page within log_fanout(pages) levels
+
+GET /manifest.json returns the parameters.
+"""
+import argparse
+import json
+import random
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+VOCAB_SIZE = 3000
+SYLLABLES = ["ka", "lo", "mi", "ne", "su", "ta", "ri", "po", "ve", "da", "xi", "ro", "ba", "fe", "gu", "zo"]
+
+
+class SyntheticSite:
+    def __init__(
+        self,
+        pages: int = 1000,
+        page_kb: float = 8,
+        boilerplate: float = 0.3,
+        duplicates: float = 0.1,
+        fanout: int = 10,
+        seed: int = 42,
+    ):
+        self.pages = pages
+        self.page_bytes = int(page_kb * 1024)
+        self.boilerplate = boilerplate
+        self.duplicates = duplicates
+        self.fanout = fanout
+        self.seed = seed
+
+        rng = random.Random(seed)
+        self.vocab = [
+            "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4)))
+            for _ in range(VOCAB_SIZE)
+        ]
+        self.header = self._text(rng, int(self.page_bytes * boilerplate * 0.3))
+        self.footer = self._text(rng, int(self.page_bytes * boilerplate * 0.5))
+        self.nav_items = [f"Section {i}" for i in range(1, 9)]
+
+    def manifest(self) -> dict:
+        return {
+            "pages": self.pages,
+            "page_kb": self.page_bytes / 1024,
+            "boilerplate": self.boilerplate,
+            "duplicates": self.duplicates,
+            "fanout": self.fanout,
+            "seed": self.seed,
+        }
+
+    # ---------- generation ----------
+    def _text(self, rng: random.Random, target_bytes: int) -> list[str]:
+        """Paragraphs of sentences totalling roughly target_bytes."""
+        paragraphs, size = [], 0
+        while size < target_bytes:
+            sentences = []
+            for _ in range(rng.randint(3, 7)):
+                words = [rng.choice(self.vocab) for _ in range(rng.randint(8, 20))]
+                sentences.append(" ".join(words).capitalize() + ".")
+            paragraph = " ".join(sentences)
+            paragraphs.append(paragraph)
+            size += len(paragraph) + 1
+        return paragraphs
+
+    def content_source(self, index: int) -> int:
+        """Page whose body this page carries (itself unless it's a duplicate)."""
+        rng = random.Random(self.seed * 1_000_003 + index)
+        if index > 0 and rng.random() < self.duplicates:
+            return rng.randrange(index)
+        return index
+
+    def body(self, index: int) -> list[str]:
+        """The page's own paragraphs, without header / nav / footer."""
+        body_rng = random.Random(self.seed * 7919 + self.content_source(index))
+        return self._text(body_rng, int(self.page_bytes * (1 - self.boilerplate)))
+
+    def render(self, index: int) -> str:
+        source = self.content_source(index)
+        body = self.body(index)
+        title = f"Page {source}"
+
+        children = range(index * self.fanout + 1, min((index + 1) * self.fanout + 1, self.pages))
+        nav = "".join(f'<li><a href="/p/{i}.html">{item}</a></li>' for i, item in enumerate(self.nav_items, start=1) if i < self.pages)
+        links = "".join(f'<li><a href="/p/{i}.html">Read more: page {i}</a></li>' for i in children)
+
+        return (
+            "<!doctype html><html><head>"
+            f"<title>{title}</title><style>body{{font-family:sans-serif}}</style>"
+            "<script>window.analytics=function(){};</script>"
+            "</head><body>"
+            f"<header>{''.join(f'<p>{p}</p>' for p in self.header)}<nav><ul>{nav}</ul></nav></header>"
+            f"<main><h1>{title}</h1>{''.join(f'<p>{p}</p>' for p in body)}<ul>{links}</ul></main>"
+            f"<footer>{''.join(f'<p>{p}</p>' for p in self.footer)}</footer>"
+            "</body></html>"
+        )
+
+    # ---------- serving ----------
+    def handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/manifest.json":
+                    return self._send(json.dumps(site.manifest()), "application/json")
+                if self.path in ("/", "/index.html"):
+                    return self._send(site.render(0))
+                if self.path.startswith("/p/") and self.path.endswith(".html"):
+                    try:
+                        index = int(self.path[3:-5])
+                    except ValueError:
+                        index = -1
+                    if 0 <= index < site.pages:
+                        return self._send(site.render(index))
+                self.send_error(404)
+
+            def _send(self, body: str, content_type: str = "text/html; charset=utf-8"):
+                data = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.synthetic_site")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--page-kb", type=float, default=8)
+    parser.add_argument("--boilerplate", type=float, default=0.3)
+    parser.add_argument("--duplicates", type=float, default=0.1)
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    site = SyntheticSite(args.pages, args.page_kb, args.boilerplate, args.duplicates, args.fanout, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), site.handler())
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
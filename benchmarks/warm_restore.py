@@ -0,0 +1,225 @@
+"""
+First-minute latency after a restart, with and without the warm-state snapshot.
+
+    python -m benchmarks.warm_restore
+    python -m benchmarks.warm_restore --duration 60 --concurrency 8 --json warm.json
+    python -m benchmarks.warm_restore --qdrant-url http://localhost:6333 \
+        --openrouter-errors 429=1          # also shows the restored provider cooldown
+
+Steps (each app is a fresh `uvicorn app.main:app` process, like a Render wake-up):
+
+  1. warm-up   run traffic against an app with WARM_STATE_PATH set, then
+               stop it — the lifespan shutdown writes the snapshot
+  2. cold      restart with snapshots disabled, measure the first --duration s
+  3. restored  restart from a copy of that snapshot, measure the same window
+
+Questions come from a pool of --questions distinct texts with Zipf-skewed
+popularity, so a cold process keeps missing the embedding cache on the long
+tail for a while. Same database / Qdrant caveats as benchmarks.cold_start:
+without --qdrant-url the chats end at "knowledge base not found" after
+the bot lookup, embedding and Qdrant calls.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+from benchmarks.cold_start import BOT_ID, REPO_ROOT, SEED_SCRIPT, _free_port, _git_commit, _wait_http
+from benchmarks.fake_providers import add_profile_args
+from benchmarks.load_client import QUESTIONS, QUESTIONS_PER_VISITOR, _visitor_ip, summarize
+
+CACHE_COUNTERS = (
+    "query_embedding_cache_hits_total",
+    "query_embedding_cache_misses_total",
+    "bot_config_cache_hits_total",
+    "bot_config_cache_misses_total",
+    "warm_state_restored_query_embeddings",
+)
+
+
+def question_pool(n: int) -> tuple[list[str], np.ndarray]:
+    """n distinct questions and their Zipf(1.1) sampling weights."""
+    questions = [f"{QUESTIONS[i % len(QUESTIONS)]} (topic {i // len(QUESTIONS)})" for i in range(n)]
+    weights = 1 / np.arange(1, n + 1) ** 1.1
+    return questions, weights / weights.sum()
+
+
+# -----------------------------------------------------
+# TRAFFIC
+# -----------------------------------------------------
+async def traffic(app_url: str, questions: list[str], weights: np.ndarray, duration: float, concurrency: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    statuses: Counter = Counter()
+    samples: list[tuple[float, float]] = []   # (seconds since start, latency ms)
+
+    start = time.perf_counter()
+    stop_at = start + duration
+    async with httpx.AsyncClient(base_url=app_url, timeout=120) as client:
+
+        async def user():
+            while time.perf_counter() < stop_at:
+                headers = {"X-Forwarded-For": _visitor_ip()}
+                for _ in range(QUESTIONS_PER_VISITOR):
+                    t0 = time.perf_counter()
+                    if t0 >= stop_at:
+                        return
+                    message = questions[rng.choice(len(questions), p=weights)]
+                    try:
+                        r = await client.post(f"/api/chat/{BOT_ID}", json={"message": message}, headers=headers)
+                        status = str(r.status_code)
+                    except httpx.HTTPError as e:
+                        status = type(e).__name__
+                    statuses[status] += 1
+                    samples.append((t0 - start, (time.perf_counter() - t0) * 1000))
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+
+    windows = []
+    for lo in range(0, int(duration), 10):
+        window = [ms for t, ms in samples if lo <= t < lo + 10]
+        windows.append({"from_s": lo, **summarize(window)})
+    return {
+        "status_counts": dict(statuses),
+        "latency": summarize([ms for _, ms in samples]),
+        "first_10s": summarize([ms for t, ms in samples if t < 10]),
+        "windows": windows,
+    }
+
+
+def _scrape_counters(app_url: str) -> dict:
+    out = {}
+    for line in httpx.get(f"{app_url}/metrics").text.splitlines():
+        name, _, value = line.partition(" ")
+        if name in CACHE_COUNTERS:
+            out[name] = float(value)
+    return out
+
+
+# -----------------------------------------------------
+# ONE APP PROCESS
+# -----------------------------------------------------
+def run_app(env: dict, snapshot_path: str, duration: float, args, questions, weights, seed: int) -> dict:
+    port = _free_port()
+    app_url = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning",
+            "--proxy-headers", "--forwarded-allow-ips", "*",   # visitors are told apart by X-Forwarded-For
+        ],
+        cwd=REPO_ROOT, env={**env, "WARM_STATE_PATH": snapshot_path},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_http(f"{app_url}/", time.monotonic() + args.timeout)
+        result = asyncio.run(traffic(app_url, questions, weights, duration, args.concurrency, seed))
+        result["counters"] = _scrape_counters(app_url)
+        return result
+    finally:
+        # SIGTERM → uvicorn runs the lifespan shutdown, which writes the snapshot
+        proc.terminate()
+        proc.wait()
+
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="warm-restore-")
+    providers_port = _free_port()
+    providers_url = f"http://127.0.0.1:{providers_port}"
+    env = {
+        **os.environ,
+        "DATABASE_URL": args.database_url or f"sqlite:///{workdir}/bench.db",
+        "QDRANT_URL": args.qdrant_url or "",
+        "QDRANT_API_KEY": args.qdrant_api_key or "",
+        "QDRANT_PATH": ":memory:",
+        "CHAT_SCORE_THRESHOLD": "",             # fake vectors are unrelated; always call the LLM
+        "HF_API_TOKEN": "bench",
+        "HF_API_BASE": f"{providers_url}/hf",
+        "OPENROUTER_API_KEY": "bench",
+        "OPENROUTER_API_BASE": f"{providers_url}/openrouter",
+        "GROQ_API_KEY": "bench",
+        "GROQ_API_BASE": f"{providers_url}/groq",
+        "WARM_STATE_INTERVAL_S": "3600",
+    }
+    provider_cmd = [sys.executable, "-m", "benchmarks.fake_providers", "--port", str(providers_port)]
+    for name in ("hf", "openrouter", "groq"):
+        provider_cmd += [f"--{name}-latency", getattr(args, f"{name}_latency")]
+        provider_cmd += [f"--{name}-errors", getattr(args, f"{name}_errors")]
+    providers = subprocess.Popen(provider_cmd, cwd=REPO_ROOT)
+
+    questions, weights = question_pool(args.questions)
+    snapshot = os.path.join(workdir, "warm_state.bin")
+    try:
+        subprocess.run(
+            [sys.executable, "-c", SEED_SCRIPT, BOT_ID, "qdrant" if args.qdrant_url else "db"],
+            cwd=REPO_ROOT, env=env, check=True,
+        )
+        _wait_http(f"{providers_url}/health", time.monotonic() + 15)
+
+        print(f"warm-up: {args.warmup}s of traffic, then snapshot on shutdown", file=sys.stderr)
+        run_app(env, snapshot, args.warmup, args, questions, weights, seed=0)
+        snapshot_bytes = os.path.getsize(snapshot)
+
+        results = {}
+        for mode in ("cold", "restored"):
+            path = ""
+            if mode == "restored":
+                # The measured run overwrites its snapshot on shutdown; keep the warm-up one intact
+                path = os.path.join(workdir, "restored.bin")
+                shutil.copyfile(snapshot, path)
+            results[mode] = run_app(env, path, args.duration, args, questions, weights, seed=1)
+            latency = results[mode]["latency"]
+            print(
+                f"{mode:<9} p50 {latency.get('p50_ms')} ms  p95 {latency.get('p95_ms')} ms  "
+                f"first 10s p50 {results[mode]['first_10s'].get('p50_ms')} ms",
+                file=sys.stderr,
+            )
+    finally:
+        providers.terminate()
+        providers.wait()
+
+    return {
+        "benchmark": "warm_restore",
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "qdrant": "server" if args.qdrant_url else "memory",
+        "duration_s": args.duration,
+        "concurrency": args.concurrency,
+        "questions": args.questions,
+        "snapshot_bytes": snapshot_bytes,
+        **results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.warm_restore")
+    parser.add_argument("--duration", type=float, default=60, help="measured seconds after each restart")
+    parser.add_argument("--warmup", type=float, default=60, help="seconds of traffic before the snapshot")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--questions", type=int, default=400, help="distinct questions in the pool")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--database-url", default=None, help="default: fresh SQLite file in a temp dir")
+    parser.add_argument("--qdrant-url", default=None, help="seed and query a real Qdrant server")
+    parser.add_argument("--qdrant-api-key", default=None)
+    parser.add_argument("--json", default=None, help="write results here")
+    add_profile_args(parser)
+    parser.set_defaults(hf_latency="150:0.3")
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps({mode: result[mode]["latency"] for mode in ("cold", "restored")}, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -157,6 +157,7 @@ export default function DashboardPage() {
   const [progressStep, setProgressStep] = useState(0);
   const [creatingBotError, setCreatingBotError] = useState<string | null>(null);
   const pollingRef = useRef<NodeJS.Timeout | null>(null);
+  const eventSourceRef = useRef<EventSource | null>(null);
   const autoPollingRef = useRef<NodeJS.Timeout | null>(null);
 
   // Bot card actions
@@ -222,31 +223,56 @@ export default function DashboardPage() {
     finally { setLoadingBots(false); }
   }
 
+  async function handleStatus(data: { status: string; error_message?: string | null }) {
+    // Drive progress step from real backend status
+    if (data.status === "crawling")  setProgressStep(0);
+    else if (data.status === "embedding") setProgressStep(1);
+    else if (data.status === "saving")    setProgressStep(2);
+
+    if (data.status === "ready" || data.status === "failed") {
+      stopPolling();
+      if (data.status === "failed") {
+        setCreatingBotError(data.error_message || "Bot creation failed. Please try again.");
+      }
+      setCreatingBotId(null);
+      setProgressStep(0);
+      await fetchBots();
+    }
+  }
+
   function startPolling(botId: string) {
+    // Server pushes every status change; fall back to polling if SSE is unavailable
+    if (typeof EventSource !== "undefined") {
+      const es = new EventSource(`${API_BASE_URL}/bots/${botId}/status/stream`);
+      eventSourceRef.current = es;
+      es.addEventListener("status", (e) => {
+        handleStatus(JSON.parse((e as MessageEvent).data));
+      });
+      es.onerror = () => {
+        if (es.readyState === EventSource.CLOSED && eventSourceRef.current === es) {
+          eventSourceRef.current = null;
+          startIntervalPolling(botId);
+        }
+      };
+      return;
+    }
+    startIntervalPolling(botId);
+  }
+
+  function startIntervalPolling(botId: string) {
     pollingRef.current = setInterval(async () => {
       try {
         const res = await fetch(`${API_BASE_URL}/bots/${botId}/status`);
-        const data = await res.json();
-
-        // Drive progress step from real backend status
-        if (data.status === "crawling")  setProgressStep(0);
-        else if (data.status === "embedding") setProgressStep(1);
-        else if (data.status === "saving")    setProgressStep(2);
-
-        if (data.status === "ready" || data.status === "failed") {
-          stopPolling();
-          if (data.status === "failed") {
-            setCreatingBotError(data.error_message || "Bot creation failed. Please try again.");
-          }
-          setCreatingBotId(null);
-          setProgressStep(0);
-          await fetchBots();
-        }
+        await handleStatus(await res.json());
       } catch { console.error("Polling error"); }
     }, 3000);
   }
 
   function stopPolling() {
+    if (eventSourceRef.current) {
+      eventSourceRef.current.close();
+      eventSourceRef.current = null;
+    }
     if (pollingRef.current) clearInterval(pollingRef.current);
   }
 
@@ -0,0 +1,59 @@
+"""
+A builder bot deleted mid-build: the version is retired (and its collection
+dropped) while the pipeline keeps writing. finish_build must not mark the
+retired version ready, and must drop the collection the pipeline re-created.
+
+    python -m tests.test_kb_settle
+"""
+import os
+import asyncio
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/kb_settle.db")
+os.environ.setdefault("QDRANT_PATH", ":memory:")
+
+from app import models
+from app.db import db_session, engine
+from app.services import knowledge_bases
+from app.services.vector_store import add_chunks_to_qdrant, list_bot_ids
+
+
+async def main():
+    models.Base.metadata.create_all(bind=engine)
+    with db_session() as db:
+        user = models.User(email="settle@test", name="settle", hashed_password="x")
+        db.add(user)
+        db.flush()
+        kb = knowledge_bases.new_version(db, "https://example.com")
+        bot = models.Bot(user_id=user.id, bot_id="settle-builder", website_url="https://example.com", kb_id=kb.id)
+        db.add(bot)
+        db.flush()
+        db.add(models.BuildJob(bot_id=bot.id))
+        db.commit()
+        kb_id, collection_key, bot_pk = kb.id, kb.collection_key, bot.id
+
+    # Builder deleted mid-build (SQLite doesn't cascade without its pragma)
+    with db_session() as db:
+        db.query(models.BuildJob).filter(models.BuildJob.bot_id == bot_pk).delete()
+        db.query(models.Bot).filter(models.Bot.id == bot_pk).delete()
+        db.commit()
+    await knowledge_bases.release_storage("settle-builder", kb_id)
+
+    # ...the pipeline, still running, upserts into (and so re-creates) the collection
+    await add_chunks_to_qdrant(collection_key, ["still crawling"], [[0.1] * 384], [{"page_url": "/"}])
+    assert collection_key in await list_bot_ids()
+
+    await knowledge_bases.finish_build(kb_id, bot_pk, ok=True)
+
+    with db_session() as db:
+        status = db.get(models.KnowledgeBase, kb_id).status
+    print("Version status:", status)
+    assert status == "retired", status
+    assert collection_key not in await list_bot_ids(), "re-created collection leaked"
+    with db_session() as db:
+        assert knowledge_bases.find_shared(db, "https://example.com") is None
+    print("✅ Retired version stays retired; its collection is dropped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())